@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Detección de la fecha de publicación de los artículos.
+Cada periódico tiene su propio esquema de URL (/YYYY/MM/DD/, YYYY-MM-DD,
+YYYYMMDD, identificadores finales...) y se compila una sola expresión regular
+combinada por esquema, que se aplica a cada enlace. Los enlaces se clasifican
+contra una fecha de referencia fijada para toda la ejecución, y se devuelve la
+fecha, no solo si es de hoy.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_GROUPS = (
+    r'/(?P<slash_y>20\d\d)/(?P<slash_m>\d\d)/(?P<slash_d>\d\d)(?=/|$)',  # El Mundo: /espana/2025/06/20/...
+    r'(?<!\d)(?P<iso_y>20\d\d)-(?P<iso_m>\d\d)-(?P<iso_d>\d\d)(?!\d)',  # El Confidencial: /espana/2025-06-20/...
+    r'(?<!\d)(?P<compact_y>20\d\d)(?P<compact_m>\d\d)(?P<compact_d>\d\d)(?!\d)'  # 20250620
+)
+
+# Identificadores de artículo que no son fechas y no deben confundirse con YYYYMMDD
+ARTICLE_IDS = {
+    'elconfidencial.com': r'_(?P<id>\d+)/?(?=$|[?#])',  # .../titulo_4156789/
+    'eldiario.es': r'_\d+_(?P<id>\d+)\.html',  # .../titulo_1_12345678.html
+}
+
+# Los identificadores van primero en la alternancia para que se consuman antes que una fecha compacta
+SCHEMES = {host: re.compile('|'.join((pattern,) + DATE_GROUPS)) for host, pattern in ARTICLE_IDS.items()}
+DEFAULT_SCHEME = re.compile('|'.join(DATE_GROUPS))
+
+# Palabras del título que sugieren que la noticia es de hoy cuando la URL no trae fecha
+TODAY_INDICATORS = ('hoy', 'actual', 'última hora', 'breaking', 'ahora')
+
+HTML_DATE_SELECTORS = (
+    ('meta[property="article:published_time"]', 'content'),
+    ('time[datetime]', 'datetime'),
+)
+ISO_DATE = re.compile(r'(20\d\d)-(\d\d)-(\d\d)')
+HOST = re.compile(r'^(?:[a-z][a-z0-9+.-]*:)?//([^/?#]*)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def scheme_for_host(host):
+    """Devuelve la expresión regular compilada del esquema de URL de un dominio"""
+    host = host.lower()
+    for domain, scheme in SCHEMES.items():
+        if host == domain or host.endswith('.' + domain):
+            return scheme
+    return DEFAULT_SCHEME
+
+
+def scheme_for(link):
+    """Devuelve la expresión regular compilada del esquema de URL del periódico del enlace"""
+    match = HOST.match(link)
+    return scheme_for_host(match.group(1) if match else '')
+
+
+@lru_cache(maxsize=4096)
+def make_date(year, month, day):
+    """Fecha a partir de sus cifras (None si es imposible); en un lote se repiten muchísimo"""
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def match_date(match):
+    """Convierte una coincidencia del esquema en fecha (None si es un identificador o una fecha imposible)"""
+    # El último grupo cerrado es el día de la alternativa que ha casado, o el identificador
+    prefix = match.lastgroup[:-2] if match.lastgroup != 'id' else None
+    if prefix is None:
+        return None
+    return make_date(*match.group(f'{prefix}_y', f'{prefix}_m', f'{prefix}_d'))
+
+
+def extract_date_from_url(link):
+    """Devuelve la fecha de publicación que aparece en la URL, o None"""
+    for match in scheme_for(link).finditer(link):
+        published = match_date(match)
+        if published:
+            return published
+    return None
+
+
+def extract_date_from_html(soup):
+    """Devuelve la fecha de article:published_time o del primer <time datetime> de un documento ya parseado"""
+    if soup is None:
+        return None
+    for selector, attribute in HTML_DATE_SELECTORS:
+        element = soup.select_one(selector)
+        match = ISO_DATE.match(element.get(attribute, '') if element else '')
+        if match:
+            try:
+                return date(*(int(part) for part in match.groups()))
+            except ValueError:
+                continue
+    return None
+
+
+class DateClassifier:
+    """Clasifica enlaces por fecha de publicación contra una fecha de referencia fija para toda la ejecución"""
+
+    def __init__(self, reference=None):
+        self.reference = reference or datetime.now().date()
+
+    def classify(self, links):
+        """Devuelve la fecha de publicación de cada enlace (o None), en el mismo orden"""
+        return [extract_date_from_url(link) for link in links]
+
+    def age_days(self, published):
+        """Días transcurridos desde la publicación hasta la fecha de referencia (None si no hay fecha)"""
+        return (self.reference - published).days if published else None
+
+    def is_new(self, published, title):
+        """Indica si un artículo es de la fecha de referencia; sin fecha, se guía por el título"""
+        if published:
+            return published == self.reference
+        lowered = title.lower()
+        return any(indicator in lowered for indicator in TODAY_INDICATORS)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Últimos artículos de cada autor de datos, con paginación.
+En lugar de quedarse con el primer artículo de la página de un autor, recorre
+sus páginas de archivo hasta reunir los N últimos o hasta llegar a artículos
+que ya conoce (sus huellas se guardan en SQLite), así que cada ejecución cuesta
+lo que haya publicado el autor desde la anterior y no lo que tenga de archivo.
+HEADLINES_AUTHOR_ARTICLES elige N; HEADLINES_AUTHORS, un JSON con los autores
+de cada periódico en lugar de los del registro.
+"""
+
+import dataclasses
+import json
+import os
+import sqlite3
+import time
+from datetime import date
+
+from article_dates import DateClassifier, extract_date_from_url
+from history_store import link_hash
+from html_parsing import make_soup
+from metrics import NO_METRICS
+from sources import AuthorPage
+from story_clusters import canonical_url, headline_key
+
+AUTHOR_ARTICLES_ENV_VAR = 'HEADLINES_AUTHOR_ARTICLES'  # Artículos por autor (por defecto, solo el último)
+AUTHORS_ENV_VAR = 'HEADLINES_AUTHORS'  # {"El Mundo": [{"url": ..., "name": ...}, ...], ...}
+STORE_FILE = '.autores_titulares.sqlite3'
+MAX_PAGES = 10  # Páginas de archivo como mucho por autor y ejecución
+MAX_PER_PAGE = 100  # Artículos como mucho que se leen de una página de archivo
+KNOWN_PER_AUTHOR = 1000  # Huellas de cada autor que se cargan para saber dónde parar
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    author_url TEXT NOT NULL,
+    link_hash INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    found_at REAL NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    author TEXT NOT NULL,
+    published TEXT,
+    PRIMARY KEY (author_url, link_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_author_seq ON articles(author_url, seq);
+"""
+
+
+def article_fingerprint(link):
+    """Huella del enlace canónico de un artículo (la misma función que usa el histórico)"""
+    return link_hash(canonical_url(link))
+
+
+class AuthorArchive:
+    """Artículos ya encontrados de cada autor, del más antiguo al más reciente"""
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def known(self, author_url, limit=KNOWN_PER_AUTHOR):
+        """Huellas de los últimos artículos conocidos de un autor"""
+        return {row[0] for row in self.connection.execute(
+            'SELECT link_hash FROM articles WHERE author_url = ? ORDER BY seq DESC LIMIT ?', (author_url, limit))}
+
+    def add(self, author_url, articles, now=None):
+        """Anota los artículos nuevos de un autor, que llegan del más reciente al más antiguo"""
+        if not articles:
+            return
+        now = now or time.time()
+        with self.connection:
+            last = self.connection.execute('SELECT COALESCE(MAX(seq), 0) FROM articles WHERE author_url = ?',
+                                           (author_url,)).fetchone()[0]
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO articles (author_url, link_hash, seq, found_at, title, link, author, published) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(author_url, article_fingerprint(article['link']), last + position, now, article['title'],
+                  article['link'], article['author'], article.get('published'))
+                 for position, article in enumerate(reversed(articles), 1)])
+
+    def latest(self, author_url, count):
+        """Los count últimos artículos de un autor, del más reciente al más antiguo"""
+        return [{'title': title, 'link': link, 'author': author, 'published': published}
+                for title, link, author, published in self.connection.execute(
+                    'SELECT title, link, author, published FROM articles WHERE author_url = ? ORDER BY seq DESC LIMIT ?',
+                    (author_url, count))]
+
+
+def load_authors(path, sources):
+    """Periódicos del registro con los autores de un JSON ({"periódico": [{"url", "name"}, ...]});
+    los que no aparecen en el JSON se quedan sin autores"""
+    with open(path, encoding='utf-8') as f:
+        authors = json.load(f)
+    unknown = set(authors) - {source.name for source in sources}
+    if unknown:
+        raise ValueError(f"Periódicos desconocidos en {path}: {', '.join(sorted(unknown))}")
+    return [dataclasses.replace(source, authors=[AuthorPage(**author) for author in authors.get(source.name, [])])
+            for source in sources]
+
+
+def sources_from_env(sources):
+    """Los periódicos con los autores de HEADLINES_AUTHORS, si se ha indicado"""
+    path = os.environ.get(AUTHORS_ENV_VAR)
+    return load_authors(path, sources) if path else sources
+
+
+def articles_from_env():
+    """Cuántos artículos por autor pide HEADLINES_AUTHOR_ARTICLES (1 si no se indica o no es un número)"""
+    value = os.environ.get(AUTHOR_ARTICLES_ENV_VAR, '').strip()
+    if not value:
+        return 1
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"⚠️ {AUTHOR_ARTICLES_ENV_VAR}={value!r} no es un número de artículos; se usa 1")
+        return 1
+
+
+def archive_page_url(source, author, page):
+    """Dirección de la página page (1, 2...) del archivo de un autor, o None si el periódico no pagina"""
+    if page == 1:
+        return author.url
+    if not source.author_pagination:
+        return None
+    return source.author_pagination.format(url=author.url, page=page)
+
+
+def extract_article_list(source, content, author_name):
+    """Artículos de una página de archivo de autor, en el orden en que aparecen (el más reciente primero)"""
+    # Sin parseo restringido: author_parse_class suele describir solo el bloque del último artículo
+    soup = make_soup(content)
+
+    def extract(element):
+        title = element.get_text().strip()
+        link = element.get('href', '')
+        if not title or not source.author_rules.accepts(title, link):
+            return None
+        link = source.absolute_url(link)
+        published = extract_date_from_url(link)
+        return {'title': title, 'link': link, 'author': author_name,
+                'published': published.isoformat() if published else None}
+
+    # Todos los de la página en orden de documento, sin repetir enlaces: crawl_author cuenta con que el primero
+    # es el más reciente, y la prioridad de los selectores los agruparía por selector
+    return source.author_list_selector_set.in_document_order(soup, MAX_PER_PAGE, extract, key=headline_key)
+
+
+def crawl_author(source, author, count, known, fetch, metrics=NO_METRICS, max_pages=MAX_PAGES):
+    """Artículos nuevos de un autor (del más reciente al más antiguo): recorre su archivo página a página
+    hasta reunir count, llegar a uno conocido (known, huellas de article_fingerprint) o quedarse sin páginas.
+    fetch(url) descarga una página; si la primera no ha cambiado desde la última vez (y ya se conocía
+    algún artículo del autor), no hay nada nuevo."""
+    labels = {'source': source.name, 'page': author.name}
+    found = []
+    seen = set()
+    for page in range(1, max_pages + 1):
+        url = archive_page_url(source, author, page)
+        if url is None:
+            break
+        with metrics.span('fetch', url=url, **labels) as span:
+            response = fetch(url)
+            metrics.observe_response(span, response, **labels)
+        if page == 1 and known and getattr(response, 'not_modified', False):
+            metrics.count('author_pages', result='unchanged', **labels)
+            return found
+        with metrics.span('parse', **labels):
+            articles = extract_article_list(source, response.content, author.name)
+        fresh = [article for article in articles if article_fingerprint(article['link']) not in seen]
+        if not fresh:
+            # Página vacía o repetida (algunos archivos devuelven la última página para cualquier número)
+            break
+        for article in fresh:
+            fingerprint = article_fingerprint(article['link'])
+            if fingerprint in known:
+                metrics.count('author_pages', page, result='known', **labels)
+                return found
+            seen.add(fingerprint)
+            found.append(article)
+            if len(found) >= count:
+                return found
+    metrics.count('author_pages', page, result='walked', **labels)
+    return found
+
+
+def latest_articles(archive, sources, count, crawled, dates=None):
+    """Anota lo encontrado de cada autor y devuelve los count últimos de cada uno por periódico.
+    crawled: {url del autor: artículos nuevos o None si no se pudo recorrer}; uno que falla sigue con lo guardado."""
+    dates = dates or DateClassifier()
+    data_articles = {}
+    for source in sources:
+        articles = []
+        for author in source.authors:
+            archive.add(author.url, crawled.get(author.url) or [])
+            for article in archive.latest(author.url, count):
+                published = date.fromisoformat(article['published']) if article['published'] else None
+                article['is_new'] = dates.is_new(published, article['title'])
+                articles.append(article)
+        data_articles[source.name] = articles
+    return data_articles
@@ -0,0 +1,1357 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del extractor de titulares contra servidores HTTP locales,
+sin depender de los periódicos reales.
+"""
+
+import argparse
+import dataclasses
+import glob
+import gzip
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+
+import requests
+
+import headlines_scraper
+from article_dates import DateClassifier
+import author_feeds
+import feed_parsing
+from enrichment import Enricher, Limits, extract_article
+from http_cache import HttpCache
+from history_store import HistoryStore
+import html_parsing
+from metrics import Metrics
+from output_dir import OutputDirectory, RetentionPolicy
+import rendering
+import results
+from replay import (FIXTURES_DIR, Recorder, StubHandler, latest_recording, load_recording, replay_sources,
+                    start_replay_server, start_stub_server, stub_path as replay_stub_path)
+from resilience import Resilience
+from selector_health import DRIFT_MISSES, MIN_RUNS, SelectorHealth
+from results import Article, Headline, ResultBatch
+from sharding import run_sharded
+import sinks
+from sources import SOURCES, AuthorPage, get_source
+from story_clusters import StoryIndex, minhash, shingles, similarity
+from uploads import UploadManager, WebDavUploader
+
+BASELINE_FILE = 'benchmarks_baseline.json'
+REGRESSION_THRESHOLD = 0.25  # Una etapa más de un 25 % más lenta que su referencia cuenta como regresión
+REGRESSION_MIN_MS = 1.0  # Por debajo de esta diferencia absoluta es ruido, no regresión
+PIPELINE_STAGES = ('fetch', 'parse', 'extract', 'dates', 'render')
+# Lo que puede tardar cada orden de cli.py en importar sus módulos (ms)
+STARTUP_BUDGET_MS = {'scrape': 150, 'daemon': 150, 'render': 30, 'clean': 30, 'query': 30, 'selectors': 30}
+# Dependencias pesadas que ninguna orden debe importar antes de usarlas
+LAZY_MODULES = ('requests', 'urllib3', 'bs4', 'soupsieve', 'lxml', 'selectolax', 'dropbox')
+BUDGET_FAILURES = []  # Presupuestos fijos superados (p. ej. el de arranque); cuentan como regresiones
+
+
+def fetch(url, session=None):
+    """Descarga una página igual que lo hacen los extractores"""
+    return len(headlines_scraper.fetch_page(url, session).content)
+
+
+def fetch_without_session(url):
+    """Descarga una página como antes de compartir la sesión: una conexión nueva por petición"""
+    response = requests.get(url, headers=headlines_scraper.HEADERS, timeout=headlines_scraper.REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return len(response.content)
+
+
+def bench_concurrent_fetch():
+    """Compara el tiempo de las 11 descargas en serie frente al planificador en paralelo"""
+    # Un servidor por periódico: portada + páginas de autor, con latencias desiguales
+    sites = [
+        (0.8, [0.3, 0.5, 0.4, 0.6]),  # El Mundo
+        (0.6, [0.7, 0.3]),            # El Confidencial
+        (0.5, [0.4, 0.9])             # El Diario
+    ]
+    servers = []
+    urls = []
+    for front_latency, author_latencies in sites:
+        paths = ['/'] + [f'/autor/{i}' for i in range(len(author_latencies))]
+        pages = {path: b'<html><body>stub</body></html>' for path in paths}
+        server, base_url = start_stub_server(pages, dict(zip(paths, [front_latency] + author_latencies)))
+        servers.append(server)
+        urls.extend(base_url + path for path in paths)
+
+    session = headlines_scraper.create_session()
+    try:
+        start = time.perf_counter()
+        serial_results = [fetch(url, session) for url in urls]
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent_results = headlines_scraper.run_tasks_concurrently([(url, fetch, (url, session)) for url in urls])
+        concurrent_time = time.perf_counter() - start
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    slowest = max(max([front] + authors) for front, authors in sites)
+    print(f"🐢 En serie:   {serial_time:.2f} s ({len(urls)} páginas)")
+    print(f"⚡ En paralelo: {concurrent_time:.2f} s (página más lenta: {slowest:.2f} s)")
+    print(f"🚀 Aceleración: x{serial_time / concurrent_time:.1f}")
+    print(f"✅ Resultados idénticos: {serial_results == concurrent_results}")
+
+
+def bench_connection_reuse():
+    """Cuenta las conexiones abiertas con requests.get suelto frente a la sesión compartida"""
+    paths = [f'/autor/{i}' for i in range(4)]
+    server, base_url = start_stub_server({path: b'<html><body>stub</body></html>' for path in paths})
+    urls = [base_url + path for path in paths] * 2
+
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            fetch_without_session(url)
+        bare_time = time.perf_counter() - start
+        bare_connections = server.connections
+
+        server.connections = 0
+        session = headlines_scraper.create_session()
+        start = time.perf_counter()
+        for url in urls:
+            fetch(url, session)
+        session_time = time.perf_counter() - start
+        session_connections = server.connections
+    finally:
+        server.shutdown()
+
+    stats = headlines_scraper.connection_stats(session)
+    print(f"🐢 requests.get: {bare_connections} conexiones para {len(urls)} peticiones ({bare_time * 1000:.1f} ms)")
+    print(f"⚡ Sesión compartida: {session_connections} conexiones para {len(urls)} peticiones ({session_time * 1000:.1f} ms)")
+    for host, counts in stats.items():
+        print(f"🔌 {host}: {counts['new']} nuevas, {counts['reused']} reutilizadas")
+
+
+def author_page(title, padding_kb=300):
+    """Genera una página de autor de El Mundo con el primer artículo arriba y relleno hasta el tamaño indicado"""
+    filler = '<div class="ue-c-cover-content__filler"><p>%s</p></div>' % ('x' * 1000)
+    return ('<html><body><div class="ue-c-cover-content"><a href="/espana/2025/06/20/articulo.html">%s</a></div>%s</body></html>'
+            % (title, filler * padding_kb)).encode('utf-8')
+
+
+def bench_http_cache():
+    """Mide bytes y tiempo de parseo de las páginas de autor sin caché frente a revalidaciones 304"""
+    authors = [f'/autor/{i}' for i in range(4)]
+    pages = {path: author_page(f'Artículo de datos número {i} con gráficos') for i, path in enumerate(authors)}
+    server, base_url = start_stub_server(pages)
+    session = headlines_scraper.create_session()
+    el_mundo = get_source('El Mundo')
+
+    def run(cache):
+        start = time.perf_counter()
+        articles = [headlines_scraper.get_latest_article(el_mundo, base_url + path, path, session, cache) for path in authors]
+        return articles, time.perf_counter() - start
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = HttpCache(directory, max_age=0)
+            first, first_time = run(cache)
+            first_bytes = cache.stats['bytes_downloaded']
+            cache.save()
+
+            # Segunda ejecución con el índice recargado de disco, como haría el día siguiente
+            cache = HttpCache(directory, max_age=0)
+            second, second_time = run(cache)
+    finally:
+        server.shutdown()
+
+    print(f"🐢 Primera ejecución: {first_bytes // 1024} KB descargados, {first_time * 1000:.1f} ms")
+    print(f"⚡ Con caché: {cache.stats['bytes_downloaded'] // 1024} KB descargados, {second_time * 1000:.1f} ms "
+          f"({cache.stats['bytes_saved'] // 1024} KB ahorrados)")
+    print(f"📬 Respuestas del servidor: {dict(server.statuses)}")
+    print(f"✅ Resultados idénticos: {first == second}")
+
+
+def fixture_pages():
+    """Devuelve las páginas guardadas (nombre, bytes) sobre las que medir el parseo"""
+    paths = sorted(glob.glob(os.path.join(FIXTURES_DIR, '**', '*.html'), recursive=True))
+    if not paths:
+        # Sin fixtures grabados, usar los HTML generados que hay en el repositorio
+        paths = sorted(glob.glob('titulares_*.html'))
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        if content:
+            pages.append((os.path.basename(path), content))
+    pages.append(('autor_sintetico.html', author_page('Artículo de datos con gráficos')))
+    return pages
+
+
+def measure_parse(backend, content, only_class, repeat):
+    """Parsea un documento en un proceso limpio y devuelve (ms por parseo, pico de RSS en KB, pico del heap de Python en KB)"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(repeat):
+        soup = html_parsing.make_soup(content, only_class=only_class, backend=backend)
+    elapsed = (time.perf_counter() - start) / repeat
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    del soup
+
+    # tracemalloc no ve la memoria de lexbor ni de libxml2, pero sí el árbol de bs4
+    tracemalloc.start()
+    soup = html_parsing.make_soup(content, only_class=only_class, backend=backend)
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, rss_peak, heap_peak // 1024
+
+
+def run_isolated(func, *args):
+    """Ejecuta una función en un proceso nuevo para que sus picos de memoria no se mezclen con otros"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+
+def bench_parsers():
+    """Compara tiempo de parseo y pico de memoria de cada backend sobre las páginas guardadas"""
+    backends = html_parsing.available_backends()
+    print(f"🧩 Backends disponibles: {', '.join(backends)}")
+    # Cada medida en un proceso nuevo para que el pico de memoria no arrastre el de la anterior
+    for name, content in fixture_pages():
+        print(f"📄 {name} ({len(content) // 1024} KB)")
+        for backend in backends:
+            for only_class in (None, 'ue-c-cover-content'):
+                elapsed, rss_peak, heap_peak = run_isolated(measure_parse, backend, content, only_class, 5)
+                mode = 'restringido' if only_class else 'completo'
+                print(f"   {backend:<12} {mode:<12} {elapsed:8.2f} ms  RSS +{rss_peak:6d} KB  heap {heap_peak:6d} KB")
+
+
+def bench_selectors():
+    """Compara la cascada de select() con el recorrido único de SelectorSet sobre las páginas guardadas"""
+    selector_sets = {source.name: source.selector_set for source in SOURCES}
+    # SelectorSet solo recorre árboles de BeautifulSoup; con selectolax delega en la cascada
+    backend = 'lxml' if html_parsing.is_available('lxml') else 'html.parser'
+
+    def extract(element):
+        title = element.get_text().strip()
+        return (title, element.get('href', '')) if title else None
+
+    for name, content in fixture_pages():
+        soup = html_parsing.make_soup(content, backend=backend)
+        print(f"📄 {name} ({len(content) // 1024} KB, {backend})")
+        for source, selectors in selector_sets.items():
+            timings = {}
+            results = {}
+            for method in ('cascade', 'first'):
+                start = time.perf_counter()
+                for _ in range(10):
+                    results[method] = getattr(selectors, method)(soup, 4, extract)
+                timings[method] = (time.perf_counter() - start) / 10 * 1000
+            print(f"   {source:<16} cascada {timings['cascade']:7.2f} ms  recorrido único {timings['first']:7.2f} ms  "
+                  f"x{timings['cascade'] / timings['first']:.1f}  iguales: {results['cascade'] == results['first']}")
+
+
+def synthetic_results(source_count, headline_count):
+    """Genera titulares y artículos de datos de prueba para source_count periódicos"""
+    all_headlines = []
+    data_articles = {}
+    for s in range(source_count):
+        name = f'Periódico {s}'
+        all_headlines.extend({'title': f'Titular {h} de {name} con "comillas" & símbolos',
+                              'link': f'https://periodico{s}.es/2025/06/20/noticia-{h}.html?utm=1&x=2',
+                              'source': name} for h in range(headline_count))
+        data_articles[name] = [{'title': f'Gráfico {a} de {name}', 'link': f'https://periodico{s}.es/datos/{a}.html',
+                                'author': f'Autor {a}', 'is_new': a % 2 == 0} for a in range(3)]
+    return all_headlines, data_articles
+
+
+def measure_render(mode, source_count, headline_count, directory):
+    """Renderiza la página en un proceso limpio y devuelve (segundos, pico de RSS en KB)"""
+    all_headlines, data_articles = synthetic_results(source_count, headline_count)
+    filename = os.path.join(directory, f'titulares_{mode}.html')
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'stream':
+        rendering.create_html_file(all_headlines, data_articles, filename)
+    else:
+        # Como antes: concatenar toda la página en memoria y escribirla al final
+        html_content = ''
+        for chunk in rendering.render_html(all_headlines, data_articles, 'ahora'):
+            html_content += chunk
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+
+def bench_render():
+    """Compara el renderizado en streaming con la concatenación en memoria para 1.000 periódicos × 50 titulares"""
+    source_count, headline_count = 1000, 50
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, label in (('concat', '🐢 Concatenación'), ('stream', '⚡ Streaming')):
+            elapsed, rss_peak = run_isolated(measure_render, mode, source_count, headline_count, directory)
+            size = os.path.getsize(os.path.join(directory, f'titulares_{mode}.html'))
+            print(f"{label}: {elapsed:.2f} s, RSS +{rss_peak // 1024} MB ({size // (1024 * 1024)} MB de HTML)")
+
+
+def synthetic_item(n, source_count=20):
+    """Titular (o, uno de cada diez, artículo de datos) número n, como diccionario leído de un histórico"""
+    day = date(2025, 1, 1) + timedelta(days=n % 180)
+    # Nombres construidos en cada elemento, como al leerlos de JSON: cada diccionario lleva su propia copia
+    item = {'title': f'Titular número {n} sobre la actualidad del día', 'link': f'https://periodico{n % source_count}.es/{day:%Y/%m/%d}/noticia-{n}.html',
+            'source': ''.join(('Periódico ', str(n % source_count))), 'published': day.isoformat()}
+    if n % 10 == 0:
+        item.update(author=''.join(('Autor ', str(n % 7))), is_new=n % 20 == 0)
+    return item
+
+
+def measure_results(form, count):
+    """Construye count resultados en un proceso limpio con la representación indicada.
+    Devuelve (segundos, MB en el heap de Python, bytes por elemento)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    if form == 'dicts':
+        items = [synthetic_item(n) for n in range(count)]
+    elif form == 'slots':
+        items = [(Article if 'author' in item else Headline).from_dict(item) for item in map(synthetic_item, range(count))]
+    else:
+        items = ResultBatch()
+        for n in range(count):
+            items.append(synthetic_item(n))
+    elapsed = time.perf_counter() - start
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, current / (1024 * 1024), current / count
+
+
+def bench_results(count=1_000_000):
+    """Compara la memoria de 1M resultados como diccionarios, como objetos con __slots__ y en columnas"""
+    print(f"🧮 {count:_} resultados (un 10 % artículos de datos)".replace('_', '.'))
+    for form, label in (('dicts', 'Diccionarios'), ('slots', 'Headline/Article'), ('batch', 'ResultBatch')):
+        # Los tiempos incluyen el coste de tracemalloc: sirven para comparar entre sí, no como valor absoluto
+        elapsed, heap_mb, per_item = run_isolated(measure_results, form, count)
+        print(f"   {label:<18} {heap_mb:8.1f} MB  {per_item:6.0f} B por elemento  construidos en {elapsed:.2f} s")
+
+    # Serialización de un lote más pequeño en cada formato
+    batch = ResultBatch()
+    for n in range(count // 10):
+        batch.append(synthetic_item(n))
+    for format in results.FORMATS:
+        try:
+            start = time.perf_counter()
+            data = results.dumps(batch, format)
+            dump_time = time.perf_counter() - start
+        except RuntimeError as e:
+            print(f"   {format:<8} no disponible: {e}")
+            continue
+        start = time.perf_counter()
+        loaded = results.loads(data, format)
+        load_time = time.perf_counter() - start
+        same = len(loaded) == len(batch) and loaded[len(batch) - 1] == batch[len(batch) - 1]
+        print(f"   {format:<8} {len(batch)} elementos: {len(data) / (1024 * 1024):.1f} MB, escritura {dump_time * 1000:.0f} ms, "
+              f"lectura {load_time * 1000:.0f} ms, iguales: {same}")
+
+
+def bench_history():
+    """Llena el histórico con un año de ejecuciones horarias y mide las consultas"""
+    runs = 24 * 365
+    start_date = datetime(2024, 1, 1)
+    names = [source.name for source in SOURCES]
+    with tempfile.TemporaryDirectory() as directory:
+        with HistoryStore(os.path.join(directory, 'historial.sqlite3')) as store:
+            start = time.perf_counter()
+            for run in range(runs):
+                # Cada titular sigue en portada unas horas antes de ser sustituido
+                all_headlines = [{'title': f'Titular {run // 6 + h} de {name}', 'link': f'https://{s}.es/noticia-{run // 6 + h}.html',
+                                  'source': name} for s, name in enumerate(names) for h in range(4)]
+                data_articles = {name: [{'title': f'Datos {run // 48}', 'link': f'https://{s}.es/datos-{run // 48}.html',
+                                         'author': 'Autor'}] for s, name in enumerate(names)}
+                store.record_run(all_headlines, data_articles, start_date + timedelta(hours=run))
+            insert_time = time.perf_counter() - start
+            rows = store.connection.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+            start = time.perf_counter()
+            leads = store.leads('El Mundo', datetime(2024, 6, 1), datetime(2024, 6, 8))
+            leads_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for n in range(0, runs // 6, 100):
+                store.first_seen(f'https://0.es/noticia-{n}.html')
+            first_seen_time = (time.perf_counter() - start) / len(range(0, runs // 6, 100))
+
+        size = os.path.getsize(os.path.join(directory, 'historial.sqlite3'))
+
+    print(f"🗃️ {runs} ejecuciones, {rows} filas, {size // (1024 * 1024)} MB, insertadas en {insert_time:.1f} s")
+    print(f"🔎 Aperturas de El Mundo en una semana: {len(leads)} filas en {leads_time * 1000:.2f} ms")
+    print(f"🔎 Primera aparición de un enlace: {first_seen_time * 1000:.3f} ms por consulta")
+
+
+def bench_article_dates():
+    """Mide la detección de fechas sobre miles de enlaces y la agregación por antigüedad"""
+    reference = date(2025, 6, 20)
+    links = []
+    for n in range(30000):
+        day = reference - timedelta(days=n % 30)
+        links.append((f'https://www.elmundo.es/espana/{day:%Y/%m/%d}/noticia-{n}.html',
+                      f'https://www.elconfidencial.com/espana/{day:%Y-%m-%d}/titulo-{n}_{4100000 + n}/',
+                      f'https://www.eldiario.es/politica/titulo-{n}_1_{12000000 + n}.html')[n % 3])
+
+    dates = DateClassifier(reference)
+    start = time.perf_counter()
+    from_today = sum(headlines_scraper.is_article_from_today(link, 'Titular de prueba', dates) for link in links)
+    boolean_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ages = Counter(dates.age_days(published) for published in dates.classify(links))
+    classify_time = time.perf_counter() - start
+
+    print(f"🔗 {len(links)} enlaces: {from_today} de hoy, {ages[0]} con fecha de hoy, {ages[None]} sin fecha, "
+          f"{len(ages) - 1} días distintos")
+    print(f"   is_article_from_today {boolean_time * 1000:8.1f} ms")
+    print(f"   classify              {classify_time * 1000:8.1f} ms (con la agregación por antigüedad)")
+
+def synthetic_recording(directory, headline_count=40, padding_kb=100, sources=SOURCES):
+    """Graba portadas y páginas de autor sintéticas de todos los periódicos, para cuando no hay una grabación real"""
+    recorder = Recorder(directory)
+    filler = '<div class="relleno"><p>%s</p></div>' % ('x' * 1000)
+    for source in sources:
+        headlines = ''.join(f'<h2><a href="/espana/2025/06/{20 - n % 3:02d}/noticia-{n}.html">Titular número {n} de {source.name}</a></h2>'
+                            for n in range(headline_count))
+        recorder.record(source.url, f'<html><body>{headlines}{filler * padding_kb}</body></html>'.encode('utf-8'), 'text/html')
+        for n, author in enumerate(source.authors):
+            article = (f'<div class="{source.author_parse_class}"><h2><a href="/datos/grafico-{n}.html">Gráfico número {n} '
+                       f'de {author.name}</a></h2><time datetime="2025-06-20T10:00:00+02:00">hoy</time></div>')
+            recorder.record(author.url, f'<html><body>{article}{filler * padding_kb}</body></html>'.encode('utf-8'), 'text/html')
+    recorder.save()
+    return directory
+
+
+def pipeline_stage_times(directory, repeat=5):
+    """Ejecuta el proceso completo sobre una grabación y devuelve la mediana en ms de cada etapa"""
+    server, urls = start_replay_server(directory)
+    session = headlines_scraper.create_session()
+    dates = DateClassifier(date(2025, 6, 20))
+    pages = [(source, None) for source in SOURCES] + [(source, author) for source in SOURCES for author in source.authors]
+    pages = [(source, author) for source, author in pages if (author.url if author else source.url) in urls]
+    samples = {stage: [] for stage in PIPELINE_STAGES}
+    try:
+        for _ in range(repeat):
+            timings = dict.fromkeys(PIPELINE_STAGES, 0.0)
+            clock = time.perf_counter()
+
+            def lap(stage):
+                nonlocal clock
+                now = time.perf_counter()
+                timings[stage] += now - clock
+                clock = now
+
+            all_headlines = []
+            data_articles = {source.name: [] for source in SOURCES}
+            for source, author in pages:
+                content = headlines_scraper.fetch_page(urls[author.url if author else source.url], session).content
+                lap('fetch')
+                if author is None:
+                    soup = html_parsing.make_soup(content)
+                    lap('parse')
+                    headlines = headlines_scraper.extract_headlines(source, soup)
+                    lap('extract')
+                    all_headlines.extend(headlines_scraper.add_publication_dates(headlines, dates))
+                    lap('dates')
+                else:
+                    soup = headlines_scraper.parse_author_page(source, content)
+                    lap('parse')
+                    # La fecha de los artículos de autor sale de la URL o del <time> durante la extracción
+                    article = headlines_scraper.extract_latest_article(source, soup, author.name, dates) if soup is not None else None
+                    lap('extract')
+                    if article:
+                        data_articles[source.name].append(article)
+
+            rendering.write_html(io.StringIO(), all_headlines, data_articles, 'ahora')
+            lap('render')
+            for stage, elapsed in timings.items():
+                samples[stage].append(elapsed * 1000)
+    finally:
+        server.shutdown()
+    return {stage: statistics.median(values) for stage, values in samples.items()}
+
+
+def bench_pipeline():
+    """Mide por separado descarga, parseo, extracción, fechas y renderizado sobre la última grabación de fixtures/"""
+    directory = latest_recording()
+    if directory:
+        return report_pipeline(directory, os.path.basename(directory))
+    # Sin grabaciones, una sintética para que el benchmark funcione igual en cualquier máquina
+    with tempfile.TemporaryDirectory() as directory:
+        return report_pipeline(synthetic_recording(directory), 'sintética')
+
+
+def report_pipeline(directory, name):
+    pages = load_recording(directory)
+    print(f"🎞️ Grabación {name}: {len(pages)} páginas, {sum(len(content) for content, _ in pages.values()) // 1024} KB")
+    timings = pipeline_stage_times(directory)
+    for stage, elapsed in timings.items():
+        print(f"   {stage:<8} {elapsed:8.2f} ms")
+    print(f"   {'total':<8} {sum(timings.values()):8.2f} ms")
+    return timings
+
+
+def synthetic_sources(count, authors=4):
+    """Genera count periódicos ficticios, cada uno con su dominio, a partir de los del registro"""
+    sources = []
+    for n in range(count):
+        template = SOURCES[n % len(SOURCES)]
+        base_url = f'https://periodico{n}.es'
+        sources.append(dataclasses.replace(
+            template, name=f'{template.name} {n}', base_url=base_url, url=base_url + '/', feed_url=None,
+            authors=[AuthorPage(f'{base_url}/autor/{a}/', f'Autor {a} de {n}') for a in range(authors)]))
+    return sources
+
+
+def bench_sharding():
+    """Compara una ejecución en un solo proceso con la repartida entre 1, 2, 4... procesos"""
+    sources = synthetic_sources(48)
+    pages = len(sources) + sum(len(source.authors) for source in sources)
+    with tempfile.TemporaryDirectory() as directory:
+        recording = synthetic_recording(os.path.join(directory, 'grabacion'), padding_kb=200, sources=sources)
+        server, urls = start_replay_server(recording)
+        replayed = replay_sources(sources, urls)
+        try:
+            start = time.perf_counter()
+            expected = headlines_scraper.scrape_sources(replayed, headlines_scraper.create_session())
+            single_time = time.perf_counter() - start
+            print(f"🧵 Un proceso: {pages} páginas en {single_time:.2f} s ({pages / single_time:.1f} páginas/s)")
+
+            counts = [1]
+            while counts[-1] * 2 <= max(os.cpu_count() or 1, 4):
+                counts.append(counts[-1] * 2)
+            for workers in counts:
+                start = time.perf_counter()
+                all_headlines, data_articles, _ = run_sharded(
+                    replayed, workers, os.path.join(directory, f'cola_{workers}.sqlite3'), use_cache=False)
+                elapsed = time.perf_counter() - start
+                print(f"⚙️ {workers} procesos: {elapsed:.2f} s ({pages / elapsed:.1f} páginas/s, "
+                      f"x{single_time / elapsed:.1f})  iguales: {(all_headlines, data_articles) == expected}")
+        finally:
+            server.shutdown()
+    print(f"🖥️ Núcleos disponibles: {os.cpu_count()}")
+
+
+class ThrottledHandler(StubHandler):
+    """Como StubHandler, pero enviando el cuerpo a trozos al ancho de banda del servidor"""
+
+    def write_body(self, body):
+        chunk_size = 16 * 1024
+        for start in range(0, len(body), chunk_size):
+            self.wfile.write(body[start:start + chunk_size])
+            time.sleep(chunk_size / self.server.bandwidth)
+
+
+def bench_streaming(bandwidth=2 * 1024 * 1024):
+    """Compara la descarga entera de cada página de autor grabada con la que se corta tras el primer artículo"""
+    directory = latest_recording()
+    with tempfile.TemporaryDirectory() as tmp:
+        if directory is None:
+            directory = synthetic_recording(os.path.join(tmp, 'grabacion'), padding_kb=300)
+        recording = load_recording(directory)
+        author_pages = [(source, author) for source in SOURCES for author in source.authors if author.url in recording]
+        server, base_url = start_stub_server({replay_stub_path(url): content for url, (content, _) in recording.items()},
+                                             handler=ThrottledHandler)
+        server.bandwidth = bandwidth
+        print(f"🎞️ {len(author_pages)} páginas de autor a {bandwidth // 1024} KB/s")
+        totals = Counter()
+        try:
+            for source, author in author_pages:
+                url = base_url + replay_stub_path(author.url)
+                results = {}
+                for mode, stream in (('full', False), ('stream', True)):
+                    headlines_scraper.STREAM_AUTHOR_PAGES = stream
+                    session = headlines_scraper.create_session()
+                    metrics = Metrics()
+                    start = time.perf_counter()
+                    results[mode] = headlines_scraper.get_latest_article(source, url, author.name, session, metrics=metrics)
+                    totals[f'{mode}_time'] += time.perf_counter() - start
+                    totals[f'{mode}_bytes'] += sum(value for (name, _), value in metrics.counters.items()
+                                                   if name == 'bytes_downloaded')
+                    session.close()
+                same = results['full'] == results['stream']
+                totals['same'] += same
+                print(f"   {author.name:<24} {'✅' if same else '❌'} {len(recording[author.url][0]) // 1024:5d} KB")
+        finally:
+            headlines_scraper.STREAM_AUTHOR_PAGES = True
+            server.shutdown()
+    if author_pages:
+        print(f"🐢 Enteras:   {totals['full_bytes'] // 1024:6d} KB, {totals['full_time'] * 1000:8.1f} ms")
+        print(f"⚡ Cortadas:  {totals['stream_bytes'] // 1024:6d} KB, {totals['stream_time'] * 1000:8.1f} ms  "
+              f"({1 - totals['stream_bytes'] / totals['full_bytes']:.0%} menos bytes, "
+              f"{(totals['full_time'] - totals['stream_time']) / len(author_pages) * 1000:.0f} ms menos por página)")
+        print(f"✅ Mismo artículo en {totals['same']} de {len(author_pages)} páginas")
+
+
+def synthetic_stories(story_count, outlets=3, seed=1):
+    """Titulares de story_count historias, cada una contada por varios periódicos con otras palabras.
+    Devuelve una lista de (historia, titular) en el orden en que irían apareciendo"""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 10))) for _ in range(20000)]
+    items = []
+    for story in range(story_count):
+        words = rng.sample(vocabulary, 8)
+        for outlet in range(outlets):
+            # Cada periódico cambia un par de palabras y quita otra
+            variant = [rng.choice(vocabulary) if rng.random() < 0.15 else word for word in words]
+            del variant[rng.randrange(len(variant))]
+            items.append((story, {'title': ' '.join(variant), 'source': f'Periódico {outlet}',
+                                  'link': f'https://periodico{outlet}.es/noticia-{story}.html?utm_source=portada'}))
+    return items
+
+
+def bench_stories(story_count=20000):
+    """Mide la agrupación de historias con LSH frente a comparar cada titular con toda la ventana"""
+    items = synthetic_stories(story_count)
+    index = StoryIndex(max_items=len(items))
+    assigned = []
+    # Coste por titular a medida que se llena la ventana: con LSH no debería crecer con ella
+    start = time.perf_counter()
+    segment_start, segment_comparisons, previous = start, 0, 0
+    for end in (len(items) // 10, len(items) // 2, len(items)):
+        for _, headline in items[previous:end]:
+            assigned.append(index.add(headline['title'], headline['link'], now=0))
+        now = time.perf_counter()
+        count = end - previous
+        print(f"   hasta {len(index):6d} titulares en la ventana: {(now - segment_start) / count * 1e6:5.0f} µs y "
+              f"{(index.comparisons - segment_comparisons) / count:.1f} comparaciones por titular")
+        segment_start, segment_comparisons, previous = now, index.comparisons, end
+    elapsed = time.perf_counter() - start
+    print(f"🧵 {len(items)} titulares de {story_count} historias en {elapsed:.2f} s")
+
+    # Calidad: pares de titulares de la misma historia agrupados juntos, y pares distintos mezclados
+    by_story = {}
+    for (story, _), cluster in zip(items, assigned):
+        by_story.setdefault(story, []).append(cluster)
+    together = sum(len(set(clusters)) == 1 for clusters in by_story.values())
+    owners = Counter(cluster for clusters in by_story.values() for cluster in set(clusters))
+    merged = sum(1 for count in owners.values() if count > 1)
+    print(f"   {together / story_count:.1%} de las historias en un solo grupo, {merged} grupos que mezclan historias")
+
+    # Sin LSH, cada titular nuevo se compara con todos los de la ventana
+    signatures = [minhash(shingles(headline['title'])) for _, headline in items[-200:]]
+    window = [minhash(shingles(headline['title'])) for _, headline in items[:-200]]
+    start = time.perf_counter()
+    for signature in signatures[:20]:
+        max(similarity(signature, other) for other in window)
+    brute = (time.perf_counter() - start) / 20
+    print(f"   comparando con toda la ventana ({len(window)} titulares): {brute * 1e6:.0f} µs por titular")
+    return {'stories': elapsed * 1000}
+
+
+class UploadHandler(StubHandler):
+    """Servidor WebDAV de prueba: guarda lo que recibe por PUT, leyéndolo al ancho de banda indicado"""
+
+    def do_PUT(self):
+        time.sleep(self.server.latencies.get('PUT', 0))
+        remaining = int(self.headers.get('Content-Length', 0))
+        chunks = []
+        while remaining:
+            chunk = self.rfile.read(min(remaining, 16 * 1024))
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            time.sleep(len(chunk) / self.server.bandwidth)
+        body = b''.join(chunks)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        with self.server.lock:
+            self.server.pages[self.path] = body
+            self.server.statuses['PUT'] += 1
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def bench_uploads(bandwidth=1024 * 1024, latency=0.05):
+    """Compara subir todos los archivos uno tras otro, como hacían los workflows, con UploadManager"""
+    all_headlines, data_articles = synthetic_results(40, 10)
+    stories = [all_headlines[i::40][:3] for i in range(5)]
+    with tempfile.TemporaryDirectory() as directory:
+        output_sinks = [sinks.StaticSiteSink(os.path.join(directory, 'sitio')),
+                        sinks.FeedSink(os.path.join(directory, 'titulares.rss'), 'rss')]
+        artifacts = sinks.write_all(output_sinks, all_headlines, data_articles, stories)
+        size = sum(os.path.getsize(path) for path in artifacts)
+        server, base_url = start_stub_server({}, {'PUT': latency}, handler=UploadHandler)
+        server.bandwidth = bandwidth
+        print(f"📦 {len(artifacts)} archivos, {size // 1024} KB; servidor a {bandwidth // 1024} KB/s y {latency * 1000:.0f} ms por petición")
+        try:
+            # Como antes: todo, sin comprimir y esperando a cada subida
+            start = time.perf_counter()
+            with requests.Session() as session:
+                for path in artifacts:
+                    with open(path, 'rb') as f:
+                        session.put(f"{base_url}/antes/{os.path.relpath(path, directory)}", data=f.read()).raise_for_status()
+            naive = time.perf_counter() - start
+            print(f"🐢 En serie: {naive:.2f} s bloqueando la ejecución, {size // 1024} KB enviados")
+
+            state_path = os.path.join(directory, 'subidas.json')
+            for run in (1, 2):
+                if run == 2:
+                    # Segunda ejecución: solo cambia la página (nueva hora), el resto es idéntico
+                    sinks.HtmlSink(os.path.join(directory, 'sitio', 'index.html')).write(all_headlines, data_articles, stories)
+                manager = UploadManager(WebDavUploader(f"{base_url}/ahora", compress=True), state_path, root=directory)
+                start = time.perf_counter()
+                manager.submit(artifacts)
+                blocked = time.perf_counter() - start
+                stats = manager.close()
+                total = time.perf_counter() - start
+                print(f"⚡ Ejecución {run}: {blocked * 1000:.1f} ms bloqueando, {total:.2f} s en segundo plano; "
+                      f"{stats['uploaded']} subidos ({stats['bytes_sent'] // 1024} KB enviados), {stats['unchanged']} sin cambios")
+
+            same = all(server.pages.get(f"/ahora/{os.path.relpath(path, directory)}") == open(path, 'rb').read()
+                       for path in artifacts)
+            print(f"🔎 Contenido en el servidor igual al local: {same}")
+        finally:
+            server.shutdown()
+
+
+def scan_and_clean(directory, now):
+    """La limpieza de antes: listar el directorio y sacar la fecha del nombre de cada página"""
+    for filename in os.listdir(directory):
+        if filename.startswith('titulares_') and filename.endswith('.html'):
+            try:
+                date_str = filename.split('_')[1] + '_' + filename.split('_')[2].split('.')[0]
+                if (now - datetime.strptime(date_str, '%Y%m%d_%H%M%S')).days > 2:
+                    os.remove(os.path.join(directory, filename))
+            except ValueError:
+                continue
+
+
+def bench_retention(sizes=(100, 1000, 10000), other_files=5000, runs=20):
+    """Coste de limpiar en cada ejecución con el índice frente a listar el directorio, según lo que se acumula"""
+    start_time = datetime(2025, 6, 20)
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            # size páginas de un minuto cada una y otros archivos que no son páginas (feeds, archivos...)
+            for n in range(size):
+                with open(os.path.join(directory, f"titulares_{start_time + timedelta(minutes=n):%Y%m%d_%H%M%S}.html"), 'w') as f:
+                    f.write('x')
+            for n in range(other_files):
+                open(os.path.join(directory, f'otro_{n}.json'), 'w').close()
+            # Crear el índice una vez (la única que se lista el directorio)
+            OutputDirectory(directory, RetentionPolicy(max_files=size)).close()
+
+            now = start_time + timedelta(minutes=size)
+            start = time.perf_counter()
+            for _ in range(runs):
+                scan_and_clean(directory, now)
+            scan = (time.perf_counter() - start) / runs
+
+            start = time.perf_counter()
+            for n in range(runs):
+                path = os.path.join(directory, f"titulares_{now + timedelta(minutes=n):%Y%m%d_%H%M%S}.html")
+                with open(path, 'w') as f:
+                    f.write('x')
+                # Como en cada ejecución: cargar el índice, anotar la página nueva y retirar la más antigua
+                with OutputDirectory(directory, RetentionPolicy(max_files=size)) as outputs:
+                    outputs.register(path, now=(now + timedelta(minutes=n)).timestamp())
+            indexed = (time.perf_counter() - start) / runs
+            print(f"📁 {size:6d} páginas y {other_files} archivos más: recorrer el directorio {scan * 1000:7.2f} ms, "
+                  f"índice {indexed * 1000:6.2f} ms por ejecución")
+
+
+class FlakyHandler(StubHandler):
+    """Servidor de prueba poco fiable: caído (responde 503 tras colgarse un rato) o con una cola de latencia,
+    en la que algunas peticiones al azar tardan mucho más que el resto"""
+
+    def do_GET(self):
+        if self.server.down:
+            time.sleep(self.server.hang)
+            with self.server.lock:
+                self.server.statuses[503] += 1
+            self.send_error(503)
+            return
+        with self.server.lock:
+            slow = self.server.rng.random() < self.server.slow_fraction
+        time.sleep(self.server.slow_latency if slow else self.server.latency)
+        super().do_GET()
+
+
+def scrape_flaky(sources, resilience, metrics=None):
+    """Una ejecución sin caché contra los servidores poco fiables: (segundos, titulares, artículos de datos)"""
+    session = headlines_scraper.create_session()
+    start = time.perf_counter()
+    all_headlines, data_articles = headlines_scraper.scrape_sources(sources, session, None, DateClassifier(date(2025, 6, 20)),
+                                                                    metrics or Metrics(), resilience)
+    elapsed = time.perf_counter() - start
+    session.close()
+    return elapsed, all_headlines, data_articles
+
+
+def bench_resilience(source_count=6, authors=6, slow_fraction=0.1, rounds=5):
+    """Compara ejecuciones contra periódicos lentos a ratos o caídos con y sin la capa de resiliencia"""
+    sources = synthetic_sources(source_count, authors)
+    pages = source_count * (authors + 1)
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        recording = load_recording(synthetic_recording(os.path.join(directory, 'grabacion'), 10, 5, sources))
+        # Un servidor por periódico: cada uno es un dominio distinto para los cortacircuitos
+        servers = []
+        urls = {}
+        for n, source in enumerate(sources):
+            own = [source.url] + [author.url for author in source.authors]
+            server, base_url = start_stub_server({replay_stub_path(url): recording[url][0] for url in own}, handler=FlakyHandler)
+            server.down, server.hang = False, 1.0
+            server.latency, server.slow_latency, server.slow_fraction = 0.03, 2.5, 0.0
+            server.rng = random.Random(n)
+            servers.append(server)
+            urls.update((url, base_url + replay_stub_path(url)) for url in own)
+        flaky = replay_sources(sources, urls)
+        state_path = os.path.join(directory, 'resiliencia.json')
+
+        def expected_links(all_headlines, data_articles):
+            return ([headline['link'] for headline in all_headlines],
+                    {source: [article['link'] for article in items] for source, items in data_articles.items()})
+
+        try:
+            # Una ejecución buena primero: deja latencias y últimos resultados buenos
+            warmup = Resilience(state_path)
+            _, *expected = scrape_flaky(flaky, warmup)
+            warmup.close()
+            warmup.save()
+            expected = expected_links(*expected)
+
+            # Cola de latencia: cada ejecución espera a su página más lenta, así que se miden varias
+            for server in servers:
+                server.slow_fraction = slow_fraction
+            print(f"🌩️ Cola de latencia: {slow_fraction:.0%} de las peticiones tardan 2,5 s en vez de 30 ms "
+                  f"({pages} páginas, {rounds} ejecuciones)")
+            for label, hedging in (('sin resiliencia', None), ('con resiliencia', True)):
+                metrics = Metrics()
+                elapsed = []
+                hedges = Counter()
+                for _ in range(rounds):
+                    resilience = Resilience(state_path) if hedging else None
+                    elapsed.append(scrape_flaky(flaky, resilience, metrics)[0])
+                    if resilience is not None:
+                        resilience.close()
+                        hedges.update(hedged=resilience.stats['hedged'], wins=resilience.stats['hedge_wins'])
+                fetches = sorted(span['duration_ms'] for span in metrics.spans if span['stage'] == 'fetch')
+                p95 = fetches[int(len(fetches) * 0.95)]
+                timings[f"tail_{'resilient' if hedging else 'plain'}"] = statistics.median(elapsed) * 1000
+                print(f"   {'🛡️' if hedging else '🐢'} {label:<16} ejecución: mediana {statistics.median(elapsed):5.2f} s, "
+                      f"máximo {max(elapsed):5.2f} s; página: p50 {fetches[len(fetches) // 2]:6.0f} ms, "
+                      f"p95 {p95:6.0f} ms, máx. {fetches[-1]:6.0f} ms")
+                if hedging:
+                    print(f"      {hedges['hedged']} peticiones duplicadas, {hedges['wins']} ganaron a la original")
+
+            # Caída: un periódico entero responde 503 después de colgarse
+            for server in servers:
+                server.slow_fraction = 0.0
+            servers[0].down = True
+            print(f"🌩️ Caída: un periódico responde 503 tras 1 s colgado ({pages} páginas)")
+            for label, resilience in (('sin resiliencia', None), ('con resiliencia', Resilience(state_path))):
+                elapsed, all_headlines, data_articles = scrape_flaky(flaky, resilience)
+                if resilience is not None:
+                    resilience.close()
+                found = len({headline['source'] for headline in all_headlines}) + sum(len(items) for items in data_articles.values())
+                stale = sum(1 for item in all_headlines + [a for items in data_articles.values() for a in items]
+                            if item.get('stale'))
+                complete = expected_links(all_headlines, data_articles) == expected
+                timings[f"outage_{'resilient' if resilience else 'plain'}"] = elapsed * 1000
+                print(f"   {'🛡️' if resilience else '🐢'} {label:<16} {elapsed:5.2f} s  {found}/{pages} páginas con resultado "
+                      f"({stale} elementos sin actualizar)  {'✅ completa' if complete else '❌ incompleta'}")
+                if resilience is not None:
+                    stats = resilience.stats
+                    print(f"      {stats['opened']} circuitos abiertos, {stats['short_circuited']} peticiones evitadas "
+                          f"o abandonadas, {stats['stale']} páginas servidas con lo último bueno")
+        finally:
+            for server in servers:
+                server.shutdown()
+    return timings
+
+
+class CountingHandler(StubHandler):
+    """Servidor de prueba que anota cuántas peticiones atiende a la vez, como máximo"""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        try:
+            super().do_GET()
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+
+def synthetic_article(n, paragraphs=12, padding_kb=60):
+    """Artículo de datos de prueba: entradilla, hora de publicación, párrafos, dos gráficos, un tuit y mucho script"""
+    words = ' '.join(f'palabra{i}' for i in range(40))
+    body = ''.join(f'<p>Párrafo {i} del artículo {n}: {words}.</p>' for i in range(paragraphs))
+    return (f'<html><head><meta property="og:description" content="Entradilla del artículo {n}">'
+            f'<meta property="article:published_time" content="2025-06-20T{n % 24:02d}:30:00+02:00">'
+            f'<script>{"x" * padding_kb * 1024}</script></head><body><article><h1>Artículo {n}</h1>{body}'
+            f'<iframe src="https://datawrapper.dwcdn.net/a{n}/"></iframe><div class="flourish-embed" data-src="v/{n}"></div>'
+            f'<blockquote class="twitter-tweet">tuit</blockquote><p>Corto</p></article></body></html>').encode('utf-8')
+
+
+def bench_enrichment(hosts=3, articles_per_host=20, latency=0.1):
+    """Enriquecimiento de artículos en segundo plano: en frío, con todo guardado y con los límites de bytes y tiempo"""
+    servers = []
+    data_articles = {}
+    for n in range(hosts):
+        pages = {f'/articulo/{i}': synthetic_article(n * articles_per_host + i) for i in range(articles_per_host)}
+        server, base_url = start_stub_server(pages, {path: latency for path in pages}, handler=CountingHandler)
+        server.active = server.peak = 0
+        servers.append(server)
+        data_articles[f'Periódico {n}'] = [{'title': f'Artículo {i}', 'link': f'{base_url}{path}', 'author': 'Autor'}
+                                           for i, path in enumerate(pages)]
+    total = hosts * articles_per_host
+    expected = extract_article(html_parsing.make_soup(synthetic_article(0)))
+    timings = {}
+
+    def fresh_articles():
+        return {source: [dict(article) for article in articles] for source, articles in data_articles.items()}
+
+    def run(store_path, limits=None):
+        session = headlines_scraper.create_session()
+        enricher = Enricher(session, store_path, limits)
+        articles = fresh_articles()
+        start = time.perf_counter()
+        enricher.start(articles)
+        started = time.perf_counter() - start
+        completed = sum(len(items) for items, _ in enricher.stream())
+        elapsed = time.perf_counter() - start
+        stats = enricher.close()
+        session.close()
+        enriched = [article for items in articles.values() for article in items if article.get('enrichment')]
+        return started, elapsed, completed, stats, enriched
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            # Referencia: seguir los enlaces uno detrás de otro
+            session = headlines_scraper.create_session()
+            start = time.perf_counter()
+            for article in (article for items in data_articles.values() for article in items):
+                extract_article(html_parsing.make_soup(session.get(article['link'], timeout=10).content))
+            serial = time.perf_counter() - start
+            session.close()
+            timings['serial'] = serial * 1000
+            print(f"🐢 En serie: {serial:.2f} s ({total} artículos en {hosts} dominios, {latency * 1000:.0f} ms cada uno)")
+
+            store_path = os.path.join(directory, 'articulos.sqlite3')
+            for server in servers:
+                server.peak = 0
+            started, elapsed, completed, stats, enriched = run(store_path)
+            timings['start'], timings['cold'] = started * 1000, elapsed * 1000
+            peak = max(server.peak for server in servers)
+            shown = ('charts', 'embeds', 'words', 'reading_minutes')
+            correct = all(article['enrichment'][field] == expected[field] for article in enriched for field in shown)
+            print(f"⚡ En frío: start() vuelve en {started * 1000:.1f} ms; {completed} artículos en {elapsed:.2f} s "
+                  f"(x{serial / elapsed:.1f}), {stats['bytes'] // 1024} KB, como mucho {peak} peticiones a la vez por dominio")
+            print(f"   Cada uno: {expected['words']} palabras, {expected['reading_minutes']} min de lectura, "
+                  f"{expected['charts']} gráficos, {expected['embeds']} inserciones  {'✅' if correct and len(enriched) == total else '❌'}")
+
+            requests_before = sum(sum(server.statuses.values()) for server in servers)
+            started, elapsed, completed, stats, enriched = run(store_path)
+            requests_after = sum(sum(server.statuses.values()) for server in servers)
+            timings['warm'] = elapsed * 1000
+            print(f"💽 Con todo guardado: {elapsed * 1000:.1f} ms, {stats['cached']} del almacén, "
+                  f"{requests_after - requests_before} peticiones, {len(enriched)}/{total} completos")
+
+            cap = 5 * len(synthetic_article(0))
+            _, elapsed, _, stats, enriched = run(os.path.join(directory, 'bytes.sqlite3'), Limits(max_bytes=cap))
+            print(f"📏 Máximo de {cap // 1024} KB: {stats['bytes'] // 1024} KB descargados, {len(enriched)} completos, "
+                  f"{stats['skipped']} para la próxima  {'✅' if stats['bytes'] <= cap else '❌'}")
+
+            for server in servers:
+                server.latencies = {path: 1.0 for path in server.pages}
+            limit = 0.5
+            _, elapsed, _, stats, enriched = run(os.path.join(directory, 'tiempo.sqlite3'), Limits(max_seconds=limit))
+            print(f"⏱️ Máximo de {limit} s con páginas de 1 s: termina en {elapsed:.2f} s, {len(enriched)} completos, "
+                  f"{stats['skipped']} para la próxima  {'✅' if elapsed < limit + 0.2 else '❌'}")
+    finally:
+        for server in servers:
+            server.shutdown()
+    return timings
+
+
+def author_archive_pages(article_ids, per_page):
+    """Páginas de archivo de un autor (rutas /autor/, /autor/2/...) con los artículos dados, el más reciente primero"""
+    pages = {}
+    for start in range(0, len(article_ids), per_page):
+        items = ''.join(f'<div class="{"archive-article-top-tit" if n == 0 else "archive-article-tit"}">'
+                        f'<a href="/datos/2025-06-20/articulo-{i}_{i}/">Artículo de datos {i}</a></div>'
+                        for n, i in enumerate(article_ids[start:start + per_page]))
+        page = start // per_page + 1
+        pages['/autor/' if page == 1 else f'/autor/{page}/'] = \
+            f'<html><body><nav><a href="/">Portada</a></nav>{items}</body></html>'.encode('utf-8')
+    return pages
+
+
+def bench_author_feeds(archive_size=200, per_page=10, count=20, latency=0.02):
+    """Últimos N artículos de un autor recorriendo su archivo: páginas descargadas en frío, sin novedades
+    y con pocas novedades, frente a recorrer el archivo entero cada vez"""
+    article_ids = list(range(archive_size, 0, -1))
+    server, base_url = start_stub_server(author_archive_pages(article_ids, per_page))
+    server.latencies = {path: latency for path in server.pages}
+    template = get_source('El Confidencial')
+    source = dataclasses.replace(template, base_url=base_url, url=base_url + '/',
+                                 authors=[AuthorPage(f'{base_url}/autor/', 'Autora de datos')])
+    author = source.authors[0]
+    timings = {}
+
+    def requests_served():
+        return sum(server.statuses.values())
+
+    def crawl(archive, cache, max_pages=author_feeds.MAX_PAGES):
+        session = headlines_scraper.create_session()
+        fetch = lambda url: headlines_scraper.fetch_page(url, session, cache)
+        before = requests_served()
+        start = time.perf_counter()
+        found = author_feeds.crawl_author(source, author, count, archive.known(author.url), fetch, max_pages=max_pages)
+        latest = author_feeds.latest_articles(archive, [source], count, {author.url: found})[source.name]
+        elapsed = time.perf_counter() - start
+        session.close()
+        if cache is not None:
+            cache.save()
+        return elapsed, requests_served() - before, found, latest
+
+    def expected(ids):
+        return [f'Artículo de datos {i}' for i in ids[:count]]
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            # Referencia: recorrer el archivo entero en cada ejecución para saber qué hay de nuevo
+            session = headlines_scraper.create_session()
+            start = time.perf_counter()
+            pages = 0
+            for page in range(1, archive_size // per_page + 1):
+                url = author_feeds.archive_page_url(source, author, page)
+                author_feeds.extract_article_list(source, session.get(url, timeout=10).content, author.name)
+                pages += 1
+            naive = time.perf_counter() - start
+            session.close()
+            timings['naive'] = naive * 1000
+            print(f"🐢 Archivo entero: {pages} páginas en {naive * 1000:.0f} ms ({archive_size} artículos)")
+
+            cache = HttpCache(os.path.join(directory, 'cache'), max_age=0)
+            with author_feeds.AuthorArchive(os.path.join(directory, 'autores.sqlite3')) as archive:
+                elapsed, served, found, latest = crawl(archive, cache)
+                timings['cold'] = elapsed * 1000
+                correct = [article['title'] for article in latest] == expected(article_ids)
+                print(f"⚡ En frío: {rendering.plural(served, 'página', 'páginas')} en {elapsed * 1000:.0f} ms para los {count} últimos "
+                      f"(x{naive / elapsed:.1f})  {'✅' if correct else '❌'}")
+
+                statuses = dict(server.statuses)
+                elapsed, served, found, latest = crawl(archive, cache)
+                timings['unchanged'] = elapsed * 1000
+                not_modified = server.statuses[304] - statuses.get(304, 0)
+                correct = not found and [article['title'] for article in latest] == expected(article_ids)
+                print(f"😴 Sin novedades: {rendering.plural(served, 'petición', 'peticiones')} ({not_modified} sin cambios) en {elapsed * 1000:.0f} ms, "
+                      f"{len(found)} nuevos  {'✅' if correct else '❌'}")
+
+                for new in (3, per_page + 5):
+                    article_ids = list(range(archive_size + new, archive_size, -1)) + article_ids
+                    archive_size += new
+                    server.pages = author_archive_pages(article_ids, per_page)
+                    server.latencies = {path: latency for path in server.pages}
+                    elapsed, served, found, latest = crawl(archive, cache)
+                    timings[f'new_{new}'] = elapsed * 1000
+                    correct = len(found) == new and [article['title'] for article in latest] == expected(article_ids)
+                    print(f"🆕 {new} nuevos: {rendering.plural(served, 'página', 'páginas')} en {elapsed * 1000:.0f} ms  {'✅' if correct else '❌'}")
+    finally:
+        server.shutdown()
+    return timings
+
+
+def synthetic_feed(kind, source, items):
+    """Feed de prueba de un periódico: RSS, Atom o sitemap de noticias con items artículos, el más reciente primero"""
+    entries = []
+    for n in range(items):
+        link = f'{source.base_url}/espana/noticia-{n}.html'
+        title = f'Titular número {n} de {source.name}'
+        summary = f'Resumen del artículo {n}: ' + ' '.join(f'palabra{i}' for i in range(60))
+        if kind == 'rss':
+            entries.append(f'<item><title>{title}</title><link>{link}</link><description>{summary}</description>'
+                           f'<pubDate>Fri, 20 Jun 2025 {n % 24:02d}:15:00 +0200</pubDate></item>')
+        elif kind == 'atom':
+            entries.append(f'<entry><title>{title}</title><link rel="alternate" href="{link}"/><summary>{summary}</summary>'
+                           f'<published>2025-06-20T{n % 24:02d}:15:00+02:00</published></entry>')
+        else:
+            entries.append(f'<url><loc>{link}</loc><news:news><news:publication><news:name>{source.name}</news:name>'
+                           f'<news:language>es</news:language></news:publication>'
+                           f'<news:publication_date>2025-06-20T{n % 24:02d}:15:00+02:00</news:publication_date>'
+                           f'<news:title>{title}</news:title></news:news></url>')
+    if kind == 'rss':
+        document = f'<rss version="2.0"><channel><title>{source.name}</title><link>{source.url}</link>{"".join(entries)}</channel></rss>'
+    elif kind == 'atom':
+        document = f'<feed xmlns="http://www.w3.org/2005/Atom"><title>{source.name}</title>{"".join(entries)}</feed>'
+    else:
+        document = ('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                    'xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">' + ''.join(entries) + '</urlset>')
+    return ('<?xml version="1.0" encoding="UTF-8"?>' + document).encode('utf-8')
+
+
+def synthetic_feed_recording(directory, sources, items=100, padding_kb=300):
+    """Graba portadas sintéticas (con enlaces sin fecha) y el feed de cada periódico con los mismos titulares"""
+    recorder = Recorder(directory)
+    filler = '<div class="relleno"><p>%s</p></div>' % ('x' * 1000)
+    kinds = ('rss', 'atom', 'sitemap')
+    for n, source in enumerate(sources):
+        headlines = ''.join(f'<h2><a href="/espana/noticia-{i}.html">Titular número {i} de {source.name}</a></h2>'
+                            for i in range(40))
+        recorder.record(source.url, f'<html><body>{headlines}{filler * padding_kb}</body></html>'.encode('utf-8'), 'text/html')
+        recorder.record(source.feed_url, synthetic_feed(kinds[n % len(kinds)], source, items), 'application/xml')
+    recorder.save()
+    return directory
+
+
+def bench_feeds(repeat=5):
+    """Titulares desde el feed frente a desde la portada HTML: bytes, tiempo, fechas exactas y vuelta a la portada
+    cuando el feed falla, sobre la última grabación con feeds de fixtures/ o una sintética"""
+    directory = latest_recording()
+    recorded = load_recording(directory) if directory else {}
+    sources = [source for source in SOURCES if source.feed_url in recorded and source.url in recorded]
+    with tempfile.TemporaryDirectory() as tmp:
+        if not sources:
+            # Sin feeds grabados: uno de cada formato (El Confidencial, con un sitemap de noticias ficticio)
+            sources = [source if source.feed_url else
+                       dataclasses.replace(source, feed_url=f'{source.base_url}/sitemap_noticias.xml') for source in SOURCES]
+            directory = synthetic_feed_recording(os.path.join(tmp, 'grabacion'), sources)
+            name = 'sintética'
+        else:
+            name = os.path.basename(directory)
+        server, urls = start_replay_server(directory)
+        replayed = replay_sources(sources, urls)
+        session = headlines_scraper.create_session()
+        dates = DateClassifier(date(2025, 6, 20))
+        timings = {}
+
+        def html_headlines(source):
+            content = headlines_scraper.fetch_page(source.url, session).content
+            headlines = headlines_scraper.extract_headlines(source, html_parsing.make_soup(content))
+            return headlines_scraper.add_publication_dates(headlines, dates), len(content)
+
+        def feed_headlines(source):
+            content = headlines_scraper.fetch_page(source.feed_url, session).content
+            return feed_parsing.extract_feed_headlines(source, content), len(content)
+
+        print(f"🎞️ Grabación {name}")
+        try:
+            for source in replayed:
+                samples = {'html': [], 'feed': []}
+                for _ in range(repeat):
+                    for mode, extract in (('html', html_headlines), ('feed', feed_headlines)):
+                        start = time.perf_counter()
+                        found, size = extract(source)
+                        samples[mode].append((time.perf_counter() - start) * 1000)
+                        if mode == 'html':
+                            html_found, html_size = found, size
+                        else:
+                            feed_found, feed_size = found, size
+                html_ms, feed_ms = statistics.median(samples['html']), statistics.median(samples['feed'])
+                timings[f'{source.name} html'], timings[f'{source.name} feed'] = html_ms, feed_ms
+                same = [(h['title'], h['link']) for h in html_found] == [(h['title'], h['link']) for h in feed_found]
+                dated = lambda headlines: sum(1 for headline in headlines if headline['published'])
+                print(f"📰 {source.name}:")
+                print(f"   portada {html_size // 1024:6d} KB {html_ms:8.2f} ms, {dated(html_found)}/{len(html_found)} con fecha")
+                print(f"   feed    {feed_size // 1024:6d} KB {feed_ms:8.2f} ms, {dated(feed_found)}/{len(feed_found)} con fecha "
+                      f"(x{html_ms / feed_ms:.1f}, {100 * (1 - feed_size / html_size):.0f} % menos bytes)  "
+                      f"mismos titulares que la portada: {'sí' if same else 'no'}")
+
+            # Un feed caído o roto no deja al periódico sin titulares: se vuelve a la portada
+            broken = [dataclasses.replace(source, feed_url=source.url + 'no-existe.xml') for source in replayed]
+            fallback = [headlines_scraper.get_headlines(source, session, dates=dates) for source in broken]
+            expected = [html_headlines(source)[0] for source in replayed]
+            print(f"🛟 Con los feeds caídos: {sum(map(len, fallback))} titulares desde las portadas  "
+                  f"{'✅' if fallback == expected else '❌'}")
+        finally:
+            session.close()
+            server.shutdown()
+    return timings
+
+
+def redesigned_front_page(source, headline_count=40, padding_kb=200, primary=False):
+    """Portada de prueba: titulares en <h2> (o, con primary, con la maquetación del primer selector del periódico),
+    mucho contenido y un pie con más enlaces en <h3>"""
+    if primary:
+        headline_class = source.selectors[0].split()[0].lstrip('.')
+        headlines = ''.join(f'<div class="{headline_class}"><a href="/espana/noticia-{n}.html">Titular número {n} de '
+                            f'{source.name}</a></div>' for n in range(headline_count))
+    else:
+        headlines = ''.join(f'<article><h2><a href="/espana/noticia-{n}.html">Titular número {n} de {source.name}</a></h2>'
+                            f'<p>Entradilla {n}</p></article>' for n in range(headline_count))
+    filler = '<div class="relleno"><p>%s</p></div>' % ('x' * 1000)
+    footer = ''.join(f'<h3><a href="/seccion-{n}/">Sección {n} del pie</a></h3>' for n in range(20))
+    return f'<html><body><nav><a href="/">Portada</a></nav>{headlines}{filler * padding_kb}{footer}</body></html>'.encode('utf-8')
+
+
+def bench_selector_health(repeat=10, healthy_runs=8, drifted_runs=5):
+    """Cascada de selectores en su orden frente a la reordenada por su salud, con el principal roto por un
+    rediseño (resultados iguales, selectores evaluados y tiempo), atribución de cada titular y aviso del cambio"""
+    source = get_source('El Mundo')
+    timings = {}
+    content = redesigned_front_page(source)
+    for backend in html_parsing.available_backends():
+        soup = html_parsing.make_soup(content, backend=backend)
+        health = SelectorHealth(None)
+        for _ in range(MIN_RUNS):
+            # Las primeras ejecuciones prueban la cascada entera, en su orden
+            selector_set, report = headlines_scraper.ranked_selectors(health, source, 'portada', source.selector_set)
+            headlines_scraper.extract_headlines(source, soup, selector_set, report)
+            health.record(source.name, 'portada', source.selector_set, report, 0.0)
+        ranked, _ = headlines_scraper.ranked_selectors(health, source, 'portada', source.selector_set)
+        samples = {}
+        found = {}
+        reports = {}
+        for mode, selector_set in (('orden fijo', source.selector_set), ('por salud', ranked)):
+            samples[mode] = []
+            for _ in range(repeat):
+                reports[mode] = html_parsing.SelectorReport(selector_set.selectors)
+                start = time.perf_counter()
+                found[mode] = headlines_scraper.extract_headlines(source, soup, selector_set, reports[mode])
+                samples[mode].append((time.perf_counter() - start) * 1000)
+        static_ms, ranked_ms = statistics.median(samples['orden fijo']), statistics.median(samples['por salud'])
+        timings[f'{backend} fijo'], timings[f'{backend} salud'] = static_ms, ranked_ms
+        print(f"🧭 {backend}: orden fijo {static_ms:7.2f} ms ({len(reports['orden fijo'].evaluated())} selectores evaluados), "
+              f"por salud {ranked_ms:7.2f} ms ({len(reports['por salud'].evaluated())})  x{static_ms / ranked_ms:.1f}  "
+              f"iguales: {'✅' if found['orden fijo'] == found['por salud'] else '❌'}")
+    print(f"   Orden por salud: {', '.join(ranked.selectors)}")
+    print(f"   Titulares por selector: {dict(Counter(reports['por salud'].origins))}")
+
+    # Rediseño a mitad: el principal funciona unas ejecuciones y luego deja de casar
+    health = SelectorHealth(None)
+    pages = [redesigned_front_page(source, primary=True)] * healthy_runs + [content] * drifted_runs
+    flagged = None
+    for run, page in enumerate(pages, 1):
+        soup = html_parsing.make_soup(page)
+        selector_set, report = headlines_scraper.ranked_selectors(health, source, 'portada', source.selector_set)
+        headlines_scraper.extract_headlines(source, soup, selector_set, report)
+        if health.record(source.name, 'portada', source.selector_set, report, 0.0) and flagged is None:
+            flagged = run
+    print(f"🚨 Rediseño en la ejecución {healthy_runs + 1}: aviso en la ejecución {flagged}; "
+          f"después se empieza por {selector_set.selectors[0]}  "
+          f"{'✅' if flagged == healthy_runs + DRIFT_MISSES and selector_set.selectors[0] != source.selectors[0] else '❌'}")
+    return timings
+
+
+def measure_startup(command, runs=7):
+    """Arranque en frío de una orden de cli.py en un intérprete nuevo: (mediana en ms, módulos de LAZY_MODULES importados)"""
+    # Se mide dentro del proceso hijo, para que el arranque del propio intérprete no meta ruido
+    probe = ("import sys, time; start = time.perf_counter(); import cli; cli.load(sys.argv[1]); "
+             "elapsed = (time.perf_counter() - start) * 1000; "
+             "print(elapsed, ','.join(name for name in sys.argv[2:] if name in sys.modules))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', probe, command, *LAZY_MODULES], cwd=here,
+                                capture_output=True, text=True, check=True).stdout.split()
+        samples.append(float(output[0]))
+        loaded.update(output[1].split(',') if len(output) > 1 else ())
+    return statistics.median(samples), sorted(loaded)
+
+
+def bench_startup(runs=7):
+    """Arranque en frío de cada orden de cli.py: lo que tarda en importar lo que necesita en un intérprete nuevo"""
+    timings = {}
+    for command, budget in STARTUP_BUDGET_MS.items():
+        elapsed, loaded = measure_startup(command, runs)
+        loaded = ','.join(loaded)
+        ok = elapsed <= budget and not loaded
+        timings[command] = elapsed
+        print(f"   {'✅' if ok else '❌'} {command:<9} {elapsed:6.1f} ms (presupuesto {budget} ms, mediana de {runs})"
+              + (f"  importa antes de tiempo: {loaded}" if loaded else ""))
+        if not ok:
+            BUDGET_FAILURES.append(f"startup/{command}")
+    return timings
+
+
+def compare_with_baseline(name, timings, baselines, threshold):
+    """Compara las medidas de un benchmark con su referencia guardada y devuelve las etapas que han empeorado"""
+    regressions = []
+    for stage, elapsed in timings.items():
+        baseline = baselines.get(name, {}).get(stage)
+        if not baseline:
+            continue
+        change = elapsed / baseline - 1
+        regressed = change > threshold and elapsed - baseline > REGRESSION_MIN_MS
+        if regressed:
+            regressions.append(f"{name}/{stage}")
+        print(f"   {'❌' if regressed else '✅'} {stage:<8} {baseline:8.2f} ms -> {elapsed:8.2f} ms ({change:+.0%})")
+    return regressions
+
+
+BENCHMARKS = {
+    'concurrent': bench_concurrent_fetch,
+    'connections': bench_connection_reuse,
+    'cache': bench_http_cache,
+    'parsers': bench_parsers,
+    'selectors': bench_selectors,
+    'render': bench_render,
+    'history': bench_history,
+    'dates': bench_article_dates,
+    'pipeline': bench_pipeline,
+    'sharding': bench_sharding,
+    'streaming': bench_streaming,
+    'results': bench_results,
+    'stories': bench_stories,
+    'uploads': bench_uploads,
+    'retention': bench_retention,
+    'resilience': bench_resilience,
+    'enrichment': bench_enrichment,
+    'authors': bench_author_feeds,
+    'feeds': bench_feeds,
+    'selector_health': bench_selector_health,
+    'startup': bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del extractor de titulares")
+    parser.add_argument('names', nargs='*', help=f"Benchmarks a ejecutar: {', '.join(BENCHMARKS)} (por defecto, todos)")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Archivo con las medidas de referencia")
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar las medidas de esta ejecución como referencia")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Empeoramiento relativo a partir del cual una medida es una regresión (0.25 = 25 %%)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmarks desconocidos: {', '.join(unknown)}")
+
+    try:
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+        if not args.save_baseline:
+            print(f"⚠️ Sin referencia en {args.baseline}: las medidas no se comparan con nada")
+
+    # Los benchmarks que devuelven medidas ({etapa: ms}) se comparan con su referencia
+    regressions = []
+    for name in args.names or BENCHMARKS:
+        print(f"\n⏱️ Benchmark: {name}")
+        timings = BENCHMARKS[name]()
+        if not timings:
+            continue
+        if args.save_baseline:
+            baselines[name] = timings
+        elif name in baselines:
+            print(f"📏 Frente a la referencia (umbral {args.threshold:.0%}):")
+            regressions.extend(compare_with_baseline(name, timings, baselines, args.threshold))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\n💾 Referencia guardada en {args.baseline}")
+    regressions.extend(BUDGET_FAILURES)
+    if regressions:
+        print(f"\n❌ Regresiones: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Detección de cambios entre ejecuciones del extractor de titulares.
+Guarda huellas compactas (hashes del enlace y del título normalizados) de la
+última ejecución para marcar cada titular y artículo de datos como nuevo,
+movido o sin cambios, y contar los que han desaparecido de cada sección.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+from story_clusters import canonical_url
+
+STATE_FILE = '.cambios_titulares.json'
+MAX_SEEN = 20000  # Enlaces recordados para saber si algo ya había salido antes
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_title(title):
+    """Normaliza un título para compararlo: espacios colapsados y en minúsculas"""
+    return WHITESPACE.sub(' ', title).strip().lower()
+
+
+def fingerprint(text):
+    """Huella de 64 bits en hexadecimal"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def section_items(all_headlines, data_articles):
+    """Agrupa titulares y artículos de datos por sección ('periódico/titulares', 'periódico/datos')"""
+    sections = OrderedDict()
+    for headline in all_headlines:
+        sections.setdefault(f"{headline['source']}/titulares", []).append(headline)
+    for source, articles in data_articles.items():
+        sections[f"{source}/datos"] = list(articles)
+    return sections
+
+
+class ChangeTracker:
+    """Compara cada ejecución con la anterior a partir de huellas guardadas en disco"""
+
+    def __init__(self, path=STATE_FILE, max_seen=MAX_SEEN):
+        self.path = path
+        self.max_seen = max_seen
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.sections = state.get('sections', {})
+        self.seen = OrderedDict.fromkeys(state.get('seen', []))
+        self.last_output = state.get('last_output')
+        self.pending = None
+
+    def compare(self, all_headlines, data_articles):
+        """Marca cada elemento con 'change' (new, moved o unchanged) y devuelve un resumen de cambios por sección"""
+        summary = OrderedDict()
+        pending = {}
+        for section, items in section_items(all_headlines, data_articles).items():
+            previous = {link_fp: (position, title_fp) for position, (link_fp, title_fp) in enumerate(self.sections.get(section, []))}
+            current = []
+            counts = {'new': 0, 'moved': 0, 'unchanged': 0}
+            for position, item in enumerate(items):
+                link_fp = fingerprint(canonical_url(item['link']))
+                title_fp = fingerprint(normalize_title(item['title']))
+                if link_fp not in self.seen and link_fp not in previous:
+                    change = 'new'
+                elif previous.get(link_fp) == (position, title_fp):
+                    change = 'unchanged'
+                else:
+                    # Ya había salido, pero en otra posición, en otra sección o con otro título
+                    change = 'moved'
+                item['change'] = change
+                counts[change] += 1
+                current.append([link_fp, title_fp])
+            current_links = {link_fp for link_fp, _ in current}
+            dropped = sum(1 for link_fp in previous if link_fp not in current_links)
+            summary[section] = dict(counts, dropped=dropped, changed=bool(counts['new'] or counts['moved'] or dropped))
+            pending[section] = current
+
+        # Las secciones que esta vez no han salido (p. ej. un periódico caído) también cuentan como cambio
+        for section, previous in self.sections.items():
+            if section not in pending:
+                summary[section] = {'new': 0, 'moved': 0, 'unchanged': 0, 'dropped': len(previous), 'changed': bool(previous)}
+        self.pending = pending
+        return summary
+
+    def commit(self, output=None):
+        """Da por buena la última comparación y la guarda como referencia para la siguiente ejecución"""
+        if self.pending is not None:
+            self.sections = self.pending
+            for items in self.pending.values():
+                for link_fp, _ in items:
+                    self.seen.pop(link_fp, None)
+                    self.seen[link_fp] = None
+            while len(self.seen) > self.max_seen:
+                self.seen.popitem(last=False)
+            self.pending = None
+        if output:
+            self.last_output = output
+        self.save()
+
+    def save(self):
+        """Escribe el estado en disco de forma atómica"""
+        state = {'sections': self.sections, 'seen': list(self.seen), 'last_output': self.last_output}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Punto de entrada del extractor de titulares.
+Cada orden importa solo el módulo que la implementa, así que limpiar el
+directorio de salida, consultar el histórico o volver a generar la página no
+cargan requests ni los parsers HTML. Sin orden, extrae los titulares como
+siempre.
+
+    python3 cli.py [scrape]        Descarga los periódicos y genera la página
+    python3 cli.py daemon [...]    Se queda en marcha y mantiene la página al día
+    python3 cli.py render [...]    Vuelve a generar la página con lo guardado, sin descargar nada
+    python3 cli.py clean [...]     Aplica la política de conservación al directorio de salida
+    python3 cli.py query ...       Consultas al histórico (leads, first-seen)
+    python3 cli.py selectors       Salud de los selectores de cada periódico
+    python3 cli.py bench [...]     Benchmarks contra servidores locales
+"""
+
+import sys
+from importlib import import_module
+
+# Orden -> (módulo con su main(argv), argumentos que se anteponen, descripción)
+COMMANDS = {
+    'scrape': ('headlines_scraper', [], "Descarga los periódicos y genera la página (por defecto)"),
+    'daemon': ('daemon', [], "Se queda en marcha consultando cada página a su ritmo y mantiene la página al día"),
+    'render': ('rendering', [], "Vuelve a generar la página con lo guardado, sin descargar nada"),
+    'clean': ('output_dir', ['clean'], "Aplica la política de conservación al directorio de salida"),
+    'query': ('history_store', [], "Consultas al histórico de titulares"),
+    'selectors': ('selector_health', [], "Salud de los selectores de cada periódico"),
+    'bench': ('benchmarks', [], "Benchmarks contra servidores HTTP locales"),
+}
+DEFAULT_COMMAND = 'scrape'
+
+
+def load(command):
+    """Importa el módulo de una orden (y con él, solo lo que esa orden necesita)"""
+    return import_module(COMMANDS[command][0])
+
+
+def usage():
+    lines = ["uso: cli.py [orden] [argumentos]", "", "órdenes:"]
+    for command, (_, _, description) in COMMANDS.items():
+        lines.append(f"  {command:<11}{description}")
+    lines.append("")
+    lines.append("Sin orden se ejecuta scrape. 'cli.py <orden> --help' muestra los argumentos de cada una.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    if argv and argv[0] in COMMANDS:
+        command, argv = argv[0], argv[1:]
+    else:
+        command = DEFAULT_COMMAND
+    _, prefix, _ = COMMANDS[command]
+    return load(command).main(prefix + argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
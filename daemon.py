@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Modo residente del extractor de titulares.
+En lugar de arrancar una vez al día, se queda en marcha con la sesión HTTP y la
+caché calientes y consulta cada portada y cada página de autor con su propio
+intervalo, que se acorta cuando la página cambia y se alarga cuando no. La
+página HTML se regenera solo cuando algo ha cambiado.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from urllib.parse import urlparse
+
+import headlines_scraper
+import sinks
+from article_dates import DateClassifier
+from change_tracking import ChangeTracker, fingerprint
+import feed_parsing
+from history_store import HistoryStore
+from http_cache import HttpCache
+from metrics import Metrics
+from resilience import Resilience
+from sources import SOURCES, load_sources
+from story_clusters import StoryIndex, cluster_stories
+from uploads import UploadManager
+
+OUTPUT_FILE = 'titulares.html'
+STATE_FILE = '.daemon_titulares.json'
+
+# Intervalos (mínimo, inicial, máximo) en segundos
+FRONT_PAGE_INTERVALS = (120, 300, 1800)
+AUTHOR_PAGE_INTERVALS = (1800, 3 * 3600, 12 * 3600)
+SPEEDUP = 0.5  # Si la página ha cambiado, el intervalo se multiplica por esto
+SLOWDOWN = 1.5  # Si no ha cambiado, por esto
+JITTER = 0.1  # Cada espera varía al azar un ±10 % para no consultar todo a la vez
+HOST_MIN_INTERVAL = 2.0  # Segundos como mínimo entre dos peticiones al mismo dominio
+STARTUP_SPREAD = 10.0  # Al arrancar, las primeras consultas se reparten en estos segundos
+MAX_WORKERS = 8
+
+
+class PollTask:
+    """Una página (portada o página de autor) que se consulta periódicamente"""
+
+    def __init__(self, key, label, url, func, args, intervals):
+        self.key = key
+        self.label = label
+        self.url = url
+        self.func = func
+        self.args = args
+        self.min_interval, self.interval, self.max_interval = intervals
+        self.fingerprint = None
+        self.result = None
+        self.polls = 0
+        self.changes = 0
+
+    def run(self, *extra_args):
+        return self.func(*self.args, *extra_args)
+
+    def update(self, result):
+        """Guarda el resultado de una consulta, adapta el intervalo y devuelve si ha cambiado"""
+        self.polls += 1
+        if result is None or result == []:
+            # Un fallo no dice nada sobre la frecuencia de cambio: se conserva lo anterior y se reintenta más tarde
+            self.interval = min(self.max_interval, self.interval * SLOWDOWN)
+            return False
+        items = result if isinstance(result, list) else [result]
+        current = fingerprint(json.dumps([(item['title'], item['link']) for item in items], ensure_ascii=False))
+        changed = current != self.fingerprint
+        if changed:
+            self.changes += 1
+            self.interval = max(self.min_interval, self.interval * SPEEDUP)
+        else:
+            self.interval = min(self.max_interval, self.interval * SLOWDOWN)
+        self.fingerprint = current
+        self.result = result
+        return changed
+
+    def next_delay(self, rng):
+        return self.interval * rng.uniform(1 - JITTER, 1 + JITTER)
+
+
+class HostRateLimiter:
+    """Reparte las peticiones a un mismo dominio con una separación mínima"""
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self.next_allowed = {}
+
+    def reserve(self, url, now):
+        """Devuelve cuándo puede salir una petición a ese dominio; si es ya, reserva el turno"""
+        host = urlparse(url).netloc
+        allowed = self.next_allowed.get(host, now)
+        if allowed <= now:
+            self.next_allowed[host] = now + self.min_interval
+        return allowed
+
+
+class Daemon:
+    """Planificador residente: consulta cada página a su ritmo y regenera la página HTML al cambiar algo"""
+
+    def __init__(self, sources, output=OUTPUT_FILE, state_path=STATE_FILE, max_workers=MAX_WORKERS, seed=None):
+        self.sources = sources
+        self.output = output
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.rng = random.Random(seed)
+        self.session = headlines_scraper.get_session()
+        # Sin frescura: cada consulta pregunta al servidor, aunque casi siempre con un 304 barato
+        self.cache = HttpCache(max_age=0)
+        self.tracker = ChangeTracker()
+        self.limiter = HostRateLimiter()
+        # Un dominio caído se deja en paz un rato y sus secciones siguen con lo último bueno, marcado
+        self.resilience = Resilience()
+        self.metrics = Metrics()
+        self.fragments = {}  # Secciones ya renderizadas, para no rehacer las que no cambian
+        self.stories = StoryIndex()  # Ventana móvil de titulares: las historias se mantienen entre publicaciones
+        self.sinks = sinks.sinks_from_env(html=sinks.HtmlSink(output, self.fragments))
+        # Las subidas de una publicación corren mientras siguen las consultas
+        self.uploads = UploadManager.from_env()
+        self.stop_event = threading.Event()
+        self.started_at = time.monotonic()
+        self.tasks = self.build_tasks()
+        self.load_state()
+
+    def build_tasks(self):
+        tasks = []
+        for source in self.sources:
+            tasks.append(PollTask(('front', source.name), source.name, source.url, headlines_scraper.get_headlines,
+                                  (source, self.session, self.cache), FRONT_PAGE_INTERVALS))
+            for author in source.authors:
+                tasks.append(PollTask(('author', source.name, author.url), f"{source.name} / {author.name}", author.url,
+                                      headlines_scraper.get_latest_article,
+                                      (source, author.url, author.name, self.session, self.cache), AUTHOR_PAGE_INTERVALS))
+        return tasks
+
+    def load_state(self):
+        """Recupera los intervalos aprendidos en la ejecución anterior"""
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                intervals = json.load(f).get('intervals', {})
+        except (OSError, ValueError):
+            return
+        for task in self.tasks:
+            interval = intervals.get(json.dumps(task.key))
+            if interval:
+                task.interval = min(task.max_interval, max(task.min_interval, interval))
+
+    def save_state(self):
+        state = {'saved_at': datetime.now().isoformat(timespec='seconds'),
+                 'intervals': {json.dumps(task.key): task.interval for task in self.tasks}}
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def stop(self, *args):
+        """Pide una parada ordenada (también como manejador de SIGTERM y SIGINT)"""
+        self.stop_event.set()
+
+    def results(self):
+        """Última versión conocida de titulares y artículos de datos, en el orden del registro"""
+        all_headlines = []
+        data_articles = {source.name: [] for source in self.sources if source.authors}
+        for task in self.tasks:
+            if task.result is None:
+                continue
+            if task.key[0] == 'front':
+                all_headlines.extend(task.result)
+            else:
+                data_articles[task.key[1]].append(task.result)
+        return all_headlines, data_articles
+
+    def publish(self):
+        """Regenera la página HTML si algo ha cambiado desde la última vez"""
+        all_headlines, data_articles = self.results()
+        changes = self.tracker.compare(all_headlines, data_articles)
+        changed_sections = [section for section, summary in changes.items() if summary['changed']]
+        if not changed_sections and os.path.exists(self.output):
+            self.tracker.commit()
+            return False
+        for section in changed_sections:
+            summary = changes[section]
+            print(f"🔄 {section}: {summary['new']} nuevos, {summary['moved']} movidos, {summary['dropped']} desaparecidos")
+        with self.metrics.span('render'):
+            stories = cluster_stories(all_headlines, self.stories)
+            artifacts = sinks.write_all(self.sinks, all_headlines, data_articles, stories)
+        if self.uploads is not None:
+            self.uploads.submit(artifacts)
+        try:
+            with HistoryStore() as store:
+                store.record_run(all_headlines, data_articles)
+        except Exception as e:
+            print(f"Error guardando el histórico: {e}")
+        self.tracker.commit(self.output)
+        self.flush()
+        return True
+
+    def flush(self):
+        """Guarda en disco caché, métricas, intervalos y lo ya subido"""
+        saves = [('la caché HTTP', self.cache.save), ('el estado del modo residente', self.save_state),
+                 ('el estado de resiliencia', self.resilience.save)]
+        if self.uploads is not None:
+            # Lo ya subido, sin esperar a las subidas en curso
+            saves.append(('el estado de las subidas', self.uploads.save))
+        for name, save in saves:
+            try:
+                save()
+            except Exception as e:
+                print(f"Error guardando {name}: {e}")
+        # Las consultas en curso siguen anotando en self.metrics: se vacía en lugar de sustituirlo
+        headlines_scraper.write_metrics(self.metrics.drain())
+
+    def run(self):
+        """Bucle principal hasta que se pida parar"""
+        now = time.monotonic()
+        queue = [(now + self.rng.uniform(0, STARTUP_SPREAD), i, task) for i, task in enumerate(self.tasks)]
+        heapq.heapify(queue)
+        sequence = len(queue)
+        running = {}
+        dates = DateClassifier()
+        print(f"🛰️ Modo residente: {len(self.tasks)} páginas, salida en {self.output} (Ctrl+C para parar)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while not self.stop_event.is_set():
+                now = time.monotonic()
+                # La fecha de referencia cambia a medianoche, no en cada consulta
+                if dates.reference != datetime.now().date():
+                    dates = DateClassifier()
+
+                while queue and queue[0][0] <= now:
+                    _, _, task = heapq.heappop(queue)
+                    allowed = self.limiter.reserve(task.url, now)
+                    if allowed > now:
+                        # Dominio ocupado: la consulta espera su turno
+                        heapq.heappush(queue, (allowed, sequence, task))
+                        sequence += 1
+                        continue
+                    running[executor.submit(task.run, dates, self.metrics, self.resilience)] = task
+
+                changed = False
+                for future in [future for future in running if future.done()]:
+                    task = running.pop(future)
+                    try:
+                        changed |= task.update(future.result())
+                    except Exception as e:
+                        print(f"Error consultando {task.url}: {e}")
+                        task.update(None)
+                    heapq.heappush(queue, (time.monotonic() + task.next_delay(self.rng), sequence, task))
+                    sequence += 1
+                # La primera página se publica cuando todas las consultas han respondido una vez
+                if changed and all(task.polls for task in self.tasks):
+                    self.publish()
+
+                timeout = min(max(queue[0][0] - time.monotonic(), 0), 1.0) if queue else 1.0
+                if running:
+                    wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    self.stop_event.wait(timeout)
+
+            # Parada ordenada: terminar las consultas en curso y guardarlo todo
+            print("🛑 Parando: esperando a las consultas en curso...")
+            for future, task in running.items():
+                try:
+                    task.update(future.result())
+                except Exception as e:
+                    print(f"Error consultando {task.url}: {e}")
+        if not self.publish():
+            self.flush()
+        self.resilience.close()
+        if self.uploads is not None:
+            stats = self.uploads.close()
+            print(f"📤 Subidas: {stats['uploaded']} archivos ({stats['bytes_sent'] // 1024} KB enviados), "
+                  f"{stats['unchanged']} sin cambios, {stats['failed']} con error")
+        self.report()
+
+    def report(self):
+        """Resume cuántas consultas se han hecho frente a consultar todo al ritmo más rápido"""
+        elapsed = time.monotonic() - self.started_at
+        polls = sum(task.polls for task in self.tasks)
+        # Un sondeo fijo al intervalo mínimo consultaría cada página elapsed / min_interval veces (y al menos una)
+        naive = sum(max(elapsed / task.min_interval, 1) for task in self.tasks)
+        print(f"📊 {polls} consultas en {elapsed / 60:.1f} min ({polls / naive:.0%} de las de un sondeo fijo "
+              f"al intervalo mínimo), {sum(task.changes for task in self.tasks)} cambios detectados")
+        for task in self.tasks:
+            print(f"   {task.label}: cada {task.interval / 60:.0f} min, {task.changes} cambios en {task.polls} consultas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modo residente del extractor de titulares")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="Página HTML que se mantiene actualizada")
+    parser.add_argument('--state', default=STATE_FILE, help="Archivo donde se guardan los intervalos aprendidos")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="Consultas simultáneas como máximo")
+    args = parser.parse_args(argv)
+
+    sources_path = os.environ.get('HEADLINES_SOURCES')
+    sources = feed_parsing.sources_from_env(load_sources(sources_path) if sources_path else SOURCES)
+    daemon = Daemon(sources, args.output, args.state, args.workers)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Enriquecimiento de los artículos de datos.
+Sigue el enlace de cada artículo de datos y extrae su entradilla, el texto, la
+hora de publicación, cuántos gráficos e inserciones lleva y el tiempo de
+lectura. Las descargas van en segundo plano, por un grupo de hilos limitado por
+dominio y con un máximo de bytes y de tiempo por ejecución, así que nunca
+retrasan la página de titulares. Lo extraído se guarda en SQLite por enlace
+canónico: un artículo ya visto no se vuelve a descargar.
+HEADLINES_ENRICH lo activa ("1", o los límites: "seconds=20,mb=10").
+"""
+
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from story_clusters import canonical_url
+from streaming import CHUNK_SIZE
+
+ENRICH_ENV_VAR = 'HEADLINES_ENRICH'
+STORE_FILE = '.articulos_titulares.sqlite3'
+MAX_WORKERS = 8
+MAX_PER_HOST = 2  # Los artículos son de unos pocos dominios: pocas peticiones a la vez contra cada uno
+RUN_MAX_SECONDS = 20  # Tiempo máximo de todo el enriquecimiento de una ejecución
+RUN_MAX_BYTES = 10 * 1024 * 1024  # Bytes máximos descargados en una ejecución
+ARTICLE_MAX_BYTES = 1024 * 1024  # Bytes máximos de un artículo: lo que pase de aquí no se lee
+REQUEST_TIMEOUT = 10
+REWRITE_INTERVAL = 2.0  # Segundos mínimos entre dos reescrituras de las salidas mientras se completan artículos
+STORE_MAX_AGE = 90 * 86400  # Lo que lleva más de esto sin aparecer se olvida
+WORDS_PER_MINUTE = 200
+CHART_SECONDS = 20  # Lo que se tarda en leer un gráfico, a sumar al texto
+
+# Dominios de las herramientas de gráficos que usan las secciones de datos
+CHART_HOSTS = ('datawrapper', 'flourish', 'infogram', 'tableau', 'plot.ly', 'observablehq', 'highcharts')
+CHART_SELECTORS = ('.flourish-embed', '.infogram-embed', '.datawrapper-chart', '[data-datawrapper-id]')
+EMBED_SELECTORS = ('blockquote.twitter-tweet', 'blockquote.instagram-media', 'blockquote.tiktok-embed', 'video', 'audio')
+LEDE_SELECTORS = (('meta[property="og:description"]', 'content'), ('meta[name="description"]', 'content'))
+PUBLISHED_SELECTORS = (('meta[property="article:published_time"]', 'content'), ('time[datetime]', 'datetime'))
+BODY_SELECTORS = ('article p', 'main p', 'p')
+MIN_PARAGRAPH_CHARS = 40  # Los párrafos más cortos suelen ser pies de foto, firmas o avisos
+
+FIELDS = ('lede', 'body', 'published_at', 'charts', 'embeds', 'words', 'reading_minutes')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    seen_at REAL NOT NULL,
+    lede TEXT,
+    body TEXT,
+    published_at TEXT,
+    charts INTEGER NOT NULL,
+    embeds INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    reading_minutes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_seen ON articles(seen_at);
+"""
+
+
+class Limits:
+    """Cuánto puede durar y descargar el enriquecimiento de una ejecución"""
+
+    def __init__(self, max_seconds=RUN_MAX_SECONDS, max_bytes=RUN_MAX_BYTES):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def parse(cls, spec):
+        """Lee unos límites como "seconds=20,mb=10" (cualquier combinación; "1" deja los de por defecto)"""
+        limits = cls()
+        for part in (part.strip() for part in spec.split(',')):
+            name, _, value = part.partition('=')
+            if not part or part in ('1', 'true', 'yes'):
+                continue
+            elif name == 'seconds':
+                limits.max_seconds = float(value)
+            elif name == 'mb':
+                limits.max_bytes = int(float(value) * 1024 * 1024)
+            else:
+                raise ValueError(f"Límite de enriquecimiento desconocido: {part}")
+        return limits
+
+
+def first_attribute(soup, selectors):
+    for selector, attribute in selectors:
+        element = soup.select_one(selector)
+        value = (element.get(attribute) or '').strip() if element is not None else ''
+        if value:
+            return value
+    return None
+
+
+def parse_timestamp(value):
+    """Fecha y hora ISO de publicación ('2025-06-20T10:56:40+02:00'), o None si no se entiende"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).isoformat() if value else None
+    except ValueError:
+        return None
+
+
+def count_charts_and_embeds(soup):
+    """Gráficos (iframes y bloques de las herramientas de gráficos) e inserciones de otro tipo (vídeos, redes...)"""
+    charts = embeds = 0
+    for element in soup.select('iframe'):
+        host = urlsplit(element.get('src') or element.get('data-src') or '').netloc.lower()
+        if any(chart_host in host for chart_host in CHART_HOSTS):
+            charts += 1
+        else:
+            embeds += 1
+    charts += sum(len(soup.select(selector)) for selector in CHART_SELECTORS)
+    embeds += sum(len(soup.select(selector)) for selector in EMBED_SELECTORS)
+    return charts, embeds
+
+
+def extract_article(soup):
+    """Entradilla, texto, hora de publicación, gráficos, inserciones y tiempo de lectura de un artículo ya parseado"""
+    paragraphs = []
+    for selector in BODY_SELECTORS:
+        paragraphs = [text for text in (element.get_text().strip() for element in soup.select(selector))
+                      if len(text) >= MIN_PARAGRAPH_CHARS]
+        if paragraphs:
+            break
+    body = '\n\n'.join(paragraphs)
+    words = len(body.split())
+    charts, embeds = count_charts_and_embeds(soup)
+    seconds = words / WORDS_PER_MINUTE * 60 + charts * CHART_SECONDS
+    return {
+        'lede': first_attribute(soup, LEDE_SELECTORS) or (paragraphs[0] if paragraphs else None),
+        'body': body or None,
+        'published_at': parse_timestamp(first_attribute(soup, PUBLISHED_SELECTORS)),
+        'charts': charts,
+        'embeds': embeds,
+        'words': words,
+        'reading_minutes': math.ceil(seconds / 60) if seconds else 0,
+    }
+
+
+class ArticleStore:
+    """Lo extraído de cada artículo, por enlace canónico"""
+
+    def __init__(self, path=STORE_FILE, max_age=STORE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def get_many(self, urls, now=None):
+        """Lo guardado de unos enlaces canónicos (los que lo tengan), anotando que se han vuelto a ver"""
+        found = {}
+        urls = list(urls)
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self.connection.execute(f'SELECT url, {", ".join(FIELDS)} FROM articles WHERE url IN ({placeholders})',
+                                               chunk):
+                found[row[0]] = dict(zip(FIELDS, row[1:]))
+        if found:
+            with self.connection:
+                self.connection.executemany('UPDATE articles SET seen_at = ? WHERE url = ?',
+                                            [(now or time.time(), url) for url in found])
+        return found
+
+    def put(self, url, enrichment, now=None):
+        now = now or time.time()
+        with self.connection:
+            self.connection.execute(
+                f'INSERT OR REPLACE INTO articles (url, fetched_at, seen_at, {", ".join(FIELDS)}) '
+                f'VALUES (?, ?, ?, {", ".join("?" * len(FIELDS))})',
+                (url, now, now) + tuple(enrichment[field] for field in FIELDS))
+
+    def prune(self, now=None):
+        """Olvida los artículos que llevan más de max_age sin aparecer y devuelve cuántos"""
+        with self.connection:
+            return self.connection.execute('DELETE FROM articles WHERE seen_at < ?',
+                                           ((now or time.time()) - self.max_age,)).rowcount
+
+
+class Enricher:
+    """Descarga y extrae en segundo plano los artículos que aún no están en el almacén"""
+
+    def __init__(self, session, store_path=STORE_FILE, limits=None, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST,
+                 article_max_bytes=ARTICLE_MAX_BYTES):
+        self.session = session
+        self.store = ArticleStore(store_path)
+        self.limits = limits or Limits()
+        self.max_per_host = max_per_host
+        self.article_max_bytes = article_max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='articulo')
+        self.lock = threading.Lock()
+        self.done = queue.Queue()
+        self.waiting = {}  # Enlace canónico -> artículos (diccionarios) que esperan su enriquecimiento
+        self.deadline = None
+        self.stats = {'cached': 0, 'fetched': 0, 'failed': 0, 'skipped': 0, 'bytes': 0}
+
+    @classmethod
+    def from_env(cls, session, **kwargs):
+        """Enriquecedor con los límites de HEADLINES_ENRICH, o None si no está activado"""
+        spec = os.environ.get(ENRICH_ENV_VAR, '').strip()
+        if not spec or spec in ('0', 'false', 'no'):
+            return None
+        return cls(session, limits=Limits.parse(spec), **kwargs)
+
+    def start(self, data_articles):
+        """Completa al momento lo que ya está en el almacén y lanza en segundo plano la descarga del resto.
+        Vuelve enseguida; stream() va dando los artículos a medida que se completan."""
+        self.deadline = time.monotonic() + self.limits.max_seconds
+        by_url = {}
+        for articles in data_articles.values():
+            for article in articles:
+                # Lo servido sin actualizar se completará cuando se pueda descargar su página de autor
+                if not article.get('stale'):
+                    by_url.setdefault(canonical_url(article['link']), []).append(article)
+        for url, enrichment in self.store.get_many(by_url).items():
+            for article in by_url.pop(url):
+                article['enrichment'] = enrichment
+            self.stats['cached'] += 1
+        self.waiting.update(by_url)
+        # Una cola por dominio y como mucho max_per_host hilos vaciándola: ningún hilo se queda esperando turno
+        # de un dominio mientras otros tienen artículos pendientes
+        hosts = {}
+        for url, articles in by_url.items():
+            hosts.setdefault(urlsplit(articles[0]['link']).netloc, deque()).append((url, articles[0]['link']))
+        for pending in hosts.values():
+            for _ in range(min(self.max_per_host, len(pending))):
+                self.executor.submit(self.drain, pending)
+        return len(by_url)
+
+    def drain(self, pending):
+        """Descarga uno tras otro artículos de la cola de un dominio mientras queden"""
+        while True:
+            try:
+                url, link = pending.popleft()
+            except IndexError:
+                return
+            self.run(url, link)
+
+    def consume(self, size):
+        """Anota un trozo leído si cabe en el máximo de bytes de la ejecución; si no cabe, no se anota y devuelve False"""
+        with self.lock:
+            if self.stats['bytes'] + size > self.limits.max_bytes:
+                return False
+            self.stats['bytes'] += size
+            return True
+
+    def download(self, link):
+        """Lee un artículo a trozos hasta article_max_bytes (lo que pase no hace falta para extraerlo).
+        Devuelve None si antes se acaban los bytes o el tiempo de la ejecución."""
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        response = self.session.get(link, timeout=min(REQUEST_TIMEOUT, remaining), stream=True)
+        try:
+            response.raise_for_status()
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if not self.consume(len(chunk)) or time.monotonic() > self.deadline:
+                    return None
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.article_max_bytes:
+                    break
+            return b''.join(chunks)
+        finally:
+            # Si se corta antes del final, la conexión se cierra en lugar de volver al pool
+            response.close()
+
+    def run(self, url, link):
+        """Descarga y extrae un artículo; el resultado (o el error) va a la cola que lee stream()"""
+        try:
+            content = self.download(link)
+            if content is None:
+                self.done.put((url, None, 'skipped'))
+                return
+            from html_parsing import make_soup
+            self.done.put((url, extract_article(make_soup(content)), None))
+        except Exception as e:
+            self.done.put((url, None, e))
+
+    def stream(self):
+        """Va devolviendo (artículos, enriquecimiento) a medida que terminan las descargas, hasta que terminan
+        todas o se acaba el tiempo de la ejecución; los artículos quedan completados y guardados en el almacén"""
+        while self.waiting:
+            remaining = self.deadline - time.monotonic()
+            try:
+                url, enrichment, error = self.done.get(timeout=max(0, remaining))
+            except queue.Empty:
+                break
+            articles = self.waiting.pop(url, [])
+            if enrichment is None:
+                if error == 'skipped':
+                    self.stats['skipped'] += 1
+                else:
+                    self.stats['failed'] += 1
+                    print(f"Error enriqueciendo {url}: {error}")
+                continue
+            self.stats['fetched'] += 1
+            self.store.put(url, enrichment)
+            for article in articles:
+                article['enrichment'] = enrichment
+            yield articles, enrichment
+        # Lo que no ha llegado a tiempo se intentará en la próxima ejecución
+        self.stats['skipped'] += len(self.waiting)
+        self.waiting.clear()
+
+    def batches(self, interval=REWRITE_INTERVAL):
+        """Como stream(), pero da listas con los artículos completados desde la anterior, como mucho cada interval
+        segundos (y lo que quede al terminar): para reescribir las salidas a medida que avanzan, sin hacerlo
+        por cada artículo"""
+        batch = []
+        last = time.monotonic()
+        for articles, _ in self.stream():
+            batch.extend(articles)
+            if time.monotonic() - last >= interval:
+                yield batch
+                batch = []
+                last = time.monotonic()
+        if batch:
+            yield batch
+
+    def close(self):
+        """Abandona lo pendiente (las descargas en curso terminan solas) y cierra el almacén"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.store.prune()
+        finally:
+            self.store.close()
+        return dict(self.stats)
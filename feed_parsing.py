@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Titulares desde los feeds RSS/Atom y los sitemaps de noticias de los periódicos.
+Un feed trae título, enlace y fecha exacta de publicación de cada artículo en
+mucho menos que la portada, y no depende de su maquetación. Se lee con
+iterparse y se deja de parsear en cuanto se tienen los titulares pedidos, así
+que el parseo no crece con la longitud del feed. Si un periódico no tiene feed, o el
+suyo falla o viene vacío, se extrae de la portada HTML como siempre.
+"""
+
+import dataclasses
+import io
+import os
+import re
+from datetime import date
+
+from article_dates import extract_date_from_url
+from story_clusters import headline_key
+
+FEEDS_ENV_VAR = 'HEADLINES_FEEDS'  # '0' para extraer siempre de la portada HTML
+
+# Elemento de cada artículo según el formato: RSS, Atom o sitemap de noticias
+ITEM_TAGS = {'item': 'rss', 'entry': 'atom', 'url': 'sitemap'}
+ISO_DATE = re.compile(r'\s*(20\d\d)-(\d\d)-(\d\d)')
+
+
+def local_name(tag):
+    """Nombre de un elemento sin su espacio de nombres ('{http://www.w3.org/2005/Atom}entry' -> 'entry')"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_feed_date(value):
+    """Fecha de publicación de un feed: ISO 8601 (Atom, sitemaps) o RFC 822 (RSS); None si no se entiende.
+    Como en las páginas, vale el día que pone el periódico, sin pasarlo a otra zona horaria."""
+    if not value:
+        return None
+    from email.utils import parsedate_to_datetime
+    match = ISO_DATE.match(value)
+    try:
+        if match:
+            return date(*(int(part) for part in match.groups()))
+        return parsedate_to_datetime(value.strip()).date()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def item_fields(element, kind):
+    """(título, enlace, fecha en texto) de un artículo ya leído del feed"""
+    title = link = published = updated = None
+    for child in element.iter():
+        name = local_name(child.tag)
+        if name == 'title' and title is None:
+            # En los sitemaps es <news:title>, dentro de <news:news>
+            title = (child.text or '').strip()
+        elif name == 'link' and link is None:
+            if kind != 'atom':
+                link = (child.text or '').strip()
+            elif child.get('rel', 'alternate') == 'alternate':
+                link = child.get('href')
+        elif name == 'loc' and link is None:
+            link = (child.text or '').strip()
+        elif name in ('pubDate', 'published', 'publication_date') and published is None:
+            published = child.text
+        elif name in ('updated', 'date', 'lastmod') and updated is None:
+            # Solo cuenta si el artículo no trae fecha de publicación
+            updated = child.text
+    return title, link, published or updated
+
+
+def iter_feed_items(content):
+    """Recorre los artículos de un feed RSS/Atom o de un sitemap de noticias, en orden, sin cargarlo entero.
+    Da diccionarios con title, link y published (fecha o None); un índice de sitemaps no tiene artículos."""
+    # El parser XML solo se carga si algún periódico tiene feed
+    from xml.etree.ElementTree import iterparse
+    kind = None
+    depth = 0
+    events = iterparse(io.BytesIO(content), events=('start', 'end'))
+    for event, element in events:
+        name = local_name(element.tag)
+        if event == 'start':
+            if kind is None and name == 'sitemapindex':
+                raise ValueError("Es un índice de sitemaps, no un sitemap de noticias")
+            if name in ITEM_TAGS and depth == 0:
+                kind = ITEM_TAGS[name]
+                depth = 1
+            elif depth:
+                depth += 1
+            continue
+        if not depth:
+            continue
+        depth -= 1
+        if depth:
+            continue
+        title, link, published = item_fields(element, kind)
+        # Lo ya leído no hace falta: el árbol se queda del tamaño de un artículo
+        element.clear()
+        if title and link:
+            yield {'title': title, 'link': link, 'published': parse_feed_date(published)}
+
+
+def extract_feed_headlines(source, content):
+    """Los primeros titulares de un periódico desde su feed, con su fecha de publicación ('YYYY-MM-DD' o None).
+    Pasan las mismas reglas que los de la portada y un enlace repetido solo cuenta una vez."""
+    from xml.etree.ElementTree import ParseError
+    headlines = []
+    seen = set()
+    try:
+        for item in iter_feed_items(content):
+            title, link = item['title'], source.absolute_url(item['link'])
+            if not source.rules.accepts(title, link):
+                continue
+            # Sin fecha en el feed, la de la URL, como en la portada
+            published = item['published'] or extract_date_from_url(link)
+            headline = {'title': title, 'link': link, 'source': source.name,
+                        'published': published.isoformat() if published else None}
+            key = headline_key(headline)
+            if key in seen:
+                continue
+            seen.add(key)
+            headlines.append(headline)
+            if len(headlines) >= source.headline_count:
+                break
+    except ParseError as e:
+        raise ValueError(f"Feed mal formado: {e}") from None
+    return headlines
+
+
+def sources_from_env(sources):
+    """Los periódicos sin feed si HEADLINES_FEEDS=0, para extraer siempre de la portada"""
+    if os.environ.get(FEEDS_ENV_VAR, '1') != '0':
+        return sources
+    return [dataclasses.replace(source, feed_url=None) for source in sources]
@@ -4,612 +4,667 @@ Script para extraer los primeros cuatro titulares de tres periódicos
 y guardarlos en un archivo HTML.
 """
 
-import requests
-from bs4 import BeautifulSoup
-import html
-from datetime import datetime
+import argparse
+from datetime import date, datetime
 import os
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from http_cache import CachedResponse, HttpCache
+from html_parsing import SelectorReport, make_soup
+import feed_parsing
+from streaming import EarlyStop, read_until
+from history_store import HistoryStore
+from article_dates import DateClassifier, extract_date_from_html, extract_date_from_url
+from change_tracking import ChangeTracker
+from sources import SOURCES, load_sources
+from metrics import METRICS_ENV_VAR, METRICS_FILE, NO_METRICS, PROMETHEUS_ENV_VAR, Metrics, timed_pool_classes
+from story_clusters import cluster_stories, headline_key
+import sinks
+from output_dir import OutputDirectory
+from resilience import Resilience
+from selector_health import SelectorHealth
+from enrichment import Enricher
+from uploads import UploadManager
+import author_feeds
 
-def is_article_from_today(link, title):
-    """Determina si un artículo es del día actual basándose en la URL y título"""
-    today = datetime.now()
-    today_str = today.strftime('%Y-%m-%d')
-    today_str_short = today.strftime('%Y%m%d')
-    
-    # Buscar patrones de fecha en la URL
-    date_patterns = [
-        today_str,  # 2025-06-20
-        today_str_short,  # 20250620
-        today.strftime('%Y/%m/%d'),  # 2025/06/20
-        today.strftime('%Y/%m'),  # 2025/06
-    ]
-    
-    for pattern in date_patterns:
-        if pattern in link:
-            return True
-    
-    # Buscar en el título palabras que indiquen "hoy" o "actual"
-    today_indicators = ['hoy', 'actual', 'última hora', 'breaking', 'ahora']
-    for indicator in today_indicators:
-        if indicator.lower() in title.lower():
-            return True
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+REQUEST_TIMEOUT = 10
+
+# Configuración de la sesión HTTP compartida
+POOL_CONNECTIONS = 64  # Dominios con pool de conexiones propio
+POOL_MAXSIZE = 4  # Conexiones keep-alive reutilizables por dominio
+MAX_RETRIES = 2  # Reintentos ante errores de conexión o respuestas 429/5xx
+RETRY_BACKOFF = 0.5  # Espera exponencial entre reintentos: 0.5 s, 1 s, 2 s...
+
+# Las páginas de autor se descargan solo hasta el primer bloque de artículo completo
+STREAM_AUTHOR_PAGES = True
+
+# Límites del planificador de descargas en paralelo
+MAX_WORKERS = 32  # Hilos como máximo para descargar portadas y páginas de autor
+MAX_PER_HOST = POOL_MAXSIZE  # Peticiones simultáneas como máximo contra un mismo dominio
+RUN_DEADLINE = 30  # Segundos como máximo para todas las descargas de una ejecución
+
+
+_shared_session = None
+_session_lock = threading.Lock()
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, retries=MAX_RETRIES, backoff_factor=RETRY_BACKOFF):
+    """Crea una sesión HTTP con pool de conexiones keep-alive por dominio y reintentos con espera exponencial"""
+    # requests tarda en importarse más que todo lo demás: solo se carga cuando de verdad hay que descargar
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     
-    return False
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD'])
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    # Cada conexión nueva anota cuánto ha tardado en abrirse en el tramo de descarga que la ha pedido
+    adapter.poolmanager.pool_classes_by_scheme = timed_pool_classes()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-def get_headlines_el_mundo():
-    """Extrae los primeros 4 titulares de El Mundo"""
-    try:
-        url = "https://www.elmundo.es"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        headlines = []
-        
-        # Buscar titulares en selectores más específicos de El Mundo
-        selectors = [
-            '.ue-c-cover-content__headline a',  # Titulares principales
-            '.ue-c-cover-content__title a',     # Títulos principales
-            '.ue-c-cover-content__link',        # Enlaces principales
-            'h1 a', 'h2 a', 'h3 a',             # Encabezados
-            '.headline a', '.title a'           # Selectores genéricos
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                if element.get_text().strip() and len(headlines) < 4:
-                    title = element.get_text().strip()
-                    link = element.get('href', '')
-                    
-                    # Filtrar elementos que no son titulares de noticias
-                    if (len(title) > 10 and  # Títulos muy cortos probablemente no son noticias
-                        not title.isupper() and  # Evitar títulos en mayúsculas (como "MUNDIAL DE CLUBES")
-                        not title.startswith('CARLOS') and  # Evitar nombres de autores
-                        not 'comentarios' in title.lower() and  # Evitar contadores de comentarios
-                        not title.startswith('MUNDIAL') and  # Evitar secciones deportivas
-                        link and  # Debe tener enlace
-                        not link.endswith('.html#ancla_comentarios')):  # Evitar enlaces a comentarios
-                        
-                        if not link.startswith('http'):
-                            link = 'https://www.elmundo.es' + link
-                        headlines.append({'title': title, 'link': link, 'source': 'El Mundo'})
-                        if len(headlines) >= 4:
-                            break
-            if len(headlines) >= 4:
-                break
-                
-        return headlines[:4]
-    except Exception as e:
-        print(f"Error extrayendo de El Mundo: {e}")
-        return []
+def get_session():
+    """Devuelve la sesión HTTP compartida por todos los extractores, creándola la primera vez"""
+    global _shared_session
+    with _session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
 
-def get_latest_article_author(url, author_name):
-    """Extrae el último artículo de un autor específico (El Mundo)"""
+def fetch_page(url, session=None, cache=None, until=None, resilience=None):
+    """Descarga una página reutilizando las conexiones de la sesión (la compartida si no se indica otra).
+    Con until (un EarlyStop) la descarga se corta en cuanto se ha visto lo que hace falta.
+    Con resilience (un Resilience) pasa por el cortacircuitos del dominio y se duplica si tarda demasiado."""
+    if resilience is not None:
+        return resilience.fetch(url, lambda: fetch_page(url, session, cache, until))
+    session = session or get_session()
+    if cache is not None:
+        return cache.fetch(session, url, REQUEST_TIMEOUT, until)
+    response = session.get(url, timeout=REQUEST_TIMEOUT, stream=until is not None)
+    if until is None:
+        response.raise_for_status()
+        return response
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        # Buscar el primer bloque de artículo real
-        block = soup.select_one('.ue-c-cover-content')
-        if block:
-            link_tag = block.find('a', href=True)
-            if link_tag and link_tag.get_text().strip():
-                title = link_tag.get_text().strip()
-                link = link_tag['href']
-                if not link.startswith('http'):
-                    link = 'https://www.elmundo.es' + link
-                
-                is_new = is_article_from_today(link, title)
-                return {'title': title, 'link': link, 'author': author_name, 'is_new': is_new}
-        return None
-    except Exception as e:
-        print(f"Error extrayendo artículo de {author_name}: {e}")
+    except Exception:
+        response.close()
+        raise
+    content, truncated = read_until(response, until)
+    return CachedResponse(response.url, content, response.status_code, elapsed=response.elapsed, raw=response.raw,
+                          truncated=truncated)
+
+def get_cached_result(response, cache):
+    """Devuelve lo extraído la última vez si la página no ha cambiado, para no volver a parsearla"""
+    if cache is None or not getattr(response, 'not_modified', False):
         return None
+    return cache.get_result(response.url)
 
-def get_data_articles_el_mundo():
-    """Extrae los últimos artículos de los autores de datos de El Mundo"""
-    authors = [
-        ('https://www.elmundo.es/autor/maria-alcantara.html', 'María Alcántara'),
-        ('https://www.elmundo.es/autor/emilio-amade.html', 'Emilio Amade'),
-        ('https://www.elmundo.es/autor/javier-aguirre.html', 'Javier Aguirre'),
-        ('https://www.elmundo.es/autor/alberto-hernandez.html', 'Alberto Hernández')
-    ]
+def connection_stats(session=None):
+    """Cuenta por dominio las conexiones nuevas y las peticiones que reutilizaron una conexión abierta"""
+    session = session or get_session()
+    stats = {}
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(pool.host, {'new': 0, 'reused': 0})
+            host['new'] += pool.num_connections
+            host['reused'] += pool.num_requests - pool.num_connections
+    return stats
+
+def is_article_from_today(link, title, dates=None):
+    """Determina si un artículo es del día actual basándose en la fecha de la URL o, si no la tiene, en el título"""
+    dates = dates or DateClassifier()
+    return dates.is_new(extract_date_from_url(link), title)
+
+def published_date(value):
+    """Convierte la fecha de publicación guardada en un resultado ('YYYY-MM-DD' o None) en fecha"""
+    return date.fromisoformat(value) if value else None
+
+def extract_headlines(source, soup, selector_set=None, report=None):
+    """Extrae los primeros titulares de la portada ya parseada de un periódico.
+    selector_set: la cascada a usar (por defecto la del periódico); report: un SelectorReport donde anotarla"""
+    def extract(element):
+        title = element.get_text().strip()
+        link = element.get('href', '')
+        if not title or not source.rules.accepts(title, link):
+            return None
+        return {'title': title, 'link': source.absolute_url(link), 'source': source.name}
     
-    articles = []
-    for url, author_name in authors:
-        article = get_latest_article_author(url, author_name)
-        if article:
-            articles.append(article)
+    # Un solo recorrido del documento para toda la cascada de selectores; un enlace repetido solo cuenta una vez
+    return (selector_set or source.selector_set).first(soup, source.headline_count, extract, key=headline_key, report=report)
+
+def add_publication_dates(headlines, dates=None):
+    """Añade a cada titular su fecha de publicación ('YYYY-MM-DD' o None), clasificando todos de una pasada"""
+    dates = dates or DateClassifier()
+    for headline, published in zip(headlines, dates.classify([headline['link'] for headline in headlines])):
+        headline['published'] = published.isoformat() if published else None
+    return headlines
+
+def ranked_selectors(health, source, page, selector_set):
+    """(cascada en el orden en que conviene probarla, SelectorReport donde anotarla); sin health, la de siempre y None"""
+    if health is None:
+        return selector_set, None
+    selector_set = health.ranked(source.name, page, selector_set)
+    return selector_set, SelectorReport(selector_set.selectors)
+
+def serve_stale(url, resilience, metrics, labels):
+    """Lo último que se extrajo bien de una página que ahora no se puede descargar, marcado como no actualizado"""
+    stale = resilience.stale(url) if resilience is not None else None
+    if stale is not None:
+        metrics.count('stale', **labels)
+        print(f"♻️ Se sirve lo extraído de {labels['source']} ({labels['page']}) en la última descarga correcta")
+    return stale
+
+def get_feed_headlines(source, session=None, cache=None, metrics=NO_METRICS, resilience=None):
+    """Extrae los primeros titulares de un periódico desde su feed RSS/Atom o sitemap de noticias, con la fecha exacta
+    de publicación. Lanza una excepción si el feed no se puede descargar o leer"""
+    labels = {'source': source.name, 'page': 'feed'}
+    url = source.feed_url
+    with metrics.span('fetch', url=url, **labels) as span:
+        response = fetch_page(url, session, cache, resilience=resilience)
+        metrics.observe_response(span, response, **labels)
+    cached = get_cached_result(response, cache)
+    if cached is not None:
+        metrics.count('cache', result='reused_extraction')
+        return cached
     
-    return articles
+    # Se deja de leer el feed en cuanto están los titulares pedidos
+    with metrics.span('parse', **labels) as span:
+        headlines = feed_parsing.extract_feed_headlines(source, response.content)
+        span.set(matches=len(headlines))
+    if cache is not None and headlines:
+        cache.set_result(url, headlines)
+    return headlines
 
-def get_latest_article_author_confidencial(url, author_name):
-    """Extrae el último artículo de un autor específico de El Confidencial"""
+def get_headlines(source, session=None, cache=None, dates=None, metrics=NO_METRICS, resilience=None, health=None):
+    """Extrae los primeros titulares de la portada de un periódico del registro, con su fecha de publicación si se conoce.
+    Si el periódico tiene feed se leen de él, y de la portada HTML solo si falla o viene vacío.
+    Con health (un SelectorHealth), la cascada se prueba en el orden que funciona y se anota cómo le ha ido.
+    Con resilience, si la portada no se puede descargar se devuelven los últimos titulares buenos, marcados con 'stale'."""
+    labels = {'source': source.name, 'page': 'portada'}
+    url = source.url
+    if source.feed_url:
+        try:
+            headlines = get_feed_headlines(source, session, cache, metrics, resilience)
+        except Exception as e:
+            print(f"Error leyendo el feed de {source.name}, se usa la portada: {e}")
+            headlines = None
+        if headlines:
+            metrics.count('feeds', result='used', **labels)
+            if resilience is not None:
+                resilience.remember(url, headlines)
+            return headlines
+        metrics.count('feeds', result='fallback', **labels)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        with metrics.span('fetch', url=url, **labels) as span:
+            response = fetch_page(url, session, cache, resilience=resilience)
+            metrics.observe_response(span, response, **labels)
+        cached = get_cached_result(response, cache)
+        if cached is not None:
+            metrics.count('cache', result='reused_extraction')
+            if resilience is not None and cached:
+                resilience.remember(url, cached)
+            return cached
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        # Buscar el primer artículo en la clase archive-article-top-tit
-        article_link = soup.select_one('.archive-article-top-tit a')
-        if article_link and article_link.get_text().strip():
-            title = article_link.get_text().strip()
-            link = article_link['href']
-            if not link.startswith('http'):
-                link = 'https://www.elconfidencial.com' + link
-            
-            is_new = is_article_from_today(link, title)
-            return {'title': title, 'link': link, 'author': author_name, 'is_new': is_new}
-        return None
+        with metrics.span('parse', **labels) as span:
+            soup = make_soup(response.content)
+            parse_ms = span.elapsed_ms()
+        selector_set, report = ranked_selectors(health, source, 'portada', source.selector_set)
+        with metrics.span('select', **labels) as span:
+            headlines = extract_headlines(source, soup, selector_set, report)
+            span.set(matches=len(headlines))
+            select_ms = span.elapsed_ms()
+        if health is not None:
+            health.record(source.name, 'portada', source.selector_set, report, select_ms, parse_ms, metrics)
+        with metrics.span('dates', **labels):
+            add_publication_dates(headlines, dates)
+        if not headlines:
+            metrics.count('empty_extractions', **labels)
+        
+        if cache is not None:
+            cache.set_result(url, headlines)
+        if resilience is not None and headlines:
+            resilience.remember(url, headlines)
+        return headlines
     except Exception as e:
-        print(f"Error extrayendo artículo de {author_name}: {e}")
+        print(f"Error extrayendo de {source.name}: {e}")
+        return serve_stale(url, resilience, metrics, labels) or []
+
+def author_early_stop(source):
+    """Cuándo cortar la descarga de las páginas de autor de un periódico (None para descargarlas enteras)"""
+    if not STREAM_AUTHOR_PAGES or not source.author_parse_class:
         return None
+    return EarlyStop(source.author_parse_class, 1, source.author_max_bytes)
+
+def parse_author_page(source, content):
+    """Parsea solo los bloques de artículo de una página de autor (None si no tiene el contenedor esperado)"""
+    soup = make_soup(content, only_class=source.author_parse_class)
+    if source.author_container:
+        return soup.select_one(source.author_container)
+    return soup
 
-def get_data_articles_el_confidencial():
-    """Extrae los últimos artículos de los autores de datos de El Confidencial"""
-    authors = [
-        ('https://www.elconfidencial.com/autores/miguel-angel-gavilanes-5390/', 'Miguel Ángel Gavilanes'),
-        ('https://www.elconfidencial.com/autores/marta-ley-4163/', 'Marta Ley')
-    ]
+def extract_latest_article(source, soup, author_name, dates=None, selector_set=None, report=None):
+    """Extrae el último artículo de una página de autor ya parseada, con su fecha de publicación.
+    selector_set: la cascada a usar (por defecto la del periódico); report: un SelectorReport donde anotarla"""
+    dates = dates or DateClassifier()
     
-    articles = []
-    for url, author_name in authors:
-        article = get_latest_article_author_confidencial(url, author_name)
-        if article:
-            articles.append(article)
+    def extract(element):
+        title = element.get_text().strip()
+        link = element.get('href', '')
+        if not title or not source.author_rules.accepts(title, link):
+            return None
+        link = source.absolute_url(link)
+        # Si la URL no trae fecha, la de <time datetime> de la página, que ya está parseada
+        published = extract_date_from_url(link) or extract_date_from_html(soup)
+        return {'title': title, 'link': link, 'author': author_name,
+                'published': published.isoformat() if published else None,
+                'is_new': dates.is_new(published, title)}
     
-    return articles
+    selector_set = selector_set or source.author_selector_set
+    if source.author_first_only:
+        # Solo cuenta el primer enlace que encuentre la cascada, sea válido o no
+        return selector_set.first_element(soup, extract, report)
+    articles = selector_set.first(soup, 1, extract, report=report)
+    return articles[0] if articles else None
 
-def get_latest_article_author_eldiario(url, author_name):
-    """Extrae el último artículo de un autor específico de El Diario"""
+def get_latest_article(source, url, author_name, session=None, cache=None, dates=None, metrics=NO_METRICS, resilience=None,
+                       health=None):
+    """Extrae el último artículo de un autor de la sección de datos de un periódico, con su fecha de publicación.
+    Con health (un SelectorHealth), la cascada se prueba en el orden que funciona y se anota cómo le ha ido.
+    Con resilience, si la página no se puede descargar se devuelve el último artículo bueno, marcado con 'stale'."""
+    dates = dates or DateClassifier()
+    labels = {'source': source.name, 'page': author_name}
+    until = author_early_stop(source)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        with metrics.span('fetch', url=url, **labels) as span:
+            response = fetch_page(url, session, cache, until, resilience)
+            metrics.observe_response(span, response, **labels)
+        cached = get_cached_result(response, cache)
+        if cached is not None:
+            metrics.count('cache', result='reused_extraction')
+            if resilience is not None:
+                resilience.remember(url, cached)
+            return dict(cached, is_new=dates.is_new(published_date(cached.get('published')), cached['title']))
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        # Buscar el primer artículo real en la página del autor
-        # Intentar diferentes selectores para encontrar el artículo más reciente
-        selectors = [
-            '.article-author-cont h2 a',  # Títulos de artículos en contenedor de autor
-            '.article-author-cont h3 a',  # Subtítulos de artículos
-            '.article-author-cont .title a',  # Títulos con clase específica
-            '.article-author-cont a[href*="/"]',  # Enlaces que contienen "/" (artículos)
-            '.article-author-cont a'  # Cualquier enlace en el contenedor
-        ]
+        # Solo hace falta construir los bloques de artículo, no el documento entero
+        with metrics.span('parse', **labels) as span:
+            soup = parse_author_page(source, response.content)
+            parse_ms = span.elapsed_ms()
+        article = None
+        selector_set, report = ranked_selectors(health, source, 'autores', source.author_selector_set)
+        if soup is not None:
+            with metrics.span('select', **labels) as span:
+                article = extract_latest_article(source, soup, author_name, dates, selector_set, report)
+                span.set(matches=int(article is not None))
+                select_ms = span.elapsed_ms()
+        if article is None and getattr(response, 'truncated', None) == 'block':
+            # El primer bloque no tenía un artículo válido: leer el resto (hasta el máximo), sin la caché
+            metrics.count('stream_fallbacks', **labels)
+            with metrics.span('fetch', url=url, **labels) as span:
+                response = fetch_page(url, session, None, EarlyStop(source.author_parse_class, None, source.author_max_bytes),
+                                      resilience)
+                metrics.observe_response(span, response, **labels)
+            with metrics.span('parse', **labels) as span:
+                soup = parse_author_page(source, response.content)
+                parse_ms = span.elapsed_ms()
+            # Lo que no estaba en el primer bloque no dice nada de los selectores: solo cuenta esta extracción
+            selector_set, report = ranked_selectors(health, source, 'autores', source.author_selector_set)
+            if soup is not None:
+                with metrics.span('select', **labels) as span:
+                    article = extract_latest_article(source, soup, author_name, dates, selector_set, report)
+                    select_ms = span.elapsed_ms()
+        if health is not None and soup is not None:
+            health.record(source.name, 'autores', source.author_selector_set, report, select_ms, parse_ms, metrics)
+        if article is None:
+            metrics.count('empty_extractions', **labels)
+            return None
         
-        for selector in selectors:
-            article_links = soup.select(selector)
-            for link in article_links:
-                title = link.get_text().strip()
-                href = link.get('href', '')
-                # Filtrar enlaces que parecen ser artículos reales
-                if (title and 
-                    len(title) > 10 and  # Títulos largos
-                    href and 
-                    '/' in href and  # Contiene "/" (indicador de artículo)
-                    not title.lower() in ['euskadi', 'economía', 'política', 'sociedad', 'internacional'] and  # Evitar enlaces de navegación
-                    not href.startswith('#')):  # Evitar enlaces internos
-                    
-                    if not href.startswith('http'):
-                        href = 'https://www.eldiario.es' + href
-                    
-                    is_new = is_article_from_today(href, title)
-                    return {'title': title, 'link': href, 'author': author_name, 'is_new': is_new}
-        return None
+        if cache is not None:
+            cache.set_result(url, article)
+        if resilience is not None:
+            resilience.remember(url, article)
+        return article
     except Exception as e:
         print(f"Error extrayendo artículo de {author_name}: {e}")
-        return None
+        stale = serve_stale(url, resilience, metrics, labels)
+        if stale is not None:
+            # Si hoy es nuevo o no depende de la fecha de hoy, no de la de entonces
+            stale['is_new'] = dates.is_new(published_date(stale.get('published')), stale['title'])
+        return stale
 
-def get_data_articles_el_diario():
-    """Extrae los últimos artículos de los autores de datos de El Diario"""
-    authors = [
-        ('https://www.eldiario.es/autores/raul_sanchez/', 'Raúl Sánchez'),
-        ('https://www.eldiario.es/autores/victoria_oliveres/', 'Victoria Oliveres')
-    ]
-    
+def get_data_articles(source, session=None, cache=None, dates=None, metrics=NO_METRICS):
+    """Extrae los últimos artículos de los autores de datos de un periódico"""
+    dates = dates or DateClassifier()
     articles = []
-    for url, author_name in authors:
-        article = get_latest_article_author_eldiario(url, author_name)
+    for author in source.authors:
+        article = get_latest_article(source, author.url, author.name, session, cache, dates, metrics)
         if article:
             articles.append(article)
     
     return articles
 
-def get_headlines_el_confidencial():
-    """Extrae los primeros 4 titulares de El Confidencial"""
-    try:
-        url = "https://www.elconfidencial.com"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        headlines = []
-        
-        # Buscar titulares en selectores específicos de El Confidencial
-        selectors = [
-            '.gac-principal__titleLink',  # Primer titular principal
-            '.m-principal a',             # Segundo titular principal
-            '.m-fotoCentral__titleSide a', # Tercer titular principal
-            '.c-85__titleSide a',         # Cuarto titular principal (la 85)
-            '.article-title a', '.headline-title a',
-            'h2 a', 'h3 a', '.headline a', '.title a'
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                if element.get_text().strip() and len(headlines) < 4:
-                    title = element.get_text().strip()
-                    link = element.get('href', '')
-                    if not link.startswith('http'):
-                        link = 'https://www.elconfidencial.com' + link
-                    headlines.append({'title': title, 'link': link, 'source': 'El Confidencial'})
-                    if len(headlines) >= 4:
-                        break
-            if len(headlines) >= 4:
-                break
-                
-        return headlines[:4]
-    except Exception as e:
-        print(f"Error extrayendo de El Confidencial: {e}")
-        return []
 
-def get_headlines_el_diario():
-    """Extrae los primeros 4 titulares de El Diario"""
-    try:
-        url = "https://www.eldiario.es"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        headlines = []
-        
-        selectors = [
-            'h2 a', 'h3 a', '.headline a', '.title a', 
-            '.article-title a', '.headline-title a'
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                if element.get_text().strip() and len(headlines) < 4:
-                    title = element.get_text().strip()
-                    link = element.get('href', '')
-                    if not link.startswith('http'):
-                        link = 'https://www.eldiario.es' + link
-                    headlines.append({'title': title, 'link': link, 'source': 'El Diario'})
-                    if len(headlines) >= 4:
-                        break
-            if len(headlines) >= 4:
-                break
-                
-        return headlines[:4]
-    except Exception as e:
-        print(f"Error extrayendo de El Diario: {e}")
+def run_tasks_concurrently(tasks, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, deadline=RUN_DEADLINE, fallback=None):
+    """Ejecuta en paralelo una lista de tareas (url, función, argumentos) y devuelve sus resultados en el mismo orden.
+    Las que no terminan a tiempo se quedan en None o, con fallback, en lo que devuelva fallback(url)."""
+    if not tasks:
         return []
+    
+    # Un semáforo por dominio para no saturar ningún periódico
+    host_limits = {}
+    for url, _, _ in tasks:
+        host_limits.setdefault(urlparse(url).netloc, threading.Semaphore(max_per_host))
+    
+    def run_task(url, func, args):
+        with host_limits[urlparse(url).netloc]:
+            return func(*args)
+    
+    results = [None] * len(tasks)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(tasks)))
+    futures = {executor.submit(run_task, url, func, args): i for i, (url, func, args) in enumerate(tasks)}
+    done, pending = wait(futures, timeout=deadline)
+    
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            print(f"Error descargando {tasks[futures[future]][0]}: {e}")
+    
+    # Las tareas que no terminan a tiempo se quedan sin resultado
+    for future in pending:
+        print(f"⏱️ Tiempo agotado esperando {tasks[futures[future]][0]}")
+        if fallback is not None:
+            results[futures[future]] = fallback(tasks[futures[future]][0])
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results
 
-def clean_old_files():
-    """Elimina archivos HTML de titulares de días anteriores"""
-    try:
-        current_time = datetime.now()
-        files_to_delete = []
-        
-        # Buscar archivos de titulares en el directorio actual
-        for filename in os.listdir('.'):
-            if filename.startswith('titulares_') and filename.endswith('.html'):
-                # Extraer la fecha del nombre del archivo
-                try:
-                    # Formato: titulares_YYYYMMDD_HHMMSS.html
-                    date_str = filename.split('_')[1] + '_' + filename.split('_')[2].split('.')[0]
-                    file_time = datetime.strptime(date_str, '%Y%m%d_%H%M%S')
-                    
-                    # Eliminar archivos de hace más de 2 días
-                    if (current_time - file_time).days > 2:
-                        files_to_delete.append(filename)
-                except:
-                    continue
-        
-        # Eliminar archivos antiguos
-        for filename in files_to_delete:
-            try:
-                os.remove(filename)
-                print(f"🗑️ Eliminado archivo antiguo: {filename}")
-            except Exception as e:
-                print(f"Error eliminando {filename}: {e}")
-                
-    except Exception as e:
-        print(f"Error limpiando archivos antiguos: {e}")
-
-def create_html_file(all_headlines, data_articles_el_mundo, data_articles_el_confidencial, data_articles_el_diario):
-    """Crea un archivo HTML con todos los titulares y artículos de datos"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def scrape_sources(sources, session=None, cache=None, dates=None, metrics=NO_METRICS, resilience=None, archive=None,
+                   author_articles=1, health=None):
+    """Descarga en paralelo portadas y páginas de autor de los periódicos y devuelve (titulares, artículos de datos por periódico).
+    Con resilience, lo que falla o no llega a tiempo se completa con lo último bueno, marcado con 'stale'.
+    Con health (un SelectorHealth), las cascadas de selectores se prueban en el orden que funciona y se vigilan.
+    Con archive (un AuthorArchive), de cada autor se recorre su archivo hasta reunir sus author_articles últimos
+    artículos o llegar a uno ya conocido, y se devuelven los author_articles últimos guardados."""
+    session = session or get_session()
+    # Una sola fecha de referencia para toda la ejecución, aunque cruce la medianoche
+    dates = dates or DateClassifier()
+    front_pages = [(source.url, get_headlines, (source, session, cache, dates, metrics, resilience, health))
+                   for source in sources]
+    if archive is None:
+        author_pages = [(author.url, get_latest_article,
+                         (source, author.url, author.name, session, cache, dates, metrics, resilience, health))
+                        for source in sources for author in source.authors]
+    else:
+        # Las huellas conocidas se leen aquí: la conexión SQLite no sale del hilo principal
+        fetch = lambda url: fetch_page(url, session, cache, resilience=resilience)
+        author_pages = [(author.url, author_feeds.crawl_author,
+                         (source, author, author_articles, archive.known(author.url), fetch, metrics))
+                        for source in sources for author in source.authors]
+    author_urls = {url for url, _, _ in author_pages}
     
-    html_content = f"""<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Titulares de Periódicos - {timestamp}</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .header {{
-            text-align: center;
-            margin-bottom: 30px;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border-radius: 10px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        }}
-        .newspaper-section {{
-            margin-bottom: 30px;
-            background: white;
-            border-radius: 10px;
-            padding: 20px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .newspaper-title {{
-            font-size: 24px;
-            font-weight: bold;
-            margin-bottom: 15px;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #eee;
-            color: #333;
-        }}
-        .data-section {{
-            margin-top: 20px;
-            padding-top: 20px;
-            border-top: 2px solid #667eea;
-        }}
-        .data-title {{
-            font-size: 20px;
-            font-weight: bold;
-            margin-bottom: 15px;
-            color: #667eea;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }}
-        .status-indicator {{
-            font-size: 14px;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-weight: normal;
-        }}
-        .status-new {{
-            background-color: #28a745;
-            color: white;
-        }}
-        .status-old {{
-            background-color: #6c757d;
-            color: white;
-        }}
-        .headline {{
-            margin-bottom: 15px;
-            padding: 10px;
-            border-left: 4px solid #667eea;
-            background-color: #f8f9fa;
-            transition: all 0.3s ease;
-        }}
-        .headline:hover {{
-            background-color: #e9ecef;
-            transform: translateX(5px);
-        }}
-        .headline a {{
-            color: #333;
-            text-decoration: none;
-            font-size: 16px;
-            line-height: 1.4;
-        }}
-        .headline a:hover {{
-            color: #667eea;
-        }}
-        .author-name {{
-            font-size: 14px;
-            color: #666;
-            font-style: italic;
-            margin-top: 5px;
-        }}
-        .timestamp {{
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-            margin-top: 20px;
-        }}
-        .error {{
-            color: #dc3545;
-            font-style: italic;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>📰 Titulares de Periódicos</h1>
-        <p>Actualizado el {timestamp}</p>
-    </div>
-"""
+    def fallback(url):
+        # Lo último bueno de un autor es un artículo, no la lista que devuelve el recorrido del archivo
+        if archive is not None and url in author_urls:
+            return None
+        return resilience.stale(url)
     
-    newspapers = {}
-    for headline in all_headlines:
-        source = headline['source']
-        if source not in newspapers:
-            newspapers[source] = []
-        newspapers[source].append(headline)
+    results = run_tasks_concurrently(front_pages + author_pages, fallback=fallback if resilience is not None else None)
     
-    for newspaper, headlines in newspapers.items():
-        html_content += f"""
-    <div class="newspaper-section">
-        <div class="newspaper-title">📰 {newspaper}</div>
-"""
-        
-        if headlines:
-            for i, headline in enumerate(headlines, 1):
-                html_content += f"""
-        <div class="headline">
-            <a href="{html.escape(headline['link'])}" target="_blank">{i}. {html.escape(headline['title'])}</a>
-        </div>
-"""
-        else:
-            html_content += f"""
-        <div class="headline error">
-            No se pudieron extraer titulares de {newspaper}
-        </div>
-"""
-        
-        # Añadir sección de datos para El Mundo
-        if newspaper == 'El Mundo' and data_articles_el_mundo:
-            # Contar artículos nuevos
-            new_articles_count = sum(1 for article in data_articles_el_mundo if article.get('is_new', False))
-            status_text = "Hay artículos nuevos" if new_articles_count > 0 else "Sin novedades"
-            status_class = "status-new" if new_articles_count > 0 else "status-old"
-            
-            html_content += f"""
-        <div class="data-section">
-            <div class="data-title">
-                <span>📊 Datos y Gráficos</span>
-                <span class="status-indicator {status_class}">{status_text}</span>
-            </div>
-"""
-            for article in data_articles_el_mundo:
-                html_content += f"""
-            <div class="headline">
-                <a href="{html.escape(article['link'])}" target="_blank">{html.escape(article['title'])}</a>
-                <div class="author-name">Por {article['author']}</div>
-            </div>
-"""
-            html_content += """
-        </div>
-"""
-        
-        # Añadir sección de datos para El Confidencial
-        if newspaper == 'El Confidencial' and data_articles_el_confidencial:
-            # Contar artículos nuevos
-            new_articles_count = sum(1 for article in data_articles_el_confidencial if article.get('is_new', False))
-            status_text = "Hay artículos nuevos" if new_articles_count > 0 else "Sin novedades"
-            status_class = "status-new" if new_articles_count > 0 else "status-old"
-            
-            html_content += f"""
-        <div class="data-section">
-            <div class="data-title">
-                <span>📊 Datos y Gráficos</span>
-                <span class="status-indicator {status_class}">{status_text}</span>
-            </div>
-"""
-            for article in data_articles_el_confidencial:
-                html_content += f"""
-            <div class="headline">
-                <a href="{html.escape(article['link'])}" target="_blank">{html.escape(article['title'])}</a>
-                <div class="author-name">Por {article['author']}</div>
-            </div>
-"""
-            html_content += """
-        </div>
-"""
-        
-        # Añadir sección de datos para El Diario
-        if newspaper == 'El Diario' and data_articles_el_diario:
-            # Contar artículos nuevos
-            new_articles_count = sum(1 for article in data_articles_el_diario if article.get('is_new', False))
-            status_text = "Hay artículos nuevos" if new_articles_count > 0 else "Sin novedades"
-            status_class = "status-new" if new_articles_count > 0 else "status-old"
-            
-            html_content += f"""
-        <div class="data-section">
-            <div class="data-title">
-                <span>📊 Datos y Gráficos</span>
-                <span class="status-indicator {status_class}">{status_text}</span>
-            </div>
-"""
-            for article in data_articles_el_diario:
-                html_content += f"""
-            <div class="headline">
-                <a href="{html.escape(article['link'])}" target="_blank">{html.escape(article['title'])}</a>
-                <div class="author-name">Por {article['author']}</div>
-            </div>
-"""
-            html_content += """
-        </div>
-"""
-        
-        html_content += """
-    </div>
-"""
+    all_headlines = []
+    for headlines in results[:len(front_pages)]:
+        all_headlines.extend(headlines or [])
     
-    html_content += f"""
-    <div class="timestamp">
-        Script ejecutado el {timestamp}
-    </div>
-</body>
-</html>"""
+    if archive is not None:
+        # Lo nuevo de cada autor se anota y se sirven sus últimos artículos, aunque el recorrido haya fallado
+        crawled = {url: articles for (url, _, _), articles in zip(author_pages, results[len(front_pages):])}
+        return all_headlines, author_feeds.latest_articles(archive, sources, author_articles, crawled, dates)
     
-    filename = f"titulares_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Repartir los artículos de autor en el mismo orden en que se pidieron
+    author_results = iter(results[len(front_pages):])
+    data_articles = {}
+    for source in sources:
+        articles = [next(author_results) for _ in source.authors]
+        data_articles[source.name] = [article for article in articles if article]
     
+    return all_headlines, data_articles
+
+def write_outputs(output_sinks, outputs, upload_manager, all_headlines, data_articles, stories, generated, metrics=NO_METRICS):
+    """Escribe todas las salidas, anota la página en el directorio de salida y encola las subidas.
+    Devuelve la ruta de la página HTML (o del primer archivo si no hay página)"""
+    with metrics.span('render') as span:
+        artifacts = sinks.write_all(output_sinks, all_headlines, data_articles, stories, generated)
+        filename = next((path for path in artifacts if path.endswith('.html')), artifacts[0])
+        span.set(bytes=sum(os.path.getsize(path) for path in artifacts), files=len(artifacts))
+    
+    # Anotar la página nueva, apuntar latest.html a ella y retirar las que sobran, sin listar el directorio
+    pages = [path for path in artifacts if outputs.is_page(path)]
+    retired = []
+    if pages:
+        try:
+            retired = outputs.register(pages[0])
+            for removed in retired:
+                print(f"🗑️ Retirado archivo antiguo: {removed}")
+            artifacts.append(outputs.latest_path)
+        except Exception as e:
+            print(f"Error actualizando el directorio de salida: {e}")
+    if upload_manager is not None:
+        # Las subidas van en segundo plano mientras se guardan el histórico y las métricas;
+        # lo retirado del directorio también se borra del destino
+        upload_manager.submit(artifacts)
+        upload_manager.remove([os.path.join(outputs.directory, removed) for removed in retired])
     return filename
 
-def main():
+def write_metrics(metrics):
+    """Guarda las medidas de la ejecución en líneas JSON y, si se pide, en formato de Prometheus"""
+    jsonl_path = os.environ.get(METRICS_ENV_VAR, METRICS_FILE)
+    prometheus_path = os.environ.get(PROMETHEUS_ENV_VAR)
+    try:
+        if jsonl_path:
+            metrics.write_jsonl(jsonl_path)
+        if prometheus_path:
+            metrics.write_prometheus(prometheus_path)
+    except Exception as e:
+        print(f"Error guardando las métricas: {e}")
+
+def main(argv=None):
     """Función principal que ejecuta todo el proceso"""
+    # Todo se configura con variables de entorno (HEADLINES_*); los argumentos solo dan la ayuda
+    argparse.ArgumentParser(description="Extrae los titulares y los artículos de datos y genera la página HTML",
+                            epilog="Se configura con las variables de entorno HEADLINES_* (ver README)").parse_args(argv)
     print("🚀 Iniciando extracción de titulares...")
     
-    # Limpiar archivos antiguos
-    print("🧹 Limpiando archivos antiguos...")
-    clean_old_files()
+    # Las páginas van al directorio de salida, que lleva su propio índice y su política de conservación
+    outputs = OutputDirectory.from_env()
     
-    all_headlines = []
+    # HEADLINES_SOURCES permite usar otro registro de periódicos en JSON
+    sources_path = os.environ.get('HEADLINES_SOURCES')
+    sources = load_sources(sources_path) if sources_path else SOURCES
+    # HEADLINES_AUTHORS cambia los autores de cada periódico; HEADLINES_AUTHOR_ARTICLES, cuántos artículos de cada uno
+    sources = author_feeds.sources_from_env(sources)
+    # HEADLINES_FEEDS=0 extrae los titulares siempre de la portada HTML, aunque el periódico tenga feed
+    sources = feed_parsing.sources_from_env(sources)
+    author_articles = author_feeds.articles_from_env()
     
-    print("📰 Extrayendo de El Mundo...")
-    all_headlines.extend(get_headlines_el_mundo())
+    session = get_session()
+    cache = HttpCache()
+    metrics = Metrics()
+    # Cortacircuitos por dominio, peticiones duplicadas si tardan y lo último bueno si una página falla
+    # Las peticiones duplicadas cuentan en el mismo límite por dominio que las demás
+    resilience = Resilience(max_per_host=MAX_PER_HOST)
+    # Qué selector funciona en cada página, para probarlo primero y avisar si la maquetación cambia
+    health = SelectorHealth()
+    # HEADLINES_SINKS elige las salidas; HEADLINES_UPLOAD, adónde se publican
+    output_sinks = sinks.sinks_from_env(directory=outputs.directory)
+    upload_manager = UploadManager.from_env(root=outputs.directory)
     
-    print("📰 Extrayendo de El Confidencial...")
-    all_headlines.extend(get_headlines_el_confidencial())
+    # HEADLINES_RECORD graba todas las respuestas en un directorio; HEADLINES_REPLAY las sirve desde uno grabado
+    recorder = replay_server = None
+    # replay (y con él http.server) solo se importa si se pide una de las dos cosas
+    record_dir = os.environ.get('HEADLINES_RECORD')
+    replay_dir = os.environ.get('HEADLINES_REPLAY')
+    if replay_dir:
+        from replay import replay_sources, start_replay_server
+        replay_server, urls = start_replay_server(replay_dir)
+        sources = replay_sources(sources, urls)
+        cache = None
+        resilience = None
+        health = None
+        print(f"🎞️ Reproduciendo las páginas grabadas en {replay_dir}")
+    elif record_dir:
+        # Sin caché, para que todas las páginas se descarguen y queden grabadas
+        from replay import Recorder
+        recorder = Recorder(record_dir)
+        recorder.attach(session)
+        cache = None
     
-    print("📰 Extrayendo de El Diario...")
-    all_headlines.extend(get_headlines_el_diario())
+    print(f"📰 Extrayendo titulares de {', '.join(source.name for source in sources)}...")
+    print("📊 Extrayendo artículos de datos de sus autores...")
+    if author_articles > 1:
+        print(f"📚 Hasta {author_articles} artículos por autor, recorriendo sus archivos")
+    # Con más de un artículo por autor se recorren sus archivos, guardando lo ya visto para parar donde se quedó
+    archive = author_feeds.AuthorArchive() if author_articles > 1 and replay_server is None else None
+    with metrics.span('scrape'):
+        try:
+            all_headlines, data_articles = scrape_sources(sources, session, cache, metrics=metrics, resilience=resilience,
+                                                          archive=archive, author_articles=author_articles, health=health)
+        finally:
+            if archive is not None:
+                archive.close()
     
-    print("📊 Extrayendo artículos de datos de El Mundo...")
-    data_articles_el_mundo = get_data_articles_el_mundo()
+    if replay_server is not None:
+        replay_server.shutdown()
+    if recorder is not None:
+        print(f"🎞️ Grabadas {recorder.save()} páginas en {record_dir}")
+    if cache is not None:
+        try:
+            cache.save()
+        except Exception as e:
+            print(f"Error guardando la caché HTTP: {e}")
+    if resilience is not None:
+        resilience.close()
+        try:
+            resilience.save()
+        except Exception as e:
+            print(f"Error guardando el estado de resiliencia: {e}")
+    if health is not None:
+        try:
+            health.save()
+        except Exception as e:
+            print(f"Error guardando la salud de los selectores: {e}")
     
-    print("📊 Extrayendo artículos de datos de El Confidencial...")
-    data_articles_el_confidencial = get_data_articles_el_confidencial()
+    # Comparar con la ejecución anterior para no rehacer nada si no ha cambiado
+    tracker = ChangeTracker()
+    changes = tracker.compare(all_headlines, data_articles)
+    changed_sections = [section for section, summary in changes.items() if summary['changed']]
+    
+    if not changed_sections and tracker.last_output and os.path.exists(tracker.last_output):
+        filename = tracker.last_output
+        print(f"😴 Sin cambios desde la última ejecución, se mantiene {filename}")
+        if upload_manager is not None:
+            # Por si la última subida falló; si ya está publicada no se vuelve a enviar
+            upload_manager.submit([filename])
+    else:
+        for section in changed_sections:
+            summary = changes[section]
+            print(f"🔄 {section}: {summary['new']} nuevos, {summary['moved']} movidos, {summary['dropped']} desaparecidos")
+        
+        # Las historias que abren varias portadas se muestran una sola vez, con todos sus periódicos
+        with metrics.span('stories') as span:
+            stories = cluster_stories(all_headlines)
+            span.set(stories=len(stories))
+        if stories:
+            print(f"🧵 {len(stories)} historias en varias portadas")
+        
+        # Los artículos de datos se completan en segundo plano mientras se genera y publica la página;
+        # las reproducciones no salen a la red
+        enricher = Enricher.from_env(session) if replay_server is None else None
+        if enricher is not None:
+            try:
+                pending = enricher.start(data_articles)
+                print(f"📖 Completando {pending} artículos de datos en segundo plano "
+                      f"({enricher.stats['cached']} ya estaban guardados)")
+            except Exception as e:
+                print(f"Error preparando el enriquecimiento de artículos: {e}")
+                enricher = None
+        
+        print("💾 Creando archivo HTML...")
+        generated = datetime.now()
+        filename = write_outputs(output_sinks, outputs, upload_manager, all_headlines, data_articles, stories, generated,
+                                 metrics)
+        
+        # Las reproducciones de páginas grabadas no son titulares nuevos
+        if replay_server is None:
+            print("🗃️ Guardando en el histórico...")
+            try:
+                with HistoryStore() as store:
+                    store.record_run(all_headlines, data_articles)
+            except Exception as e:
+                print(f"Error guardando el histórico: {e}")
+        
+        if enricher is not None:
+            # Lo que llega antes del límite de tiempo se guarda y las salidas se reescriben a medida que llega
+            # (como mucho cada pocos segundos), con la misma fecha: solo cambian las secciones de los artículos completados
+            with metrics.span('enrich') as span:
+                rewrites = 0
+                for _ in enricher.batches():
+                    filename = write_outputs(output_sinks, outputs, upload_manager, all_headlines, data_articles,
+                                             stories, generated, metrics)
+                    rewrites += 1
+                stats = enricher.close()
+                span.set(rewrites=rewrites, **stats)
+            print(f"📖 Artículos completos: {stats['fetched']} descargados, {stats['cached']} ya guardados, "
+                  f"{stats['skipped']} para la próxima, {stats['failed']} con error ({stats['bytes'] / 1024:.0f} KB); "
+                  f"salidas reescritas {rewrites} {'vez' if rewrites == 1 else 'veces'}")
     
-    print("📊 Extrayendo artículos de datos de El Diario...")
-    data_articles_el_diario = get_data_articles_el_diario()
+    try:
+        tracker.commit(filename)
+    except Exception as e:
+        print(f"Error guardando el estado de cambios: {e}")
     
-    print("💾 Creando archivo HTML...")
-    filename = create_html_file(all_headlines, data_articles_el_mundo, data_articles_el_confidencial, data_articles_el_diario)
+    # Cuántos titulares y artículos salen de cada periódico, para avisar si alguno se queda a cero
+    for source in sources:
+        metrics.count('items', sum(1 for headline in all_headlines if headline['source'] == source.name),
+                      source=source.name, kind='headline')
+        if source.authors:
+            metrics.count('items', len(data_articles[source.name]), source=source.name, kind='data')
+    write_metrics(metrics)
     
     print(f"✅ ¡Completado! Se han extraído {len(all_headlines)} titulares")
-    print(f"📊 Se han extraído {len(data_articles_el_mundo)} artículos de datos de El Mundo")
-    print(f"📊 Se han extraído {len(data_articles_el_confidencial)} artículos de datos de El Confidencial")
-    print(f"📊 Se han extraído {len(data_articles_el_diario)} artículos de datos de El Diario")
+    for source in sources:
+        if source.authors:
+            print(f"📊 Se han extraído {len(data_articles[source.name])} artículos de datos de {source.name}")
+    stats = connection_stats(session)
+    new_connections = sum(host['new'] for host in stats.values())
+    reused_connections = sum(host['reused'] for host in stats.values())
+    print(f"🔌 Conexiones: {new_connections} nuevas, {reused_connections} reutilizadas")
+    if cache is not None:
+        print(f"💽 Caché: {cache.stats['fresh']} frescas, {cache.stats['not_modified']} sin cambios (304), "
+              f"{cache.stats['downloaded']} descargadas; {cache.stats['bytes_downloaded'] // 1024} KB descargados, "
+              f"{cache.stats['bytes_saved'] // 1024} KB ahorrados")
+    if resilience is not None:
+        stats = resilience.stats
+        print(f"🛡️ Resiliencia: {stats['hedged']} peticiones duplicadas ({stats['hedge_wins']} ganaron), "
+              f"{stats['opened']} circuitos abiertos ({stats['short_circuited']} peticiones evitadas), "
+              f"{stats['stale']} páginas servidas sin actualizar")
+    if upload_manager is not None:
+        stats = upload_manager.close()
+        print(f"📤 Subidas: {stats['uploaded']} archivos ({stats['bytes_sent'] // 1024} KB enviados), "
+              f"{stats['unchanged']} sin cambios, {stats['deleted']} borrados, {stats['failed']} con error")
     print(f"📄 Archivo guardado como: {filename}")
     print(f"🌐 Abre {filename} en tu navegador para ver los resultados")
 
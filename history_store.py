@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Histórico de titulares en SQLite.
+Cada ejecución añade sus titulares y artículos de datos, y las consultas
+("¿qué abría El Mundo entre X e Y?", "¿cuándo apareció este enlace?") se
+resuelven con índices, sin volver a leer los titulares_*.html generados.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import datetime
+
+HISTORY_DB = 'historial_titulares.sqlite3'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    link_hash INTEGER PRIMARY KEY,
+    link TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    first_title TEXT NOT NULL,
+    first_source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    seen_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    link_hash INTEGER NOT NULL,
+    author TEXT,
+    published TEXT,
+    is_new INTEGER NOT NULL DEFAULT 0,
+    stale TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_run_at ON runs(run_at);
+CREATE INDEX IF NOT EXISTS idx_links_first_seen ON links(first_seen);
+CREATE INDEX IF NOT EXISTS idx_items_source_seen ON items(source, kind, position, seen_at);
+CREATE INDEX IF NOT EXISTS idx_items_link ON items(link_hash, seen_at);
+CREATE INDEX IF NOT EXISTS idx_items_run ON items(run_id);
+"""
+# Columnas de items añadidas después de crearse la tabla: se añaden a los históricos que no las tienen
+ITEM_COLUMNS = {'published': 'TEXT', 'is_new': 'INTEGER NOT NULL DEFAULT 0', 'stale': 'TEXT'}
+
+
+def link_hash(link):
+    """Resume un enlace en un entero de 64 bits para indexarlo"""
+    return int.from_bytes(hashlib.sha1(link.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+
+class HistoryStore:
+    """Almacén de todos los titulares y artículos de datos extraídos en cada ejecución"""
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.migrate()
+
+    def migrate(self):
+        """Añade a items las columnas que le falten (históricos creados con una versión anterior)"""
+        existing = {row[1] for row in self.connection.execute('PRAGMA table_info(items)')}
+        with self.connection:
+            for column, definition in ITEM_COLUMNS.items():
+                if column not in existing:
+                    self.connection.execute(f'ALTER TABLE items ADD COLUMN {column} {definition}')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record_run(self, all_headlines, data_articles, run_at=None):
+        """Guarda los titulares y los artículos de datos (por periódico) de una ejecución y devuelve su id.
+        Lo servido sin actualizar ('stale') se guarda marcado, para poder volver a generar la página tal cual,
+        pero no cuenta como visto en esta ejecución: ni en leads ni en appearances, y su primera aparición
+        es la de cuando se extrajo"""
+        seen_at = (run_at or datetime.now()).strftime(TIME_FORMAT)
+        rows = []
+        positions = {}
+        for headline in all_headlines:
+            positions[headline['source']] = positions.get(headline['source'], 0) + 1
+            rows.append((headline['source'], 'headline', positions[headline['source']], headline, None))
+        for source, articles in data_articles.items():
+            for position, article in enumerate(articles, 1):
+                rows.append((source, 'data', position, article, article['author']))
+
+        with self.connection:
+            run_id = self.connection.execute('INSERT INTO runs (run_at) VALUES (?)', (seen_at,)).lastrowid
+            # Solo la primera aparición de cada enlace queda en links
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO links (link_hash, link, first_seen, first_title, first_source) VALUES (?, ?, ?, ?, ?)',
+                [(link_hash(item['link']), item['link'], stale_seen_at(item) or seen_at, item['title'], source)
+                 for source, _, _, item, _ in rows]
+            )
+            self.connection.executemany(
+                """INSERT INTO items (run_id, seen_at, source, kind, position, title, link_hash, author, published, is_new, stale)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(run_id, seen_at, source, kind, position, item['title'], link_hash(item['link']), author,
+                  item.get('published'), int(bool(item.get('is_new'))), item.get('stale'))
+                 for source, kind, position, item, author in rows]
+            )
+        return run_id
+
+    def leads(self, source, start, end, position=1):
+        """Devuelve (fecha, título, enlace) de lo que un periódico llevaba en una posición entre dos fechas"""
+        return self.connection.execute(
+            """SELECT items.seen_at, items.title, links.link FROM items
+               JOIN links ON links.link_hash = items.link_hash
+               WHERE items.source = ? AND items.kind = 'headline' AND items.position = ?
+                 AND items.seen_at >= ? AND items.seen_at <= ? AND items.stale IS NULL
+               ORDER BY items.seen_at""",
+            (source, position, start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT))
+        ).fetchall()
+
+    def first_seen(self, link):
+        """Devuelve (fecha, título, periódico) de la primera vez que apareció un enlace, o None"""
+        return self.connection.execute(
+            'SELECT first_seen, first_title, first_source FROM links WHERE link_hash = ? AND link = ?',
+            (link_hash(link), link)
+        ).fetchone()
+
+    def appearances(self, link):
+        """Devuelve (fecha, periódico, tipo, posición) de todas las veces que ha aparecido un enlace"""
+        return self.connection.execute(
+            'SELECT seen_at, source, kind, position FROM items WHERE link_hash = ? AND stale IS NULL ORDER BY seen_at',
+            (link_hash(link),)
+        ).fetchall()
+
+    def load_run(self, run_id=None):
+        """Devuelve (fecha, titulares, artículos de datos por periódico) de una ejecución (por defecto, la última),
+        con la misma forma que los resultados de la extracción, o None si no existe"""
+        if run_id is None:
+            run = self.connection.execute('SELECT id, run_at FROM runs ORDER BY id DESC LIMIT 1').fetchone()
+        else:
+            run = self.connection.execute('SELECT id, run_at FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if run is None:
+            return None
+        all_headlines = []
+        data_articles = {}
+        for source, kind, title, link, author, published, is_new, stale in self.connection.execute(
+                """SELECT items.source, items.kind, items.title, links.link, items.author,
+                          items.published, items.is_new, items.stale FROM items
+                   JOIN links ON links.link_hash = items.link_hash
+                   WHERE items.run_id = ?
+                   ORDER BY items.rowid""",
+                (run[0],)):
+            if kind == 'headline':
+                item = {'title': title, 'link': link, 'source': source, 'published': published}
+                all_headlines.append(item)
+            else:
+                item = {'title': title, 'link': link, 'author': author, 'published': published, 'is_new': bool(is_new)}
+                data_articles.setdefault(source, []).append(item)
+            if stale:
+                item['stale'] = stale
+        return datetime.strptime(run[1], TIME_FORMAT), all_headlines, data_articles
+
+
+def stale_seen_at(item):
+    """Cuándo se extrajo lo que se sirve sin actualizar, con el formato del histórico (None si está al día)"""
+    return datetime.fromisoformat(item['stale']).strftime(TIME_FORMAT) if item.get('stale') else None
+
+
+def parse_date(value):
+    """Acepta 'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM[:SS]'"""
+    for date_format in (TIME_FORMAT, '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"fecha no válida: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas al histórico de titulares")
+    parser.add_argument('--db', default=HISTORY_DB, help="Base de datos del histórico")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    leads_parser = subparsers.add_parser('leads', help="Qué llevaba un periódico en portada entre dos fechas")
+    leads_parser.add_argument('source', help="Periódico, p. ej. 'El Mundo'")
+    leads_parser.add_argument('start', type=parse_date, help="Desde (YYYY-MM-DD [HH:MM])")
+    leads_parser.add_argument('end', type=parse_date, help="Hasta (YYYY-MM-DD [HH:MM])")
+    leads_parser.add_argument('--position', type=int, default=1, help="Posición del titular (1 = apertura)")
+
+    first_seen_parser = subparsers.add_parser('first-seen', help="Cuándo apareció por primera vez un enlace")
+    first_seen_parser.add_argument('link')
+
+    args = parser.parse_args(argv)
+    with HistoryStore(args.db) as store:
+        if args.command == 'leads':
+            # Una fecha sin hora como final incluye el día entero
+            end = args.end.replace(hour=23, minute=59, second=59) if args.end.time() == datetime.min.time() else args.end
+            rows = store.leads(args.source, args.start, end, args.position)
+            if not rows:
+                print(f"Sin titulares de {args.source} en ese periodo")
+            for seen_at, title, link in rows:
+                print(f"{seen_at}  {title}\n                     {link}")
+        else:
+            row = store.first_seen(args.link)
+            if row is None:
+                print("Ese enlace no aparece en el histórico")
+            else:
+                first_seen, title, source = row
+                print(f"📅 Visto por primera vez el {first_seen} en {source}: {title}")
+                for seen_at, source, kind, position in store.appearances(args.link):
+                    section = 'portada' if kind == 'headline' else 'datos'
+                    print(f"   {seen_at}  {source} ({section}, posición {position})")
+
+
+if __name__ == "__main__":
+    main()
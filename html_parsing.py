@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Backends de parseo HTML para el extractor de titulares.
+Usa selectolax (lexbor) o lxml cuando están instalados y html.parser como
+alternativa en Python puro. Todos se usan con la misma API de BeautifulSoup
+(select, select_one, get_text, get) para que los extractores no dependan del
+backend elegido.
+Los parsers se importan la primera vez que hacen falta: cargar este módulo (o
+el registro de periódicos, que prepara sus selectores) no cuesta nada a las
+órdenes que no parsean HTML.
+"""
+
+import os
+import re
+from importlib.util import find_spec
+
+# Backends por orden de preferencia; HEADLINES_PARSER fuerza uno concreto
+BACKENDS = ('selectolax', 'lxml', 'html.parser')
+BACKEND_ENV_VAR = 'HEADLINES_PARSER'
+
+# Último compuesto de un selector ("h2 a" -> "a", ".m-principal a" -> "a", ".gac-principal__titleLink")
+LAST_COMPOUND = re.compile(r'(?:^|[\s>+~])([^\s>+~]+)$')
+COMPOUND_GUARD = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)')
+
+# Módulo del que depende cada backend (html.parser viene con Python)
+BACKEND_MODULES = {'selectolax': 'selectolax', 'lxml': 'lxml', 'html.parser': None}
+
+
+class SelectolaxNode:
+    """Adapta un nodo de selectolax al subconjunto de la API de BeautifulSoup que usan los extractores"""
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, selector):
+        return [SelectolaxNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector):
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def get_text(self):
+        return self.node.text(deep=True)
+
+    def get(self, name, default=None):
+        value = self.node.attributes.get(name)
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+def is_available(backend):
+    """Indica si un backend de parseo está instalado (sin importarlo)"""
+    if backend not in BACKEND_MODULES:
+        return False
+    module = BACKEND_MODULES[backend]
+    return module is None or find_spec(module) is not None
+
+
+def available_backends():
+    """Devuelve los backends instalados por orden de preferencia"""
+    return [backend for backend in BACKENDS if is_available(backend)]
+
+
+def default_backend():
+    """Elige el backend a usar: el de HEADLINES_PARSER si está instalado, o el más rápido disponible"""
+    requested = os.environ.get(BACKEND_ENV_VAR)
+    if requested and is_available(requested):
+        return requested
+    return available_backends()[0]
+
+
+def make_soup(content, only_class=None, backend=None):
+    """Parsea un documento; con only_class solo se construyen los elementos con esa clase y su contenido"""
+    backend = backend or default_backend()
+    if backend == 'selectolax':
+        from selectolax.lexbor import LexborHTMLParser
+        # lexbor parsea el documento entero más rápido de lo que bs4 filtra con SoupStrainer
+        return SelectolaxNode(LexborHTMLParser(content).root)
+    from bs4 import BeautifulSoup, SoupStrainer
+    parse_only = SoupStrainer(class_=only_class) if only_class else None
+    return BeautifulSoup(content, backend, parse_only=parse_only)
+
+
+def selector_guard(selector):
+    """Extrae la etiqueta y las clases que debe tener un elemento para poder casar con el selector"""
+    match = LAST_COMPOUND.search(selector.strip())
+    if not match:
+        return None, ()
+    guard = COMPOUND_GUARD.match(match.group(1))
+    tag = guard.group(1).lower() if guard.group(1) else None
+    classes = tuple(cls for cls in guard.group(2).split('.') if cls)
+    return tag, classes
+
+
+class SelectorReport:
+    """Lo que ha hecho cada selector de una cascada en un documento: elementos que casan, resultados válidos y
+    resultados usados, y si se llegó a evaluar entero (si no, que no diera nada no dice nada de su salud)"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self.matched = [0] * len(self.selectors)
+        self.accepted = [0] * len(self.selectors)
+        self.used = [0] * len(self.selectors)
+        self.complete = [False] * len(self.selectors)
+        self.origins = []  # Selector que dio cada resultado, en el orden de los resultados
+
+    def evaluated(self):
+        """Selectores de los que se sabe algo: los que han dado resultados o se evaluaron enteros"""
+        return [position for position in range(len(self.selectors))
+                if self.accepted[position] or self.complete[position]]
+
+
+class SelectorSet:
+    """Cascada de selectores CSS compilada que recorre el documento una sola vez"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self._compiled = None  # Se compilan con soupsieve la primera vez que se recorre un documento de bs4
+        self.guards = [selector_guard(selector) for selector in self.selectors]
+        self.union = ', '.join(self.selectors)  # Todos los selectores en uno, para buscar en orden de documento
+        self._views = {}  # Orden (posiciones) -> la misma cascada reordenada
+
+    def ranked(self, order):
+        """La misma cascada probando los selectores en otro orden (posiciones de esta); se reutiliza entre documentos"""
+        order = tuple(order)
+        if order == tuple(range(len(self.selectors))):
+            return self
+        view = self._views.get(order)
+        if view is None:
+            view = SelectorSet([self.selectors[position] for position in order])
+            if self._compiled is not None:
+                view._compiled = [self._compiled[position] for position in order]
+            self._views[order] = view
+        return view
+
+    def __iter__(self):
+        return iter(self.selectors)
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            import soupsieve
+            self._compiled = [soupsieve.compile(selector) for selector in self.selectors]
+        return self._compiled
+
+    def first(self, soup, quota, extract, key=None, report=None):
+        """Devuelve hasta quota resultados de extract() en el mismo orden que la cascada de select() por prioridad.
+        Con key, los resultados con la misma clave solo cuentan una vez (se queda el de más prioridad).
+        Con report (un SelectorReport de esta cascada) se anota lo que ha hecho cada selector."""
+        if isinstance(soup, SelectolaxNode):
+            # selectolax ya resuelve cada select() en C; recorrerlo desde Python sería más lento
+            return self.cascade(soup, quota, extract, key, report)
+        from bs4.element import Tag
+
+        # Un cubo por selector con lo extraído de cada elemento que casa, en orden de documento
+        buckets = [[] for _ in self.selectors]
+        checks = list(zip(self.compiled, self.guards, buckets, range(len(buckets))))
+        active = checks
+        # Resultados distintos que aporta cada cubo: una clave cuenta solo en el cubo de más prioridad que la tiene
+        unique_counts = [0] * len(buckets)
+        best_bucket = {}
+        finished = True
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+            classes = element.get('class') or ()
+            found = False
+            for compiled, (tag, required), bucket, position in active:
+                if tag and tag != element.name:
+                    continue
+                if required and not all(cls in classes for cls in required):
+                    continue
+                if not compiled.match(element):
+                    continue
+                if report is not None:
+                    report.matched[position] += 1
+                item = extract(element)
+                if item is None:
+                    continue
+                bucket.append(item)
+                found = True
+                item_key = key(item) if key is not None else id(item)
+                previous = best_bucket.get(item_key)
+                if previous is None or position < previous:
+                    if previous is not None:
+                        unique_counts[previous] -= 1
+                    best_bucket[item_key] = position
+                    unique_counts[position] += 1
+            if not found:
+                continue
+            # Los selectores cuyos cubos ya no pueden entrar en el cupo dejan de evaluarse
+            filled = 0
+            for needed, count in enumerate(unique_counts, 1):
+                filled += count
+                if filled >= quota:
+                    active = checks[:needed]
+                    break
+            # Nada de menor prioridad puede desplazar a lo que ya ha dado el primer selector
+            if unique_counts[0] >= quota:
+                finished = False
+                break
+
+        if report is not None:
+            for position, bucket in enumerate(buckets):
+                report.accepted[position] += len(bucket)
+                # Los que se dejaron de evaluar a mitad del documento no se vieron enteros
+                report.complete[position] = finished and position < len(active)
+        return take(buckets, quota, key, report)
+
+    def cascade(self, soup, quota, extract, key=None, report=None):
+        """Recorre los selectores uno a uno con select(), como hacían antes los extractores"""
+        results = []
+        seen = set()
+        for position, selector in enumerate(self.selectors):
+            elements = soup.select(selector)
+            if report is not None:
+                report.matched[position] += len(elements)
+            for element in elements:
+                item = extract(element)
+                if item is None:
+                    continue
+                if report is not None:
+                    report.accepted[position] += 1
+                if key is not None:
+                    item_key = key(item)
+                    if item_key in seen:
+                        continue
+                    seen.add(item_key)
+                results.append(item)
+                if report is not None:
+                    report.used[position] += 1
+                    report.origins.append(selector)
+                if len(results) >= quota:
+                    return results
+            if report is not None:
+                report.complete[position] = True
+        return results
+
+    def in_document_order(self, soup, quota, extract, key=None):
+        """Hasta quota resultados de extract() de los elementos que casan con cualquier selector de la cascada,
+        en el orden en que aparecen en el documento (sin prioridades; con key, sin repetir claves)"""
+        results = []
+        seen = set()
+        if not self.selectors:
+            return results
+        for element in soup.select(self.union):
+            item = extract(element)
+            if item is None:
+                continue
+            if key is not None:
+                item_key = key(item)
+                if item_key in seen:
+                    continue
+                seen.add(item_key)
+            results.append(item)
+            if len(results) >= quota:
+                break
+        return results
+
+    def first_element(self, soup, extract, report=None):
+        """extract() del primer elemento que encuentra la cascada con select_one(), sea válido o no (None si no hay)"""
+        for position, selector in enumerate(self.selectors):
+            element = soup.select_one(selector)
+            if report is not None:
+                report.complete[position] = True
+            if element is None:
+                continue
+            item = extract(element)
+            if report is not None:
+                report.matched[position] = 1
+                if item is not None:
+                    report.accepted[position] = report.used[position] = 1
+                    report.origins.append(selector)
+            return item
+        return None
+
+def take(buckets, quota, key=None, report=None):
+    """Junta los cubos por prioridad hasta quota resultados, sin repetir claves si se indica key"""
+    results = []
+    seen = set()
+    for position, bucket in enumerate(buckets):
+        for item in bucket:
+            if key is not None:
+                item_key = key(item)
+                if item_key in seen:
+                    continue
+                seen.add(item_key)
+            results.append(item)
+            if report is not None:
+                report.used[position] += 1
+                report.origins.append(report.selectors[position])
+            if len(results) >= quota:
+                return results
+    return results
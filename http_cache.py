@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Caché HTTP en disco para las páginas descargadas por el extractor de titulares.
+Guarda los validadores (ETag / Last-Modified) y el cuerpo de cada página para
+hacer peticiones condicionales y reutilizar lo ya extraído cuando el servidor
+responde 304 Not Modified.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from streaming import read_until
+
+CACHE_DIR = '.http_cache'
+DEFAULT_MAX_AGE = 300  # Segundos durante los que una página se da por buena sin preguntar al servidor
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # Tamaño máximo de los cuerpos guardados antes de expulsar (LRU)
+
+
+class CachedResponse:
+    """Respuesta mínima compatible con lo que usan los extractores (content, status_code, url)"""
+
+    def __init__(self, url, content, status_code, not_modified=False, elapsed=None, raw=None, truncated=None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.not_modified = not_modified  # True si el cuerpo viene de la caché sin cambios
+        self.elapsed = elapsed  # Lo de requests: hasta recibir las cabeceras (None si no hubo petición)
+        self.raw = raw  # Respuesta de urllib3, con el historial de reintentos
+        self.truncated = truncated  # Por qué se cortó la descarga ('block', 'max_bytes') o None si está entera
+
+
+class HttpCache:
+    """Caché HTTP en disco con peticiones condicionales y expulsión LRU por tamaño"""
+
+    def __init__(self, directory=CACHE_DIR, max_age=DEFAULT_MAX_AGE, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.stats = {'fresh': 0, 'not_modified': 0, 'downloaded': 0, 'bytes_downloaded': 0, 'bytes_saved': 0}
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.body')
+
+    def _read_body(self, url):
+        try:
+            with open(self._body_path(url), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def fetch(self, session, url, timeout, until=None):
+        """Descarga una página usando la caché: sin petición si está fresca, condicional si no.
+        Con until (un EarlyStop) solo se descarga el principio de la página, y eso es lo que se guarda; una página
+        guardada a medias no se devuelve sin until, sino que se descarga entera y la sustituye."""
+        with self.lock:
+            entry = self.entries.get(url)
+            entry = dict(entry) if entry else None
+        body = self._read_body(url) if entry else None
+        if body is None:
+            entry = None
+        elif entry.get('truncated') and until is None:
+            # Solo se guardó el principio de la página: a quien la pide entera no le sirve, ni para preguntar si cambió
+            entry = None
+
+        now = time.time()
+        if entry and now - entry['stored_at'] < self.max_age:
+            self._touch(url, now)
+            self._count('fresh', bytes_saved=len(body))
+            return CachedResponse(url, body, 200, not_modified=True, truncated=entry.get('truncated'))
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(url, headers=headers, timeout=timeout, stream=until is not None)
+        if response.status_code == 304 and entry:
+            response.close()
+            with self.lock:
+                if url in self.entries:
+                    self.entries[url]['stored_at'] = now
+                    self.entries[url]['last_access'] = now
+            self._count('not_modified', bytes_saved=len(body))
+            return CachedResponse(url, body, 304, not_modified=True, elapsed=response.elapsed, raw=response.raw,
+                                  truncated=entry.get('truncated'))
+
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        content, truncated = read_until(response, until) if until is not None else (response.content, None)
+        self._store(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'), now, truncated)
+        self._count('downloaded', bytes_downloaded=len(content))
+        return CachedResponse(url, content, response.status_code, elapsed=response.elapsed, raw=response.raw,
+                              truncated=truncated)
+
+    def get_result(self, url):
+        """Devuelve lo extraído la última vez de una página (o None si no hay nada guardado)"""
+        with self.lock:
+            entry = self.entries.get(url)
+            # Copias, para que quien lo use pueda anotar los resultados sin tocar la caché
+            return copy.deepcopy(entry.get('result')) if entry else None
+
+    def set_result(self, url, result):
+        """Guarda lo extraído de una página para no volver a parsearla mientras no cambie"""
+        with self.lock:
+            if url in self.entries:
+                self.entries[url]['result'] = copy.deepcopy(result)
+
+    def save(self):
+        """Escribe el índice en disco de forma atómica"""
+        with self.lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    def _store(self, url, content, etag, last_modified, now, truncated=None):
+        # Temporal y renombrado: dos descargas de la misma página a la vez (peticiones duplicadas) no se mezclan
+        body_path = self._body_path(url)
+        tmp_path = f'{body_path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, body_path)
+        with self.lock:
+            self.entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': now,
+                'last_access': now,
+                'size': len(content),
+                'truncated': truncated,
+                'result': None
+            }
+            self._evict()
+
+    def _touch(self, url, now):
+        with self.lock:
+            if url in self.entries:
+                self.entries[url]['last_access'] = now
+
+    def _evict(self):
+        # Expulsar las páginas usadas hace más tiempo hasta volver al límite de tamaño
+        total = sum(entry['size'] for entry in self.entries.values())
+        for url in sorted(self.entries, key=lambda u: self.entries[u]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= self.entries.pop(url)['size']
+            try:
+                os.remove(self._body_path(url))
+            except OSError:
+                pass
+
+    def _count(self, key, bytes_downloaded=0, bytes_saved=0):
+        with self.lock:
+            self.stats[key] += 1
+            self.stats['bytes_downloaded'] += bytes_downloaded
+            self.stats['bytes_saved'] += bytes_saved
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Medidas de cada ejecución del extractor de titulares.
+Cada etapa (descarga, parseo, selectores, fechas, renderizado) de cada portada
+y página de autor queda como un tramo con su duración, y se cuentan bytes,
+códigos de estado, reintentos, aciertos de caché y extracciones vacías. Se
+guardan como líneas JSON y, opcionalmente, en formato de texto de Prometheus
+(textfile collector de node_exporter, compatible con OpenMetrics).
+El tiempo de conexión (DNS, TCP y TLS) sale de las conexiones que abre de
+verdad la sesión HTTP, sin resoluciones DNS aparte.
+"""
+
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+METRICS_FILE = 'metricas_titulares.jsonl'
+METRICS_ENV_VAR = 'HEADLINES_METRICS'  # Archivo de líneas JSON ('' para no guardarlas)
+PROMETHEUS_ENV_VAR = 'HEADLINES_PROMETHEUS'  # Archivo .prom para el textfile collector (opcional)
+
+METRIC_PREFIX = 'headlines_'
+LABEL_ESCAPES = re.compile(r'[\\"\n]')
+LABEL_REPLACEMENTS = {'\\': '\\\\', '"': '\\"', '\n': '\\n'}
+TIMED_STAGE = 'fetch'  # Tramo al que se suman las conexiones que se abren durante él
+
+# Tramo de descarga en curso; la petición principal de Resilience se lanza en otro hilo con este mismo contexto
+current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Tramo en curso: etiquetas, campos medidos y el instante en que empezó"""
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.fields = {}
+        self.start = time.perf_counter()
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+class Metrics:
+    """Tramos y contadores de una ejecución, seguros para usar desde varios hilos"""
+
+    def __init__(self):
+        self.run_at = datetime.now().isoformat(timespec='seconds')
+        self.spans = []
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Mide un tramo; los campos añadidos con span.set() se guardan con él"""
+        span = Span(stage, labels)
+        token = current_span.set(span) if stage == TIMED_STAGE else None
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=type(e).__name__)
+            self.count('errors', stage=stage, source=labels.get('source', ''))
+            raise
+        finally:
+            if token is not None:
+                current_span.reset(token)
+            self.add_span(stage, span.elapsed_ms(), **labels, **span.fields)
+
+    def add_span(self, stage, duration_ms, **fields):
+        """Guarda un tramo ya medido"""
+        with self.lock:
+            self.spans.append(dict(fields, stage=stage, duration_ms=round(duration_ms, 3)))
+
+    def count(self, name, value=1, **labels):
+        """Suma value al contador name con esas etiquetas"""
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def drain(self):
+        """Devuelve lo medido hasta ahora como unas medidas aparte y sigue midiendo desde cero con este mismo
+        objeto, así que lo que anoten los hilos que lo tienen no se pierde"""
+        drained = Metrics()
+        with self.lock:
+            drained.run_at, drained.spans, drained.counters = self.run_at, self.spans, self.counters
+            self.run_at = datetime.now().isoformat(timespec='seconds')
+            self.spans, self.counters = [], Counter()
+        return drained
+
+    def observe_response(self, span, response, **labels):
+        """Anota en el tramo de descarga el estado, los bytes, la caché, los reintentos y el reparto TTFB/descarga"""
+        host = urlsplit(response.url).hostname or ''
+        not_modified = getattr(response, 'not_modified', False)
+        cache = ('fresh' if response.status_code == 200 else 'not_modified') if not_modified else 'downloaded'
+        size = 0 if not_modified else len(response.content)
+        raw = getattr(response, 'raw', None)
+        retries = len(raw.retries.history) if raw is not None and getattr(raw, 'retries', None) else 0
+        span.set(status=response.status_code, bytes=size, cache=cache, retries=retries)
+        if getattr(response, 'truncated', None):
+            span.set(truncated=response.truncated)
+        # elapsed llega hasta las cabeceras e incluye la conexión, si hubo que abrir una (connect_ms)
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None and cache != 'fresh':
+            headers_ms = elapsed.total_seconds() * 1000
+            ttfb_ms = max(headers_ms - span.fields.get('connect_ms', 0), 0)
+            span.set(ttfb_ms=round(ttfb_ms, 3), download_ms=round(max(span.elapsed_ms() - headers_ms, 0), 3))
+        self.count('http_responses', host=host, status=str(response.status_code))
+        self.count('bytes_downloaded', size, source=labels.get('source', ''))
+        self.count('cache', result=cache)
+        if retries:
+            self.count('retries', retries, host=host)
+
+    def records(self):
+        """Devuelve tramos y contadores como diccionarios listos para JSON"""
+        with self.lock:
+            spans = list(self.spans)
+            counters = sorted(self.counters.items())
+        records = [dict(span, type='span', run_at=self.run_at) for span in spans]
+        records.extend({'type': 'counter', 'run_at': self.run_at, 'name': name, 'value': value, **dict(labels)}
+                       for (name, labels), value in counters)
+        return records
+
+    def write_jsonl(self, path):
+        """Añade las medidas de la ejecución a un archivo de líneas JSON"""
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in self.records():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def prometheus_lines(self):
+        """Medidas de la ejecución en formato de texto de Prometheus / OpenMetrics"""
+        durations = Counter()
+        for span in self.records():
+            if span['type'] != 'span':
+                continue
+            labels = {'stage': span['stage'], 'source': span.get('source', ''), 'page': span.get('page', '')}
+            durations[tuple(labels.items())] += span['duration_ms'] / 1000
+            for phase in ('connect_ms', 'ttfb_ms', 'download_ms'):
+                if phase in span:
+                    durations[tuple(dict(labels, stage=f"fetch_{phase[:-3]}").items())] += span[phase] / 1000
+
+        lines = [f'# TYPE {METRIC_PREFIX}stage_duration_seconds gauge']
+        lines.extend(f'{METRIC_PREFIX}stage_duration_seconds{format_labels(labels)} {value:.6f}'
+                     for labels, value in sorted(durations.items()))
+        by_name = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            by_name.setdefault(name, []).append((labels, value))
+        # Son valores de la última ejecución, no contadores acumulados: se exportan como gauge
+        for name, samples in by_name.items():
+            lines.append(f'# TYPE {METRIC_PREFIX}{name} gauge')
+            lines.extend(f'{METRIC_PREFIX}{name}{format_labels(labels)} {value}' for labels, value in samples)
+        lines.append(f'# TYPE {METRIC_PREFIX}last_run_timestamp_seconds gauge')
+        lines.append(f'{METRIC_PREFIX}last_run_timestamp_seconds {time.time():.0f}')
+        lines.append('# EOF')
+        return lines
+
+    def write_prometheus(self, path):
+        """Escribe el archivo .prom de forma atómica, para que el collector nunca lea uno a medias"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.prometheus_lines()) + '\n')
+        os.replace(tmp_path, path)
+
+
+class NullMetrics(Metrics):
+    """Medidas desactivadas: mismos métodos, sin guardar nada"""
+
+    @contextmanager
+    def span(self, stage, **labels):
+        yield Span(stage, labels)
+
+    def add_span(self, stage, duration_ms, **fields):
+        pass
+
+    def count(self, name, value=1, **labels):
+        pass
+
+    def observe_response(self, span, response, **labels):
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+def record_connection(duration_ms):
+    """Suma una conexión recién abierta al tramo de descarga en curso, si lo hay
+    (las de las peticiones duplicadas no se atribuyen a ninguno)"""
+    span = current_span.get()
+    if span is not None:
+        span.set(connect_ms=round(span.fields.get('connect_ms', 0) + duration_ms, 3))
+
+
+def timed_pool_classes():
+    """Pools de urllib3 cuyas conexiones anotan con record_connection cuánto tardan en abrirse
+    (resolución DNS, TCP y TLS). urllib3 se importa aquí para no cargarlo con el módulo"""
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            record_connection((time.perf_counter() - start) * 1000)
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            record_connection((time.perf_counter() - start) * 1000)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+def escape_label(value):
+    """Escapa barras, comillas y saltos de línea del valor de una etiqueta"""
+    return LABEL_ESCAPES.sub(lambda match: LABEL_REPLACEMENTS[match.group()], str(value))
+
+
+def format_labels(labels):
+    """Etiquetas en formato {clave="valor",...}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Directorio de salida del extractor de titulares.
+Las páginas generadas se anotan en un índice SQLite (.indice_titulares.sqlite3)
+con el número de páginas y los bytes que ocupan, así que la limpieza no necesita
+listar el directorio: se retiran las más antiguas del índice hasta cumplir la
+política de conservación (número de páginas, antigüedad y tamaño total),
+opcionalmente guardándolas antes en un archivo comprimido por día.
+latest.html apunta siempre a la última página.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import time
+import zipfile
+from datetime import datetime
+
+MANIFEST_DB = '.indice_titulares.sqlite3'
+LATEST_NAME = 'latest.html'
+ARCHIVE_DIR = 'archivo'
+PAGE_NAME = re.compile(r'^titulares_(\d{8}_\d{6})\.html$')
+OUTPUT_DIR_ENV_VAR = 'HEADLINES_OUTPUT_DIR'  # Por defecto, el directorio del script (no el de trabajo)
+RETENTION_ENV_VAR = 'HEADLINES_RETENTION'  # p. ej. "days=3,files=200,mb=50,archive"
+DEFAULT_RETENTION = 'days=3'  # Como antes: se borraba lo que tenía más de 2 días completos
+BATCH = 64  # Páginas antiguas que se leen del índice de cada vez al aplicar la política
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    created REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pages INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archives (
+    name TEXT PRIMARY KEY
+);
+"""
+
+
+class RetentionPolicy:
+    """Cuánto se conserva: como mucho max_files páginas, de menos de max_age segundos y max_bytes en total.
+    Con archive, lo que sobra se guarda comprimido en un archivo por día en lugar de borrarse."""
+
+    def __init__(self, max_files=None, max_age=None, max_bytes=None, archive=False):
+        self.max_files = max_files
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.archive = archive
+
+    @classmethod
+    def parse(cls, spec):
+        """Lee una política como "days=3,files=200,mb=50,archive" (cualquier combinación)"""
+        policy = cls()
+        for part in (part.strip() for part in spec.split(',')):
+            name, _, value = part.partition('=')
+            if not part:
+                continue
+            elif name == 'archive':
+                policy.archive = True
+            elif name == 'files':
+                policy.max_files = int(value)
+            elif name == 'days':
+                policy.max_age = float(value) * 86400
+            elif name == 'hours':
+                policy.max_age = float(value) * 3600
+            elif name == 'mb':
+                policy.max_bytes = int(float(value) * 1024 * 1024)
+            else:
+                raise ValueError(f"Política de conservación desconocida: {part}")
+        return policy
+
+    def exceeded(self, pages, total_bytes, oldest_created, now):
+        """Si con estas páginas (la más antigua creada en oldest_created) se incumple la política"""
+        return ((self.max_files is not None and pages > self.max_files) or
+                (self.max_age is not None and now - oldest_created > self.max_age) or
+                (self.max_bytes is not None and total_bytes > self.max_bytes))
+
+
+class OutputDirectory:
+    """Páginas generadas en un directorio, con su índice, su política de conservación y el puntero latest.html"""
+
+    def __init__(self, directory, policy=None):
+        self.directory = os.path.abspath(directory)
+        self.policy = policy or RetentionPolicy.parse(DEFAULT_RETENTION)
+        self.latest_path = os.path.join(self.directory, LATEST_NAME)
+        os.makedirs(self.directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.directory, MANIFEST_DB))
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        if self.connection.execute('SELECT 1 FROM totals').fetchone() is None:
+            self.adopt_existing()
+
+    @classmethod
+    def from_env(cls):
+        directory = os.environ.get(OUTPUT_DIR_ENV_VAR) or os.path.dirname(os.path.abspath(__file__))
+        return cls(directory, RetentionPolicy.parse(os.environ.get(RETENTION_ENV_VAR, DEFAULT_RETENTION)))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def adopt_existing(self):
+        """Índice nuevo: anota las páginas que ya hubiera (la única vez que se lista el directorio)"""
+        pages = []
+        for name in os.listdir(self.directory):
+            match = PAGE_NAME.match(name)
+            if not match:
+                continue
+            try:
+                created = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+                size = os.path.getsize(os.path.join(self.directory, name))
+            except (ValueError, OSError):
+                continue
+            pages.append((name, created, size))
+        pages.sort(key=lambda page: page[1])
+        with self.connection:
+            self.connection.executemany('INSERT OR IGNORE INTO pages (file, created, size) VALUES (?, ?, ?)', pages)
+            self.connection.execute('INSERT INTO totals (id, pages, bytes) VALUES (1, ?, ?)',
+                                    (len(pages), sum(size for _, _, size in pages)))
+
+    def totals(self):
+        """(páginas, bytes) anotados, sin recorrer el índice"""
+        return self.connection.execute('SELECT pages, bytes FROM totals').fetchone()
+
+    def pages(self):
+        """Páginas anotadas (archivo, creada, tamaño), de la más antigua a la más reciente"""
+        return self.connection.execute('SELECT file, created, size FROM pages ORDER BY id').fetchall()
+
+    def archives(self):
+        return [name for name, in self.connection.execute('SELECT name FROM archives ORDER BY name')]
+
+    def is_page(self, path):
+        """Si una ruta es una página con fecha de este directorio (las únicas que se conservan o retiran)"""
+        return os.path.dirname(os.path.abspath(path)) == self.directory and PAGE_NAME.match(os.path.basename(path)) is not None
+
+    def new_page_path(self, when=None):
+        """Ruta de la página de una ejecución: titulares_AAAAMMDD_HHMMSS.html dentro del directorio"""
+        return os.path.join(self.directory, f"titulares_{(when or datetime.now()).strftime('%Y%m%d_%H%M%S')}.html")
+
+    def register(self, path, now=None):
+        """Anota una página recién generada, mueve latest.html a ella y aplica la política de conservación.
+        Devuelve las páginas retiradas del directorio"""
+        now = time.time() if now is None else now
+        name = os.path.relpath(os.path.abspath(path), self.directory)
+        size = os.path.getsize(path)
+        with self.connection:
+            # La misma página regenerada (mismo segundo) sustituye a su entrada
+            previous = self.connection.execute('SELECT size FROM pages WHERE file = ?', (name,)).fetchone()
+            if previous:
+                self.connection.execute('DELETE FROM pages WHERE file = ?', (name,))
+                self.connection.execute('UPDATE totals SET pages = pages - 1, bytes = bytes - ?', previous)
+            self.connection.execute('INSERT INTO pages (file, created, size) VALUES (?, ?, ?)', (name, now, size))
+            self.connection.execute('UPDATE totals SET pages = pages + 1, bytes = bytes + ?', (size,))
+        self.point_latest(name)
+        return self.apply_retention(now)
+
+    def point_latest(self, name):
+        """Cambia latest.html de forma atómica: enlace simbólico nuevo y renombrado sobre el anterior"""
+        tmp_path = self.latest_path + '.tmp'
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.symlink(name, tmp_path)
+        except (OSError, NotImplementedError):
+            # Sin enlaces simbólicos (p. ej. Windows sin permisos): una copia
+            shutil.copyfile(os.path.join(self.directory, name), tmp_path)
+        os.replace(tmp_path, self.latest_path)
+
+    def apply_retention(self, now=None):
+        """Retira las páginas más antiguas mientras se incumpla la política (nunca la última).
+        Solo lee del índice las que retira, así que cuesta lo mismo con diez páginas que con diez mil."""
+        now = time.time() if now is None else now
+        pages, total_bytes = self.totals()
+        removed = []
+        while pages > 1:
+            batch = self.connection.execute('SELECT id, file, created, size FROM pages ORDER BY id LIMIT ?',
+                                            (min(BATCH, pages - 1),)).fetchall()
+            expired = []
+            left_pages, left_bytes = pages, total_bytes
+            for page in batch:
+                if not self.policy.exceeded(left_pages, left_bytes, page[2], now):
+                    break
+                expired.append(page)
+                left_pages -= 1
+                left_bytes -= page[3]
+            # Las que no se han podido retirar (p. ej. al fallar el archivo) siguen anotadas y se reintentan la próxima vez
+            retired = [page for page in expired if self.retire(page[1], page[2])]
+            pages -= len(retired)
+            total_bytes -= sum(page[3] for page in retired)
+            with self.connection:
+                self.connection.executemany('DELETE FROM pages WHERE id = ?', [(page[0],) for page in retired])
+                self.connection.execute('UPDATE totals SET pages = ?, bytes = ?', (pages, total_bytes))
+            removed.extend(page[1] for page in retired)
+            if len(retired) < len(batch) or not retired:
+                break
+        return removed
+
+    def retire(self, file, created):
+        """Borra una página del directorio, guardándola antes en su archivo diario si la política lo pide.
+        Devuelve si la página ya no está (False si no se pudo archivar o borrar: se queda donde estaba)"""
+        path = os.path.join(self.directory, file)
+        try:
+            if self.policy.archive:
+                self.archive(file, path, created)
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Ya la había borrado alguien
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"Error retirando {file}: {e}")
+            return False
+        return True
+
+    def archive(self, file, path, created):
+        """Añade una página al archivo comprimido de su día (archivo/titulares_AAAAMMDD.zip), si no estaba ya
+        (una página que se archivó pero no se llegó a borrar no se repite al reintentarlo)"""
+        archive_name = f"{ARCHIVE_DIR}/titulares_{datetime.fromtimestamp(created):%Y%m%d}.zip"
+        archive_path = os.path.join(self.directory, archive_name)
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        member = os.path.basename(file)
+        with zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+            if member not in archive.NameToInfo:
+                archive.write(path, member)
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO archives (name) VALUES (?)', (archive_name,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Directorio de salida del extractor de titulares")
+    parser.add_argument('command', choices=('list', 'clean'), help="list: páginas anotadas; clean: aplicar la política ya")
+    parser.add_argument('--dir', help=f"Directorio de salida (por defecto {OUTPUT_DIR_ENV_VAR} o el del script)")
+    parser.add_argument('--retention', help='Política de conservación, p. ej. "days=3,files=200,mb=50,archive"')
+    args = parser.parse_args(argv)
+
+    directory = args.dir or os.environ.get(OUTPUT_DIR_ENV_VAR) or os.path.dirname(os.path.abspath(__file__))
+    policy = RetentionPolicy.parse(args.retention or os.environ.get(RETENTION_ENV_VAR, DEFAULT_RETENTION))
+    with OutputDirectory(directory, policy) as outputs:
+        if args.command == 'clean':
+            removed = outputs.apply_retention()
+            print(f"🧹 {len(removed)} páginas retiradas ({'archivadas' if policy.archive else 'borradas'})")
+        for file, created, size in outputs.pages():
+            print(f"{datetime.fromtimestamp(created):%Y-%m-%d %H:%M:%S}  {size // 1024:6d} KB  {file}")
+        pages, total_bytes = outputs.totals()
+        print(f"📁 {pages} páginas, {total_bytes // 1024} KB; {len(outputs.archives())} archivos diarios")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Página HTML del extractor de titulares.
+Genera la página sección a sección a partir de los resultados (diccionarios,
+objetos Headline/Article o un ResultBatch) sin depender de requests ni de los
+parsers HTML, así que también sirve para volver a generarla con lo guardado
+en el histórico o en titulares.json sin descargar nada.
+"""
+
+import argparse
+import html
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from results import ResultBatch
+
+# Bloque de estilos de la página: es estático, así que se construye una sola vez
+HTML_STYLE = """    <style>
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .header {
+            text-align: center;
+            margin-bottom: 30px;
+            padding: 20px;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            border-radius: 10px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        }
+        .newspaper-section {
+            margin-bottom: 30px;
+            background: white;
+            border-radius: 10px;
+            padding: 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .newspaper-title {
+            font-size: 24px;
+            font-weight: bold;
+            margin-bottom: 15px;
+            padding-bottom: 10px;
+            border-bottom: 2px solid #eee;
+            color: #333;
+        }
+        .data-section {
+            margin-top: 20px;
+            padding-top: 20px;
+            border-top: 2px solid #667eea;
+        }
+        .data-title {
+            font-size: 20px;
+            font-weight: bold;
+            margin-bottom: 15px;
+            color: #667eea;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+        .status-indicator {
+            font-size: 14px;
+            padding: 4px 8px;
+            border-radius: 4px;
+            font-weight: normal;
+        }
+        .status-new {
+            background-color: #28a745;
+            color: white;
+        }
+        .status-old {
+            background-color: #6c757d;
+            color: white;
+        }
+        .headline {
+            margin-bottom: 15px;
+            padding: 10px;
+            border-left: 4px solid #667eea;
+            background-color: #f8f9fa;
+            transition: all 0.3s ease;
+        }
+        .headline:hover {
+            background-color: #e9ecef;
+            transform: translateX(5px);
+        }
+        .headline a {
+            color: #333;
+            text-decoration: none;
+            font-size: 16px;
+            line-height: 1.4;
+        }
+        .headline a:hover {
+            color: #667eea;
+        }
+        .author-name {
+            font-size: 14px;
+            color: #666;
+            font-style: italic;
+            margin-top: 5px;
+        }
+        .article-lede {
+            font-size: 14px;
+            color: #444;
+            margin-top: 6px;
+        }
+        .article-meta {
+            font-size: 12px;
+            color: #888;
+            margin-top: 4px;
+        }
+        .timestamp {
+            text-align: center;
+            color: #666;
+            font-size: 14px;
+            margin-top: 20px;
+        }
+        .error {
+            color: #dc3545;
+            font-style: italic;
+        }
+        .story {
+            margin-bottom: 15px;
+            padding: 10px;
+            border-left: 4px solid #764ba2;
+            background-color: #f8f9fa;
+        }
+        .story-title {
+            font-size: 16px;
+            font-weight: bold;
+            color: #333;
+            margin-bottom: 8px;
+        }
+        .story-outlet {
+            font-size: 14px;
+            margin-top: 4px;
+        }
+        .story-outlet a {
+            color: #333;
+            text-decoration: none;
+        }
+        .story-outlet a:hover {
+            color: #667eea;
+        }
+        .story-source {
+            font-weight: bold;
+            color: #764ba2;
+            margin-right: 6px;
+        }
+        .story-note {
+            font-size: 13px;
+            color: #764ba2;
+            font-style: italic;
+            margin-bottom: 10px;
+        }
+        .stale-notice {
+            font-size: 14px;
+            color: #856404;
+            background-color: #fff3cd;
+            border-radius: 4px;
+            padding: 6px 10px;
+            margin-bottom: 15px;
+        }
+        .change-stale {
+            font-size: 12px;
+            padding: 2px 6px;
+            margin-left: 6px;
+            border-radius: 4px;
+            background-color: #ffc107;
+            color: #333;
+        }
+        .change-new {
+            font-size: 12px;
+            padding: 2px 6px;
+            margin-left: 6px;
+            border-radius: 4px;
+            background-color: #28a745;
+            color: white;
+        }
+    </style>
+"""
+
+def render_html_header(timestamp):
+    """Devuelve la cabecera de la página (doctype, estilos y encabezado) para una fecha de actualización"""
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Titulares de Periódicos - {timestamp}</title>
+{HTML_STYLE}</head>
+<body>
+    <div class="header">
+        <h1>📰 Titulares de Periódicos</h1>
+        <p>Actualizado el {timestamp}</p>
+    </div>
+"""
+
+def format_timestamp(value):
+    """Día y hora de una marca ISO, como cuándo se extrajo algo que se sirve sin actualizar ('2025-06-20T10:56:40' -> '20/06 10:56')"""
+    return datetime.fromisoformat(value).strftime('%d/%m %H:%M')
+
+def render_change_badge(item):
+    """Devuelve la etiqueta de los elementos que no estaban en la ejecución anterior o que no se han podido actualizar"""
+    if item.get('stale'):
+        return f' <span class="change-stale">Sin actualizar desde el {format_timestamp(item["stale"])}</span>'
+    return ' <span class="change-new">Nuevo</span>' if item.get('change') == 'new' else ''
+
+def plural(count, singular, plural):
+    return f"{count} {singular if count == 1 else plural}"
+
+def render_enrichment(enrichment):
+    """Entradilla y datos del artículo completo (tiempo de lectura, gráficos, inserciones, hora de publicación)"""
+    details = []
+    if enrichment.get('reading_minutes'):
+        details.append(f"⏱️ {enrichment['reading_minutes']} min de lectura")
+    if enrichment.get('charts'):
+        details.append(f"📈 {plural(enrichment['charts'], 'gráfico', 'gráficos')}")
+    if enrichment.get('embeds'):
+        details.append(plural(enrichment['embeds'], 'inserción', 'inserciones'))
+    if enrichment.get('published_at'):
+        details.append(f"publicado el {format_timestamp(enrichment['published_at'])}")
+    lede = f"""
+                <div class="article-lede">{html.escape(enrichment['lede'])}</div>""" if enrichment.get('lede') else ''
+    meta = f"""
+                <div class="article-meta">{' · '.join(details)}</div>""" if details else ''
+    return lede + meta
+
+def render_section(newspaper, headlines, articles, in_stories=0):
+    """Genera el HTML de la sección de un periódico: sus titulares y, si los hay, sus artículos de datos.
+    in_stories: cuántos de sus titulares no se repiten aquí porque ya salen en «En varias portadas»"""
+    yield f"""
+    <div class="newspaper-section">
+        <div class="newspaper-title">📰 {html.escape(newspaper)}</div>
+"""
+    if in_stories:
+        yield f"""
+        <div class="story-note">🧵 {plural(in_stories, 'titular', 'titulares')} de esta portada en «En varias portadas»</div>
+"""
+    
+    if headlines and headlines[0].get('stale'):
+        # La portada no se pudo descargar: se muestran los titulares de la última vez que se pudo
+        yield f"""
+        <div class="stale-notice">
+            ⚠️ No se pudo actualizar la portada; titulares del {format_timestamp(headlines[0]['stale'])}
+        </div>
+"""
+    if headlines:
+        for i, headline in enumerate(headlines, 1):
+            badge = render_change_badge(headline) if not headline.get('stale') else ''
+            yield f"""
+        <div class="headline">
+            <a href="{html.escape(headline['link'])}" target="_blank">{i}. {html.escape(headline['title'])}</a>{badge}
+        </div>
+"""
+    elif not in_stories:
+        yield f"""
+        <div class="headline error">
+            No se pudieron extraer titulares de {html.escape(newspaper)}
+        </div>
+"""
+    
+    # Añadir la sección de datos del periódico, si tiene autores de datos
+    if articles:
+        # Contar artículos nuevos
+        new_articles_count = sum(1 for article in articles if article.get('is_new', False))
+        status_text = "Hay artículos nuevos" if new_articles_count > 0 else "Sin novedades"
+        status_class = "status-new" if new_articles_count > 0 else "status-old"
+        
+        yield f"""
+        <div class="data-section">
+            <div class="data-title">
+                <span>📊 Datos y Gráficos</span>
+                <span class="status-indicator {status_class}">{status_text}</span>
+            </div>
+"""
+        for article in articles:
+            yield f"""
+            <div class="headline">
+                <a href="{html.escape(article['link'])}" target="_blank">{html.escape(article['title'])}</a>{render_change_badge(article)}
+                <div class="author-name">Por {html.escape(article['author'])}</div>{render_enrichment(article.get('enrichment') or {})}
+            </div>
+"""
+        yield """
+        </div>
+"""
+    
+    yield """
+    </div>
+"""
+
+def group_by_source(all_headlines, data_articles):
+    """Devuelve los titulares agrupados por periódico y los artículos de datos.
+    Acepta listas de diccionarios o de Headline/Article, o un ResultBatch que ya los guarda por periódico."""
+    if isinstance(all_headlines, ResultBatch):
+        return all_headlines.by_source(), all_headlines.data_articles() if data_articles is None else data_articles
+    
+    newspapers = {}
+    for headline in all_headlines:
+        source = headline['source']
+        if source not in newspapers:
+            newspapers[source] = []
+        newspapers[source].append(headline)
+    return newspapers, data_articles or {}
+
+def render_stories(stories):
+    """Genera el HTML de las historias que salen en varias portadas: una tarjeta por historia con cada periódico"""
+    yield f"""
+    <div class="newspaper-section">
+        <div class="newspaper-title">🧵 En varias portadas</div>
+"""
+    for story in stories:
+        yield f"""
+        <div class="story">
+            <div class="story-title">{html.escape(story[0]['title'])}</div>
+"""
+        for headline in story:
+            yield f"""
+            <div class="story-outlet"><span class="story-source">{html.escape(headline['source'])}</span><a href="{html.escape(headline['link'])}" target="_blank">{html.escape(headline['title'])}</a></div>
+"""
+        yield """
+        </div>
+"""
+    yield """
+    </div>
+"""
+
+def enrichment_key(enrichment):
+    """Lo que se muestra del enriquecimiento de un artículo, para saber si su sección ha cambiado"""
+    if not enrichment:
+        return None
+    return tuple(enrichment.get(field) for field in ('lede', 'published_at', 'charts', 'embeds', 'reading_minutes'))
+
+def render_html(all_headlines, data_articles, timestamp, fragments=None, stories=None):
+    """Genera la página HTML trozo a trozo, sección por sección, sin construirla entera en memoria.
+    Con fragments (un diccionario que se conserva entre llamadas) solo se renderizan las secciones que cambian.
+    Con stories (de cluster_stories) se añade antes una tarjeta por cada historia que sale en varias portadas,
+    y esos titulares ya no se repiten en la sección de cada periódico."""
+    yield render_html_header(timestamp)
+    
+    clustered = set()
+    if stories:
+        from story_clusters import canonical_url
+        clustered = {(headline['source'], canonical_url(headline['link'])) for story in stories for headline in story}
+        yield from render_stories(stories)
+    
+    newspapers, data_articles = group_by_source(all_headlines, data_articles)
+    
+    used = set()
+    for newspaper, headlines in newspapers.items():
+        articles = data_articles.get(newspaper)
+        in_stories = 0
+        if clustered:
+            shown = [h for h in headlines if (newspaper, canonical_url(h['link'])) not in clustered]
+            in_stories, headlines = len(headlines) - len(shown), shown
+        if fragments is None:
+            yield from render_section(newspaper, headlines, articles, in_stories)
+            continue
+        
+        # Las secciones que no han cambiado desde la última vez se reutilizan ya renderizadas
+        key = (newspaper, in_stories,
+               tuple((h['title'], h['link'], h.get('change'), h.get('stale')) for h in headlines),
+               tuple((a['title'], a['link'], a['author'], a.get('is_new', False), a.get('change'), a.get('stale'),
+                      enrichment_key(a.get('enrichment')))
+                     for a in articles or ()))
+        used.add(key)
+        if key not in fragments:
+            fragments[key] = ''.join(render_section(newspaper, headlines, articles, in_stories))
+        yield fragments[key]
+    
+    if fragments is not None:
+        for key in [key for key in fragments if key not in used]:
+            del fragments[key]
+    
+    yield f"""
+    <div class="timestamp">
+        Script ejecutado el {timestamp}
+    </div>
+</body>
+</html>"""
+
+def write_html(stream, all_headlines, data_articles=None, timestamp=None, fragments=None, stories=None):
+    """Escribe la página HTML en cualquier objeto con write() a medida que se generan las secciones"""
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for chunk in render_html(all_headlines, data_articles, timestamp, fragments, stories):
+        stream.write(chunk)
+
+def create_html_file(all_headlines, data_articles=None, filename=None, fragments=None, stories=None, timestamp=None):
+    """Crea un archivo HTML con todos los titulares y los artículos de datos de cada periódico (por nombre).
+    Los resultados pueden ser diccionarios, objetos Headline/Article o un único ResultBatch (sin data_articles)."""
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    filename = filename or f"titulares_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
+    
+    # Escribir en un temporal del mismo directorio y renombrar: nadie ve nunca un archivo a medias
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix='.titulares_', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write_html(f, all_headlines, data_articles, timestamp, fragments, stories)
+        os.chmod(tmp_path, 0o644)  # mkstemp crea el archivo solo legible por el propietario
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    
+    return filename
+
+def load_json_results(path):
+    """Resultados guardados por la salida json: (fecha, titulares, artículos de datos por periódico)"""
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    return datetime.fromisoformat(document['generated']), document['headlines'], document['data_articles']
+
+def main(argv=None):
+    """Vuelve a generar la página con resultados ya guardados, sin descargar nada"""
+    parser = argparse.ArgumentParser(description="Vuelve a generar la página HTML con resultados guardados, sin descargar nada")
+    parser.add_argument('--json', help="Resultados de la salida json (p. ej. titulares.json) en lugar del histórico")
+    parser.add_argument('--run', type=int, help="Ejecución del histórico (por defecto, la última)")
+    parser.add_argument('--db', help="Base de datos del histórico")
+    parser.add_argument('--output', help="Página a generar (por defecto, una nueva en el directorio de salida)")
+    args = parser.parse_args(argv)
+    
+    # Solo lo que hace falta para leer lo guardado y escribir la página
+    from output_dir import OutputDirectory
+    from story_clusters import cluster_stories
+    
+    if args.json:
+        generated, all_headlines, data_articles = load_json_results(args.json)
+    else:
+        from history_store import HISTORY_DB, HistoryStore
+        with HistoryStore(args.db or HISTORY_DB) as store:
+            run = store.load_run(args.run)
+        if run is None:
+            parser.error("no hay ninguna ejecución guardada en el histórico" if args.run is None
+                         else f"no existe la ejecución {args.run}")
+        generated, all_headlines, data_articles = run
+    
+    timestamp = generated.strftime("%Y-%m-%d %H:%M:%S")
+    stories = cluster_stories(all_headlines)
+    if args.output:
+        filename = create_html_file(all_headlines, data_articles, args.output, stories=stories, timestamp=timestamp)
+    else:
+        with OutputDirectory.from_env() as outputs:
+            filename = create_html_file(all_headlines, data_articles, outputs.new_page_path(), stories=stories,
+                                        timestamp=timestamp)
+            outputs.register(filename)
+    print(f"📄 {len(all_headlines)} titulares del {timestamp} en {filename}")
+
+if __name__ == "__main__":
+    main()
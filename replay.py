@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Grabación y reproducción de las páginas descargadas por el extractor.
+En modo grabación cada respuesta (portadas y páginas de autor) se guarda en un
+directorio de fixtures; en modo reproducción un servidor HTTP local las sirve
+de nuevo, así que se puede ejecutar y medir todo sin conexión y siempre igual.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+
+from sources import AuthorPage
+
+FIXTURES_DIR = 'fixtures'
+MANIFEST_FILE = 'manifest.json'
+RECORD_ENV_VAR = 'HEADLINES_RECORD'  # Directorio donde grabar las respuestas de la ejecución
+REPLAY_ENV_VAR = 'HEADLINES_REPLAY'  # Directorio grabado desde el que servir las páginas
+
+UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Sirve las páginas del servidor de pruebas con la latencia configurada para cada ruta"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo van en escrituras separadas
+
+    def setup(self):
+        # Cada instancia del manejador atiende una conexión TCP distinta
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente cortó la descarga en cuanto tuvo lo que necesitaba
+            pass
+
+    def do_GET(self):
+        time.sleep(self.server.latencies.get(self.path, 0))
+        body = self.server.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.server.statuses[304] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.server.statuses[200] += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.write_body(body)
+
+    def write_body(self, body):
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(pages, latencies=None, handler=StubHandler):
+    """Arranca un servidor local en segundo plano y devuelve (servidor, url_base)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.pages = pages
+    server.latencies = latencies or {}
+    server.connections = 0
+    server.statuses = Counter()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def fixture_name(url):
+    """Nombre de archivo estable para una URL: dominio/ruta-legible-hash.html"""
+    parts = urlsplit(url)
+    slug = UNSAFE_CHARS.sub('-', parts.path.strip('/'))[-60:].strip('-') or 'portada'
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]
+    return f"{parts.netloc}/{slug}-{digest}.html"
+
+
+def stub_path(url):
+    """Ruta con la que el servidor de reproducción sirve una URL grabada"""
+    parts = urlsplit(url)
+    return '/' + parts.netloc + (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+
+class Recorder:
+    """Guarda en un directorio de fixtures cada respuesta descargada por una sesión de requests"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+        self.redirects = {}  # URL de destino -> URL pedida, para grabar también la original
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def attach(self, session):
+        """Engancha el grabador a una sesión: todas sus respuestas pasarán por record()"""
+        session.hooks['response'].append(self.hook)
+        return session
+
+    def hook(self, response, *args, **kwargs):
+        if response.is_redirect:
+            target = urljoin(response.url, response.headers.get('Location', ''))
+            with self.lock:
+                self.redirects[target] = self.redirects.get(response.url, response.url)
+            return response
+        if response.status_code == 200:
+            self.record(response.url, response.content, response.headers.get('Content-Type'),
+                        response.elapsed.total_seconds())
+        return response
+
+    def record(self, url, content, content_type=None, elapsed=0.0):
+        """Guarda el cuerpo de una respuesta y su entrada en el manifiesto"""
+        name = fixture_name(url)
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        entry = {'file': name, 'content_type': content_type, 'elapsed': elapsed, 'size': len(content)}
+        with self.lock:
+            self.entries[url] = entry
+            original = self.redirects.pop(url, None)
+            if original:
+                self.entries[original] = entry
+
+    def save(self):
+        """Escribe el manifiesto de forma atómica y devuelve cuántas páginas hay grabadas"""
+        with self.lock:
+            manifest = {'recorded_at': datetime.now().isoformat(timespec='seconds'), 'pages': dict(self.entries)}
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+        return len(manifest['pages'])
+
+
+def load_recording(directory):
+    """Devuelve {url: (bytes, entrada del manifiesto)} de una grabación"""
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    pages = {}
+    for url, entry in manifest['pages'].items():
+        with open(os.path.join(directory, entry['file']), 'rb') as f:
+            pages[url] = (f.read(), entry)
+    return pages
+
+
+def latest_recording(root=FIXTURES_DIR):
+    """Devuelve el directorio de la grabación más reciente dentro de root (o None si no hay ninguna)"""
+    if not os.path.isdir(root):
+        return None
+    recordings = [os.path.join(root, name) for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, MANIFEST_FILE))]
+    return max(recordings, key=lambda path: os.path.getmtime(os.path.join(path, MANIFEST_FILE)), default=None)
+
+
+def start_replay_server(directory, latency=False):
+    """Sirve una grabación con un servidor local y devuelve (servidor, {URL original: URL local})"""
+    recording = load_recording(directory)
+    pages = {stub_path(url): content for url, (content, _) in recording.items()}
+    # Opcionalmente, con la latencia que tuvo cada página al grabarla
+    latencies = {stub_path(url): entry.get('elapsed', 0) for url, (_, entry) in recording.items()} if latency else None
+    server, base_url = start_stub_server(pages, latencies)
+    return server, {url: base_url + stub_path(url) for url in recording}
+
+
+def replay_sources(sources, urls):
+    """Copia los periódicos apuntando portada, feed y páginas de autor al servidor de reproducción.
+    base_url no cambia, así que los enlaces extraídos son los mismos que en la grabación.
+    Lo que no se grabó nunca se pide a la red: los feeds y los autores sin grabar se quitan, y los periódicos
+    sin nada grabado también. Una portada sin grabar (porque bastó el feed) apunta a una ruta del servidor
+    local que no existe, así que si hiciera falta daría 404, como una página que falla."""
+    replayed = []
+    missing = []
+    for source in sources:
+        authors = [AuthorPage(urls[author.url], author.name) for author in source.authors if author.url in urls]
+        missing.extend(author.url for author in source.authors if author.url not in urls)
+        recorded = [urls[url] for url in (source.url, source.feed_url) if url in urls] + [author.url for author in authors]
+        if not recorded:
+            missing.append(source.url)
+            continue
+        url = urls.get(source.url)
+        if url is None:
+            local = urlsplit(recorded[0])
+            url = f'{local.scheme}://{local.netloc}{stub_path(source.url)}'
+        replayed.append(dataclasses.replace(source, url=url, feed_url=urls.get(source.feed_url), authors=authors))
+    if missing:
+        print(f"⚠️ Sin grabar, no se reproducen: {', '.join(missing)}")
+    return replayed
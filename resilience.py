@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Capa de resiliencia de las descargas del extractor de titulares.
+Un cortacircuitos por dominio deja de pedir páginas a un periódico que está
+fallando durante un tiempo de enfriamiento; las peticiones que tardan más que
+el percentil habitual de su dominio se duplican y gana la primera respuesta;
+y cuando una página no se puede descargar se sirve lo último que se extrajo
+bien de ella, marcado como no actualizado (stale-while-revalidate).
+"""
+
+import contextvars
+import copy
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from urllib.parse import urlsplit
+
+STATE_FILE = '.resiliencia_titulares.json'
+BREAKER_FAILURES = 3  # Fallos seguidos de un dominio que abren su circuito
+BREAKER_COOLDOWN = 60  # Segundos sin pedir nada a un dominio con el circuito abierto
+HEDGE_PERCENTILE = 0.9  # Una petición se duplica cuando tarda más que este percentil de su dominio...
+HEDGE_MIN_DELAY = 0.5  # ...y, como poco, esto
+HEDGE_DEFAULT_DELAY = 2.0  # Espera antes de duplicar mientras no hay medidas suficientes del dominio
+HEDGE_BUDGET = 0.2  # Fracción máxima de peticiones duplicadas, para no doblar la carga de un dominio lento
+LATENCY_SAMPLES = 50  # Latencias recientes que se guardan por dominio (también entre ejecuciones)
+MIN_SAMPLES = 5
+STALE_MAX_AGE = 3 * 86400  # Lo extraído hace más de esto ya no se sirve
+MAX_HEDGE_THREADS = 64
+MAX_PER_HOST = 4  # Peticiones a la vez como máximo a un dominio, contando las duplicadas
+
+
+class CircuitOpen(Exception):
+    """El dominio tiene el circuito abierto: la petición ni se intenta"""
+
+
+def is_network_response(response):
+    """Si la respuesta ha pasado por la red: una de la caché todavía fresca no dice nada de la latencia del dominio"""
+    return not (getattr(response, 'not_modified', False) and response.status_code == 200)
+
+
+def run_in_slot(slots, fetch, acquired=False):
+    """Llama a fetch() ocupando uno de los huecos del dominio (ya ocupado si acquired) y lo libera al terminar"""
+    if not acquired:
+        slots.acquire()
+    try:
+        return fetch()
+    finally:
+        slots.release()
+
+
+def is_host_failure(error):
+    """Si un error dice algo de la salud del dominio (caídas, plazos, 5xx, 429) y no solo de una página (404...)"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status is None or status >= 500 or status == 429
+
+
+class CircuitBreaker:
+    """Cortacircuitos de un dominio: cerrado, abierto tras varios fallos seguidos y,
+    pasado el enfriamiento, medio abierto, dejando pasar una sola petición de prueba"""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.tripped = Future()  # Se completa al abrirse el circuito: las peticiones en vuelo dejan de esperar
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def trip_signal(self):
+        """Future que se completa cuando se abra el circuito (None si ya está abierto)"""
+        with self.lock:
+            return self.tripped if self.opened_at is None else None
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            if self.tripped.done():
+                self.tripped = Future()
+
+    def failure(self):
+        """Anota un fallo y devuelve True si con él se abre (o se vuelve a abrir) el circuito"""
+        with self.lock:
+            self.failures += 1
+            reopened = self.probing or (self.opened_at is None and self.failures >= self.max_failures)
+            self.probing = False
+            if reopened:
+                self.opened_at = time.monotonic()
+                if not self.tripped.done():
+                    self.tripped.set_result(True)
+            return reopened
+
+    def release(self):
+        """La petición de prueba terminó sin decir nada del dominio (p. ej. un 404): puede salir otra"""
+        with self.lock:
+            self.probing = False
+
+
+class LatencyTracker:
+    """Latencias recientes de cada dominio, para saber cuándo una petición va más lenta de lo normal"""
+
+    def __init__(self, samples=LATENCY_SAMPLES, percentile=HEDGE_PERCENTILE):
+        self.percentile = percentile
+        self.samples = samples
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def record(self, host, seconds):
+        with self.lock:
+            self.latencies.setdefault(host, deque(maxlen=self.samples)).append(seconds)
+
+    def hedge_delay(self, host):
+        """Cuánto esperar a una petición a este dominio antes de lanzar otra igual"""
+        with self.lock:
+            latencies = sorted(self.latencies.get(host, ()))
+        if len(latencies) < MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile))])
+
+    def to_dict(self):
+        with self.lock:
+            return {host: list(latencies) for host, latencies in self.latencies.items()}
+
+    def load(self, state):
+        for host, latencies in state.items():
+            for seconds in latencies:
+                self.record(host, seconds)
+
+
+class Resilience:
+    """Cortacircuitos, peticiones duplicadas y últimos resultados buenos de todas las páginas de una ejecución"""
+
+    def __init__(self, state_path=STATE_FILE, hedging=True, stale_max_age=STALE_MAX_AGE,
+                 failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, hedge_budget=HEDGE_BUDGET, max_per_host=MAX_PER_HOST):
+        self.state_path = state_path
+        self.hedging = hedging
+        self.stale_max_age = stale_max_age
+        self.failures = failures
+        self.cooldown = cooldown
+        self.hedge_budget = hedge_budget
+        self.max_per_host = max_per_host
+        self.breakers = {}
+        self.host_slots = {}  # Dominio -> semáforo con sus max_per_host huecos
+        self.latencies = LatencyTracker()
+        self.last_good = {}  # URL -> {'result': ..., 'stored_at': marca de tiempo}
+        self.executor = None
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failures': 0, 'opened': 0, 'short_circuited': 0,
+                      'stale': 0}
+        state = {}
+        if state_path:
+            try:
+                with open(state_path, encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+        self.latencies.load(state.get('latencies', {}))
+        self.last_good = state.get('results', {})
+
+    def breaker(self, host):
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(self.failures, self.cooldown)
+            return breaker
+
+    def slots(self, host):
+        with self.lock:
+            slots = self.host_slots.get(host)
+            if slots is None:
+                slots = self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slots
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def fetch(self, url, fetch):
+        """Llama a fetch() (la descarga de url) pasando por el cortacircuitos de su dominio y, si tarda
+        más de lo normal, duplicándola. Lanza CircuitOpen si el dominio está en enfriamiento."""
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            self.count('short_circuited')
+            raise CircuitOpen(f"{host} está fallando; se vuelve a probar en {self.cooldown} s")
+        self.count('requests')
+        try:
+            response = self.hedged(host, fetch, breaker) if self.hedging else self.timed(host, fetch)
+        except CircuitOpen:
+            self.count('short_circuited')
+            raise
+        except Exception as e:
+            if not is_host_failure(e):
+                breaker.release()
+                raise
+            self.count('failures')
+            if breaker.failure():
+                self.count('opened')
+                print(f"🔌 Circuito abierto para {host} durante {self.cooldown} s")
+            raise
+        breaker.success()
+        return response
+
+    def timed(self, host, fetch):
+        start = time.monotonic()
+        response = fetch()
+        if is_network_response(response):
+            self.latencies.record(host, time.monotonic() - start)
+        return response
+
+    def hedged(self, host, fetch, breaker):
+        """Lanza la petición y, si no ha respondido en el percentil habitual del dominio, otra igual;
+        devuelve la primera que responda bien (la otra termina en segundo plano y se descarta).
+        Las dos ocupan un hueco del dominio: si no queda ninguno libre, no se duplica.
+        Si mientras tanto se abre el circuito del dominio, deja de esperar y lanza CircuitOpen."""
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=MAX_HEDGE_THREADS, thread_name_prefix='duplicada')
+        tripped = breaker.trip_signal()
+        watch = [tripped] if tripped is not None else []
+        slots = self.slots(host)
+        start = time.monotonic()
+        # La principal, con el contexto de quien la pide (p. ej. su tramo de métricas); la duplicada, sin él
+        primary = self.executor.submit(contextvars.copy_context().run, run_in_slot, slots, fetch)
+        pending = [primary]
+        wait(pending + watch, timeout=self.latencies.hedge_delay(host), return_when=FIRST_COMPLETED)
+        # Un dominio que ya está fallando no recibe peticiones de más: solo se duplica si va lento, no caído
+        if not primary.done() and not breaker.failures and not (tripped is not None and tripped.done()):
+            with self.lock:
+                within_budget = self.stats['hedged'] < self.hedge_budget * self.stats['requests']
+            if within_budget and slots.acquire(blocking=False):
+                self.count('hedged')
+                pending.append(self.executor.submit(run_in_slot, slots, fetch, True))
+        backup = pending[-1] if len(pending) > 1 else None
+        error = None
+        while pending:
+            done, _ = wait(pending + watch, return_when=FIRST_COMPLETED)
+            if not done.intersection(pending):
+                # Otras peticiones al dominio han abierto el circuito: esta ya no se espera
+                raise CircuitOpen(f"{host} está fallando; se deja de esperar")
+            for future in done.intersection(pending):
+                pending.remove(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if future is backup:
+                    self.count('hedge_wins')
+                if is_network_response(response):
+                    self.latencies.record(host, time.monotonic() - start)
+                return response
+        raise error
+
+    def remember(self, url, result):
+        """Guarda lo extraído bien de una página, para servirlo si la próxima vez falla"""
+        with self.lock:
+            self.last_good[url] = {'result': copy.deepcopy(result), 'stored_at': time.time()}
+
+    def stale(self, url):
+        """Lo último extraído bien de una página, marcado con 'stale' (cuándo se extrajo), o None si no hay
+        nada reciente. Cada elemento es una copia: marcarlo no toca lo guardado."""
+        with self.lock:
+            entry = self.last_good.get(url)
+        if entry is None or time.time() - entry['stored_at'] > self.stale_max_age:
+            return None
+        stored_at = datetime.fromtimestamp(entry['stored_at']).isoformat(timespec='seconds')
+        self.count('stale')
+
+        def mark(item):
+            item = dict(item, stale=stored_at)
+            item.pop('change', None)
+            return item
+        result = entry['result']
+        return [mark(item) for item in result] if isinstance(result, list) else mark(result)
+
+    def save(self):
+        """Guarda latencias y últimos resultados buenos de forma atómica"""
+        with self.lock:
+            now = time.time()
+            results = {url: entry for url, entry in self.last_good.items() if now - entry['stored_at'] <= self.stale_max_age}
+            data = json.dumps({'latencies': self.latencies.to_dict(), 'results': results}, ensure_ascii=False)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_path)
+
+    def close(self):
+        """Deja terminar en segundo plano las peticiones duplicadas que perdieron"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Modelo compacto de los resultados del extractor de titulares.
+Headline y Article son objetos inmutables con __slots__ y con los nombres de
+periódico y autor internados, en lugar de diccionarios; ResultBatch guarda
+muchos resultados en columnas (arrays paralelos) para operar con meses de
+histórico en memoria. Los dos se pueden pasar tal cual al renderizador, y se
+serializan a JSON o, si está instalado msgpack, a MessagePack (que se importa
+solo al serializar, para no cargarlo al renderizar).
+Guardan todo lo que llevan los diccionarios del extractor: también 'stale'
+(lo servido sin actualizar) y el 'enrichment' de los artículos completos.
+"""
+
+import json
+import sys
+from array import array
+from collections import OrderedDict
+from datetime import date
+
+FORMATS = ('json', 'msgpack')
+CHANGES = (None, 'new', 'moved', 'unchanged')  # Valores de 'change', por su código en las columnas
+TEXT_COLUMNS = ('titles', 'links', 'stale', 'enrichments')  # Bloques de texto UTF-8 de to_columns()
+
+
+def hashable(value):
+    """El valor de un campo en una forma que se puede usar en hash() (el enriquecimiento es un diccionario)"""
+    return tuple(sorted(value.items())) if isinstance(value, dict) else value
+
+
+def import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("MessagePack necesita el paquete msgpack (pip install msgpack)") from None
+    return msgpack
+
+
+class Item:
+    """Base de los resultados: inmutables y accesibles también como diccionario (item['title'], item.get('change'))"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(hashable(getattr(self, name)) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def to_dict(self):
+        """Diccionario con las mismas claves que usan los extractores (sin las que están vacías)"""
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+class Headline(Item):
+    """Titular de portada"""
+    __slots__ = ('title', 'link', 'source', 'published', 'change', 'stale')
+
+    def __init__(self, title, link, source, published=None, change=None, stale=None):
+        self._set('title', title)
+        self._set('link', link)
+        self._set('source', sys.intern(source))  # Un solo objeto por periódico para todos sus titulares
+        self._set('published', published)
+        self._set('change', change)
+        self._set('stale', stale)  # Cuándo se extrajo, si se sirve sin actualizar
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(item['title'], item['link'], item['source'], item.get('published'), item.get('change'),
+                   item.get('stale'))
+
+
+class Article(Item):
+    """Último artículo de un autor de la sección de datos"""
+    __slots__ = ('title', 'link', 'author', 'source', 'published', 'is_new', 'change', 'stale', 'enrichment')
+
+    def __init__(self, title, link, author, source=None, published=None, is_new=False, change=None, stale=None,
+                 enrichment=None):
+        self._set('title', title)
+        self._set('link', link)
+        self._set('author', sys.intern(author))
+        self._set('source', sys.intern(source) if source else None)
+        self._set('published', published)
+        self._set('is_new', is_new)
+        self._set('change', change)
+        self._set('stale', stale)
+        self._set('enrichment', enrichment)  # Lo sacado del artículo completo (enrichment.FIELDS)
+
+    @classmethod
+    def from_dict(cls, item, source=None):
+        return cls(item['title'], item['link'], item['author'], item.get('source', source), item.get('published'),
+                   item.get('is_new', False), item.get('change'), item.get('stale'), item.get('enrichment'))
+
+
+def to_items(all_headlines, data_articles):
+    """Convierte los resultados de los extractores (diccionarios) en Headline y Article"""
+    headlines = [Headline.from_dict(headline) for headline in all_headlines]
+    articles = OrderedDict((source, [Article.from_dict(article, source) for article in items])
+                           for source, items in data_articles.items())
+    return headlines, articles
+
+
+class StringColumn:
+    """Columna de textos: todos seguidos en un solo bloque UTF-8 con sus posiciones, sin un objeto por texto"""
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, text):
+        self.data += text.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class NameTable:
+    """Nombres internados (periódicos, autores) con un identificador entero por nombre; el 0 es 'ninguno'"""
+    __slots__ = ('names', 'ids')
+
+    def __init__(self, names=()):
+        self.names = [None]
+        self.ids = {}
+        for name in names:
+            self.id(name)
+
+    def id(self, name):
+        if name is None:
+            return 0
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return name_id
+
+
+class ResultBatch:
+    """Titulares y artículos de datos en columnas paralelas, para muchos resultados a la vez"""
+
+    def __init__(self):
+        self.kinds = array('B')  # 0 = titular, 1 = artículo de datos
+        self.titles = StringColumn()
+        self.links = StringColumn()
+        self.sources = array('I')
+        self.authors = array('I')
+        self.published = array('I')  # Ordinal de la fecha; 0 si no se conoce
+        self.flags = array('B')  # is_new en el bit 0 y el código de 'change' en los bits 1-2
+        self.stale = StringColumn()  # Cuándo se extrajo lo servido sin actualizar; vacío si está al día
+        self.enrichments = StringColumn()  # Enriquecimiento de cada artículo en JSON; vacío si no tiene
+        self.source_names = NameTable()
+        self.author_names = NameTable()
+
+    @classmethod
+    def from_results(cls, all_headlines, data_articles):
+        """Construye un lote con los resultados de una ejecución (diccionarios u objetos)"""
+        batch = cls()
+        batch.extend(all_headlines, data_articles)
+        return batch
+
+    def extend(self, all_headlines, data_articles):
+        for headline in all_headlines:
+            self.append(headline)
+        for source, articles in data_articles.items():
+            for article in articles:
+                self.append(article, source)
+
+    def append(self, item, source=None):
+        """Añade un titular o un artículo de datos (diccionario u objeto); los artículos llevan 'author'"""
+        is_article = item.get('author') is not None
+        published = item.get('published')
+        self.kinds.append(1 if is_article else 0)
+        self.titles.append(item['title'])
+        self.links.append(item['link'])
+        self.sources.append(self.source_names.id(item.get('source') or source))
+        self.authors.append(self.author_names.id(item.get('author')))
+        self.published.append(date.fromisoformat(published).toordinal() if published else 0)
+        self.flags.append(int(bool(item.get('is_new'))) | CHANGES.index(item.get('change')) << 1)
+        self.stale.append(item.get('stale') or '')
+        enrichment = item.get('enrichment')
+        self.enrichments.append(json.dumps(enrichment, ensure_ascii=False) if enrichment else '')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        published = self.published[index]
+        published = date.fromordinal(published).isoformat() if published else None
+        source = self.source_names.names[self.sources[index]]
+        change = CHANGES[self.flags[index] >> 1]
+        stale = self.stale[index] or None
+        if self.kinds[index] == 0:
+            return Headline(self.titles[index], self.links[index], source, published, change, stale)
+        enrichment = self.enrichments[index]
+        return Article(self.titles[index], self.links[index], self.author_names.names[self.authors[index]], source,
+                       published, bool(self.flags[index] & 1), change, stale,
+                       json.loads(enrichment) if enrichment else None)
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def headlines(self):
+        return [self[index] for index in range(len(self)) if self.kinds[index] == 0]
+
+    def by_source(self):
+        """Titulares agrupados por periódico, en orden de aparición, sin construir más que los de cada grupo"""
+        groups = OrderedDict()
+        for index in range(len(self)):
+            if self.kinds[index] == 0:
+                groups.setdefault(self.source_names.names[self.sources[index]], []).append(self[index])
+        return groups
+
+    def data_articles(self):
+        """Artículos de datos por periódico, como los devuelve scrape_sources"""
+        articles = OrderedDict()
+        for index in range(len(self)):
+            if self.kinds[index] == 1:
+                articles.setdefault(self.source_names.names[self.sources[index]], []).append(self[index])
+        return articles
+
+    def to_columns(self):
+        """Columnas en tipos básicos, listas para serializar"""
+        return {
+            'kinds': self.kinds.tobytes(),
+            'titles': bytes(self.titles.data), 'title_offsets': self.titles.offsets.tolist(),
+            'links': bytes(self.links.data), 'link_offsets': self.links.offsets.tolist(),
+            'sources': self.sources.tolist(), 'authors': self.authors.tolist(),
+            'published': self.published.tolist(), 'flags': self.flags.tobytes(),
+            'stale': bytes(self.stale.data), 'stale_offsets': self.stale.offsets.tolist(),
+            'enrichments': bytes(self.enrichments.data), 'enrichment_offsets': self.enrichments.offsets.tolist(),
+            'source_names': self.source_names.names[1:], 'author_names': self.author_names.names[1:],
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        batch = cls()
+        batch.kinds.frombytes(columns['kinds'])
+        batch.titles.data = bytearray(columns['titles'])
+        batch.titles.offsets = array('Q', columns['title_offsets'])
+        batch.links.data = bytearray(columns['links'])
+        batch.links.offsets = array('Q', columns['link_offsets'])
+        batch.sources.extend(columns['sources'])
+        batch.authors.extend(columns['authors'])
+        batch.published.extend(columns['published'])
+        batch.flags.frombytes(columns['flags'])
+        # Los lotes guardados antes de que hubiera estas columnas no tienen nada sin actualizar ni enriquecido
+        for column, data, offsets in ((batch.stale, 'stale', 'stale_offsets'),
+                                      (batch.enrichments, 'enrichments', 'enrichment_offsets')):
+            if data in columns:
+                column.data = bytearray(columns[data])
+                column.offsets = array('Q', columns[offsets])
+            else:
+                column.offsets = array('Q', [0] * (len(batch.kinds) + 1))
+        batch.source_names = NameTable(columns['source_names'])
+        batch.author_names = NameTable(columns['author_names'])
+        return batch
+
+
+def dumps(batch, format='json'):
+    """Serializa un lote a JSON (texto en bytes) o a MessagePack"""
+    columns = batch.to_columns()
+    if format == 'msgpack':
+        return import_msgpack().packb(columns, use_bin_type=True)
+    if format != 'json':
+        raise ValueError(f"formato desconocido: {format}")
+    # En JSON los bloques de texto van como texto y los de bytes como listas de enteros
+    columns.update({name: columns[name].decode('utf-8') for name in TEXT_COLUMNS})
+    columns.update(kinds=list(columns['kinds']), flags=list(columns['flags']))
+    return json.dumps(columns, ensure_ascii=False).encode('utf-8')
+
+
+def loads(data, format='json'):
+    """Reconstruye un lote serializado con dumps()"""
+    if format == 'msgpack':
+        return ResultBatch.from_columns(import_msgpack().unpackb(data, raw=False))
+    if format != 'json':
+        raise ValueError(f"formato desconocido: {format}")
+    columns = json.loads(data)
+    columns.update({name: columns[name].encode('utf-8') for name in TEXT_COLUMNS if name in columns})
+    columns.update(kinds=bytes(columns['kinds']), flags=bytes(columns['flags']))
+    return ResultBatch.from_columns(columns)
@@ -5,7 +5,7 @@
 cd "$(dirname "$0")"
 
 # Ejecutar el script de Python
-python3 headlines_scraper.py
+python3 cli.py
 
 # Opcional: Abrir el archivo HTML generado en el navegador
 # (descomenta la línea siguiente si quieres que se abra automáticamente)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Salud de los selectores de cada periódico.
+Cada extracción anota qué selector de la cascada dio cada resultado, cuántos
+elementos casaron con cada uno y lo que costaron el parseo y los selectores.
+Con eso se lleva, entre ejecuciones, la tasa de acierto de cada selector: los
+que llevan tiempo sin dar nada pasan al final de la cascada (se prueban en su
+orden de siempre cada pocas ejecuciones, por si vuelven a funcionar) y, si el
+selector principal de una página deja de acertar después de haber funcionado,
+se avisa de que la maquetación ha cambiado antes de que la página empeore.
+"""
+
+import argparse
+import json
+import os
+import threading
+
+from metrics import NO_METRICS
+
+STATE_FILE = '.selectores_titulares.json'
+ALPHA = 0.3  # Peso de la última ejecución en las medias móviles
+MIN_RUNS = 3  # Evaluaciones de un selector antes de sacar conclusiones
+DEAD_RATE = 0.05  # Por debajo de esta tasa de acierto (o tras MIN_RUNS fallos seguidos), el selector se prueba al final
+HEALTHY_RATE = 0.6  # Tasa que tiene que haber alcanzado el principal para que su caída cuente como cambio
+DRIFT_MISSES = 2  # Fallos seguidos del principal, después de haber funcionado, que se avisan como cambio de maquetación
+PROBE_EVERY = 10  # Cada cuántas ejecuciones de una página se prueba la cascada en su orden de siempre
+
+
+def moving_average(previous, value, alpha=ALPHA):
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+class SelectorHealth:
+    """Tasas de acierto, coste y orden de prueba de las cascadas de selectores de cada página, entre ejecuciones.
+    Seguro para usar desde varios hilos; las páginas se identifican por periódico y tipo ('portada', 'autores')."""
+
+    def __init__(self, state_path=STATE_FILE):
+        self.state_path = state_path
+        self.lock = threading.Lock()
+        self.pages = {}
+        if state_path:
+            try:
+                with open(state_path, encoding='utf-8') as f:
+                    self.pages = json.load(f)
+            except (OSError, ValueError):
+                self.pages = {}
+
+    @staticmethod
+    def page_key(source, page):
+        return f"{source}|{page}"
+
+    def entry(self, key, selectors):
+        """Estado de una página; si sus selectores han cambiado en el registro, se empieza de cero"""
+        entry = self.pages.get(key)
+        if entry is None or entry['selectors'] != selectors:
+            entry = self.pages[key] = {'selectors': list(selectors), 'runs': 0, 'stats': {}, 'drift': False}
+        return entry
+
+    def is_dead(self, stats):
+        return (stats is not None and stats['evaluations'] >= MIN_RUNS and
+                (stats['hit_rate'] < DEAD_RATE or stats['misses'] >= MIN_RUNS))
+
+    def ranked(self, source, page, selector_set):
+        """La cascada de una página en el orden en que conviene probarla: los selectores que funcionan, en su orden,
+        y al final los que llevan tiempo sin dar nada. Cada PROBE_EVERY ejecuciones, en el orden de siempre."""
+        with self.lock:
+            entry = self.entry(self.page_key(source, page), selector_set.selectors)
+            if entry['runs'] % PROBE_EVERY == PROBE_EVERY - 1:
+                return selector_set
+            dead = [self.is_dead(entry['stats'].get(selector)) for selector in selector_set.selectors]
+        order = sorted(range(len(dead)), key=lambda position: (dead[position], position))
+        return selector_set.ranked(order)
+
+    def record(self, source, page, selector_set, report, select_ms, parse_ms=None, metrics=NO_METRICS):
+        """Anota una extracción (report, un SelectorReport de la cascada usada, que puede estar reordenada).
+        Devuelve True si el selector principal acaba de dejar de funcionar."""
+        labels = {'source': source, 'page': page}
+        for selector, count in zip(report.selectors, report.used):
+            if count:
+                metrics.count('selector_results', count, selector=selector, **labels)
+        with self.lock:
+            entry = self.entry(self.page_key(source, page), selector_set.selectors)
+            entry['runs'] += 1
+            entry['select_ms'] = moving_average(entry.get('select_ms'), select_ms)
+            if parse_ms is not None:
+                entry['parse_ms'] = moving_average(entry.get('parse_ms'), parse_ms)
+            evaluated = report.evaluated()
+            entry['passes'] = moving_average(entry.get('passes'), len(evaluated))
+            total = sum(report.used)
+            for position in evaluated:
+                selector = report.selectors[position]
+                stats = entry['stats'].setdefault(selector, {'evaluations': 0, 'hit_rate': None, 'peak': 0.0, 'misses': 0,
+                                                             'matched': None, 'share': None})
+                hit = report.accepted[position] > 0
+                stats['evaluations'] += 1
+                stats['hit_rate'] = moving_average(stats['hit_rate'], 1.0 if hit else 0.0)
+                stats['misses'] = 0 if hit else stats['misses'] + 1
+                stats['matched'] = moving_average(stats['matched'], report.matched[position])
+                stats['share'] = moving_average(stats['share'], report.used[position] / total if total else 0.0)
+                if stats['evaluations'] >= MIN_RUNS:
+                    stats['peak'] = max(stats['peak'], stats['hit_rate'])
+            primary = entry['stats'].get(entry['selectors'][0]) if entry['selectors'] else None
+            drifted = (primary is not None and primary['peak'] >= HEALTHY_RATE and
+                       primary['misses'] >= DRIFT_MISSES)
+            changed = drifted != entry['drift']
+            entry['drift'] = drifted
+        if changed and drifted:
+            metrics.count('selector_drift', **labels)
+            print(f"⚠️ {source} ({page}): el selector principal '{entry['selectors'][0]}' ha dejado de funcionar "
+                  f"({primary['misses']} fallos seguidos, llegó a acertar el {primary['peak']:.0%}); la maquetación ha cambiado")
+        elif changed:
+            print(f"✅ {source} ({page}): el selector principal '{entry['selectors'][0]}' vuelve a funcionar")
+        return changed and drifted
+
+    def drifted(self):
+        """Páginas cuyo selector principal ha dejado de funcionar"""
+        with self.lock:
+            return [key for key, entry in self.pages.items() if entry['drift']]
+
+    def save(self):
+        """Guarda el estado de forma atómica"""
+        with self.lock:
+            data = json.dumps(self.pages, ensure_ascii=False)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.state_path)
+
+
+def format_rate(value):
+    return '   -' if value is None else f"{value:4.0%}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Salud de los selectores de cada periódico")
+    parser.add_argument('--state', default=STATE_FILE, help=f"Estado guardado (por defecto {STATE_FILE})")
+    args = parser.parse_args(argv)
+
+    health = SelectorHealth(args.state)
+    if not health.pages:
+        print(f"Sin medidas todavía en {args.state}")
+        return
+    for key, entry in sorted(health.pages.items()):
+        source, _, page = key.partition('|')
+        costs = ', '.join(f"{name} {entry[field]:.1f} ms" for name, field in (('parseo', 'parse_ms'), ('selectores', 'select_ms'))
+                          if entry.get(field) is not None)
+        print(f"{'⚠️' if entry['drift'] else '📰'} {source} ({page}): {entry['runs']} ejecuciones, {costs}, "
+              f"{entry.get('passes') or 0:.1f} selectores evaluados de media")
+        for position, selector in enumerate(entry['selectors']):
+            stats = entry['stats'].get(selector)
+            if stats is None:
+                print(f"   {position + 1:2d}. {'sin evaluar':>36}  {selector}")
+                continue
+            mark = ' (al final)' if health.is_dead(stats) else ''
+            print(f"   {position + 1:2d}. acierto {format_rate(stats['hit_rate'])}  casan {stats['matched'] or 0:5.1f}  "
+                  f"resultados {format_rate(stats['share'])}  {selector}{mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -79,7 +79,7 @@ def main():
     print("=" * 50)
     
     # Verificar archivos necesarios
-    required_files = ['headlines_scraper.py', '.github/workflows/daily_scraper_dropbox_api.yml']
+    required_files = ['cli.py', 'headlines_scraper.py', '.github/workflows/daily_scraper_dropbox_api.yml']
     missing_files = [f for f in required_files if not os.path.exists(f)]
     
     if missing_files:
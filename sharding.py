@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Extracción repartida entre varios procesos (o varias máquinas).
+Un coordinador reparte portadas y páginas de autor en particiones por hashing
+consistente del dominio y las deja en una cola SQLite; cada trabajador reclama
+las de su partición, las descarga y parsea en su propio proceso (sin compartir
+el GIL) y guarda el resultado en la cola. Al terminar, los resultados se juntan
+en una única página HTML, igual que la de una ejecución normal.
+
+Como se reparte por dominio, nunca hay más particiones con trabajo que dominios
+distintos: con los tres periódicos del registro, como mucho tres procesos hacen
+algo y el reparto compensa solo con muchos periódicos. Para unos pocos, la
+ejecución normal (un proceso con hilos) es más rápida.
+"""
+
+import argparse
+import bisect
+import dataclasses
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from multiprocessing import get_context
+from urllib.parse import urlparse
+
+import headlines_scraper
+from article_dates import DateClassifier
+import feed_parsing
+from http_cache import CACHE_DIR, HttpCache
+from metrics import NO_METRICS
+from output_dir import OutputDirectory
+import rendering
+from resilience import STATE_FILE as RESILIENCE_FILE, Resilience
+from sources import SOURCES, Source, load_sources
+from story_clusters import cluster_stories
+
+QUEUE_DB = 'cola_titulares.sqlite3'
+RING_REPLICAS = 64  # Puntos de cada partición en el anillo, para repartir los dominios de forma pareja
+BATCH_SIZE = 16  # Páginas que reclama un trabajador de una vez
+LEASE_SECONDS = 120  # Una página reclamada y no terminada en este tiempo vuelve a estar disponible
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    reference_date TEXT NOT NULL,
+    shards INTEGER NOT NULL,
+    sources TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    shard INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    author TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    claimed_at REAL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(run_id, shard, status);
+"""
+
+
+class HashRing:
+    """Anillo de hashing consistente: cada dominio va siempre a la misma partición, y al cambiar
+    el número de particiones solo se mueve una parte de los dominios"""
+
+    def __init__(self, shards, replicas=RING_REPLICAS):
+        self.points = sorted((ring_hash(f'{shard}#{replica}'), shard) for shard in range(shards) for replica in range(replicas))
+        self.hashes = [point for point, _ in self.points]
+
+    def shard_for(self, key):
+        index = bisect.bisect(self.hashes, ring_hash(key)) % len(self.points)
+        return self.points[index][1]
+
+
+def ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def source_to_dict(source):
+    """Periódico como diccionario JSON, para que los trabajadores no dependan del registro local"""
+    return dataclasses.asdict(source)
+
+
+class WorkQueue:
+    """Cola de páginas pendientes en SQLite, compartida por coordinador y trabajadores"""
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        # Sin transacciones implícitas: las reclamaciones usan BEGIN IMMEDIATE explícito
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def enqueue(self, sources, shards, reference_date=None):
+        """Crea una ejecución con todas las portadas y páginas de autor repartidas en particiones y devuelve su id"""
+        ring = HashRing(shards)
+        reference_date = reference_date or date.today()
+        jobs = []
+        for source in sources:
+            # La partición depende del dominio real del periódico, así un dominio nunca se reparte entre trabajadores
+            shard = ring.shard_for(urlparse(source.base_url).netloc)
+            jobs.append((shard, 'front', source.name, source.url, None))
+            jobs.extend((shard, 'author', source.name, author.url, author.name) for author in source.authors)
+
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            run_id = self.connection.execute(
+                'INSERT INTO runs (created_at, reference_date, shards, sources) VALUES (?, ?, ?, ?)',
+                (datetime.now().isoformat(timespec='seconds'), reference_date.isoformat(), shards,
+                 json.dumps([source_to_dict(source) for source in sources], ensure_ascii=False))
+            ).lastrowid
+            self.connection.executemany(
+                'INSERT INTO jobs (run_id, shard, position, kind, source, url, author) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, shard, position, kind, source, url, author)
+                 for position, (shard, kind, source, url, author) in enumerate(jobs)]
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        return run_id
+
+    def latest_run(self):
+        row = self.connection.execute('SELECT MAX(id) FROM runs').fetchone()
+        return row[0]
+
+    def run_info(self, run_id):
+        """Devuelve (fecha de referencia, particiones, periódicos) de una ejecución"""
+        reference_date, shards, sources = self.connection.execute(
+            'SELECT reference_date, shards, sources FROM runs WHERE id = ?', (run_id,)).fetchone()
+        return date.fromisoformat(reference_date), shards, [Source(**entry) for entry in json.loads(sources)]
+
+    def claim(self, run_id, shard, worker, limit=BATCH_SIZE, lease=LEASE_SECONDS):
+        """Reclama hasta limit páginas pendientes (o abandonadas) de una partición"""
+        now = time.time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.connection.execute(
+                """SELECT id, kind, source, url, author FROM jobs
+                   WHERE run_id = ? AND shard = ? AND (status = 'pending' OR (status = 'claimed' AND claimed_at < ?))
+                   ORDER BY position LIMIT ?""",
+                (run_id, shard, now - lease, limit)
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'claimed', worker = ?, claimed_at = ? WHERE id = ?",
+                [(worker, now, row[0]) for row in rows]
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        return rows
+
+    def complete(self, results):
+        """Guarda los resultados [(id, resultado)] de páginas terminadas"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'done', result = ? WHERE id = ?",
+                [(json.dumps(result, ensure_ascii=False), job_id) for job_id, result in results]
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def pending(self, run_id):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE run_id = ? AND status != 'done'", (run_id,)).fetchone()[0]
+
+    def collect(self, run_id):
+        """Junta los resultados de una ejecución en (titulares, artículos de datos por periódico), en el orden del registro"""
+        _, _, sources = self.run_info(run_id)
+        all_headlines = []
+        data_articles = {source.name: [] for source in sources}
+        rows = self.connection.execute(
+            "SELECT kind, source, result FROM jobs WHERE run_id = ? AND status = 'done' ORDER BY position", (run_id,))
+        for kind, source, result in rows:
+            result = json.loads(result)
+            if kind == 'front':
+                all_headlines.extend(result or [])
+            elif result:
+                data_articles[source].append(result)
+        return all_headlines, data_articles
+
+
+def work(queue_path, run_id, shard, use_cache=True):
+    """Trabajador: procesa todas las páginas de su partición y devuelve cuántas ha hecho"""
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    session = headlines_scraper.create_session()
+    done = 0
+    with WorkQueue(queue_path) as queue:
+        reference_date, _, sources = queue.run_info(run_id)
+        by_name = {source.name: source for source in sources}
+        dates = DateClassifier(reference_date)
+        # Una caché por partición: con el hashing consistente, cada dominio vuelve a caer en la misma
+        cache = HttpCache(os.path.join(CACHE_DIR, f'shard-{shard}')) if use_cache else None
+        # Y lo mismo con los cortacircuitos, las latencias y los últimos resultados buenos de esos dominios
+        resilience = Resilience(os.path.join(CACHE_DIR, f'shard-{shard}', RESILIENCE_FILE)) if use_cache else None
+        while True:
+            jobs = queue.claim(run_id, shard, worker)
+            if not jobs:
+                break
+            tasks = []
+            for job_id, kind, name, url, author in jobs:
+                source = by_name[name]
+                if kind == 'front':
+                    tasks.append((url, headlines_scraper.get_headlines, (dataclasses.replace(source, url=url), session, cache, dates,
+                                                                     NO_METRICS, resilience)))
+                else:
+                    tasks.append((url, headlines_scraper.get_latest_article,
+                                  (source, url, author, session, cache, dates, NO_METRICS, resilience)))
+            results = headlines_scraper.run_tasks_concurrently(
+                tasks, fallback=resilience.stale if resilience is not None else None)
+            queue.complete([(job[0], result) for job, result in zip(jobs, results)])
+            done += len(jobs)
+        if cache is not None:
+            cache.save()
+        if resilience is not None:
+            resilience.close()
+            resilience.save()
+    return done
+
+
+def run_sharded(sources, workers=None, queue_path=QUEUE_DB, use_cache=True):
+    """Coordinador: reparte la ejecución entre procesos locales y devuelve (titulares, artículos de datos, id de ejecución).
+    No se lanzan más procesos que dominios distintos, porque los que sobraran no tendrían ninguna página."""
+    workers = workers or os.cpu_count() or 1
+    hosts = len({urlparse(source.base_url).netloc for source in sources})
+    if workers > hosts:
+        print(f"⚙️ {rendering.plural(hosts, 'dominio', 'dominios')}: se usan {hosts} procesos en lugar de {workers}")
+        workers = max(hosts, 1)
+    with WorkQueue(queue_path) as queue:
+        run_id = queue.enqueue(sources, workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+        futures = [executor.submit(work, queue_path, run_id, shard, use_cache) for shard in range(workers)]
+        for future in futures:
+            future.result()
+    with WorkQueue(queue_path) as queue:
+        all_headlines, data_articles = queue.collect(run_id)
+    return all_headlines, data_articles, run_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracción repartida entre varios procesos o máquinas")
+    parser.add_argument('--queue', default=QUEUE_DB, help="Cola SQLite compartida")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Repartir, ejecutar con procesos locales y generar la página")
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Procesos trabajadores (por defecto, uno por núcleo)")
+
+    enqueue_parser = subparsers.add_parser('enqueue', help="Solo crear la ejecución en la cola, para trabajadores en otras máquinas")
+    enqueue_parser.add_argument('--shards', type=int, required=True, help="Número de particiones")
+
+    worker_parser = subparsers.add_parser('worker', help="Procesar una partición de una ejecución ya creada")
+    worker_parser.add_argument('shard', type=int)
+    worker_parser.add_argument('--run', type=int, help="Ejecución (por defecto, la última)")
+
+    merge_parser = subparsers.add_parser('merge', help="Generar la página HTML con los resultados de una ejecución")
+    merge_parser.add_argument('--run', type=int, help="Ejecución (por defecto, la última)")
+
+    args = parser.parse_args()
+    sources_path = os.environ.get('HEADLINES_SOURCES')
+    sources = feed_parsing.sources_from_env(load_sources(sources_path) if sources_path else SOURCES)
+
+    if args.command == 'run':
+        start = time.perf_counter()
+        all_headlines, data_articles, run_id = run_sharded(sources, args.workers, args.queue)
+        elapsed = time.perf_counter() - start
+        pages = len(sources) + sum(len(source.authors) for source in sources)
+        print(f"⚙️ Ejecución {run_id}: {pages} páginas en {elapsed:.2f} s "
+              f"({pages / elapsed:.1f} páginas/s)")
+    elif args.command == 'enqueue':
+        with WorkQueue(args.queue) as queue:
+            print(f"📥 Ejecución {queue.enqueue(sources, args.shards)} creada con {args.shards} particiones")
+        return
+    elif args.command == 'worker':
+        with WorkQueue(args.queue) as queue:
+            run_id = args.run or queue.latest_run()
+        print(f"⚙️ Partición {args.shard} de la ejecución {run_id}: {work(args.queue, run_id, args.shard)} páginas")
+        return
+    else:
+        with WorkQueue(args.queue) as queue:
+            run_id = args.run or queue.latest_run()
+            pending = queue.pending(run_id)
+            if pending:
+                print(f"⏳ Quedan {pending} páginas sin terminar en la ejecución {run_id}; se junta lo que hay")
+            all_headlines, data_articles = queue.collect(run_id)
+
+    with OutputDirectory.from_env() as outputs:
+        filename = rendering.create_html_file(all_headlines, data_articles, outputs.new_page_path(),
+                                              stories=cluster_stories(all_headlines))
+        outputs.register(filename)
+    print(f"✅ {len(all_headlines)} titulares y {sum(len(articles) for articles in data_articles.values())} "
+          f"artículos de datos en {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Salidas del extractor de titulares.
+Cada salida (la página HTML, un JSON con los resultados, un feed RSS o Atom y un
+directorio de sitio estático con todo lo anterior) escribe sus archivos de forma
+atómica y devuelve sus rutas, que después se pueden publicar con uploads.py.
+HEADLINES_SINKS elige cuáles se generan (por defecto, solo la página HTML).
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import rendering
+from results import ResultBatch
+from story_clusters import canonical_url
+
+SINKS_ENV_VAR = 'HEADLINES_SINKS'  # Salidas separadas por comas: html, json, rss, atom, site
+DEFAULT_SINKS = 'html'
+JSON_FILE = 'titulares.json'
+RSS_FILE = 'titulares.rss'
+ATOM_FILE = 'titulares.atom'
+SITE_DIR = 'sitio'
+FEED_TITLE = 'Titulares de Periódicos'
+FEED_ID = 'urn:titulares-periodicos'
+
+
+def write_atomic(path, data):
+    """Escribe bytes en un temporal del mismo directorio y lo renombra: nadie ve nunca un archivo a medias"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.titulares_', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def as_dict(item):
+    return item if isinstance(item, dict) else item.to_dict()
+
+
+def plain_results(all_headlines, data_articles):
+    """Titulares y artículos de datos como diccionarios, vengan como vengan (diccionarios, objetos o un ResultBatch)"""
+    if isinstance(all_headlines, ResultBatch):
+        data_articles = all_headlines.data_articles() if data_articles is None else data_articles
+        all_headlines = all_headlines.headlines()
+    return ([as_dict(headline) for headline in all_headlines],
+            {source: [dict(as_dict(article), source=source) for article in articles]
+             for source, articles in (data_articles or {}).items()})
+
+
+class Sink:
+    """Una salida: write() genera sus archivos y devuelve sus rutas"""
+
+    def write(self, all_headlines, data_articles, stories=None, generated=None):
+        raise NotImplementedError
+
+
+class HtmlSink(Sink):
+    """La página HTML de siempre (titulares_AAAAMMDD_HHMMSS.html en directory, o el nombre indicado)"""
+
+    def __init__(self, filename=None, fragments=None, directory=None):
+        self.filename = filename
+        self.fragments = fragments
+        self.directory = directory
+
+    def write(self, all_headlines, data_articles, stories=None, generated=None):
+        # La fecha de la ejecución, no la de cada escritura: al reescribir la página no cambian ni el nombre ni la hora
+        generated = generated or datetime.now()
+        filename = self.filename
+        if filename is None:
+            filename = os.path.join(self.directory or '', f"titulares_{generated.strftime('%Y%m%d_%H%M%S')}.html")
+        return [rendering.create_html_file(all_headlines, data_articles, filename, self.fragments, stories,
+                                           generated.strftime("%Y-%m-%d %H:%M:%S"))]
+
+
+class JsonSink(Sink):
+    """Los resultados de la ejecución en JSON, para otras herramientas"""
+
+    def __init__(self, path=JSON_FILE):
+        self.path = path
+
+    def write(self, all_headlines, data_articles, stories=None, generated=None):
+        generated = generated or datetime.now()
+        headlines, articles = plain_results(all_headlines, data_articles)
+        document = {
+            'generated': generated.isoformat(timespec='seconds'),
+            'headlines': headlines,
+            'data_articles': articles,
+            # Cada historia en varias portadas, como la lista de sus enlaces
+            'stories': [[headline['link'] for headline in story] for story in stories or ()],
+        }
+        return [write_atomic(self.path, json.dumps(document, ensure_ascii=False, indent=2).encode('utf-8'))]
+
+
+def feed_entries(all_headlines, data_articles, generated):
+    """Entradas del feed: (id, título, enlace, periódico, fecha) de titulares y artículos de datos"""
+    headlines, articles = plain_results(all_headlines, data_articles)
+    for item in headlines + [article for items in articles.values() for article in items]:
+        published = item.get('published')
+        # Sin fecha de publicación conocida, la de la ejecución
+        when = datetime.fromisoformat(published).replace(tzinfo=timezone.utc) if published else generated
+        yield canonical_url(item['link']), item['title'], item['link'], item['source'], when
+
+
+class FeedSink(Sink):
+    """Feed Atom (por defecto) o RSS 2.0 con los titulares y artículos de datos de la ejecución"""
+
+    def __init__(self, path=None, format='atom', link=''):
+        self.format = format
+        self.path = path or (ATOM_FILE if format == 'atom' else RSS_FILE)
+        self.link = link  # Dirección pública de la página, si la hay
+
+    def write(self, all_headlines, data_articles, stories=None, generated=None):
+        generated = (generated or datetime.now()).astimezone(timezone.utc)
+        entries = list(feed_entries(all_headlines, data_articles, generated))
+        render = self.render_atom if self.format == 'atom' else self.render_rss
+        return [write_atomic(self.path, ''.join(render(entries, generated)).encode('utf-8'))]
+
+    def render_atom(self, entries, generated):
+        # xml.sax.saxutils arrastra urllib.request: solo se carga si se genera un feed
+        from xml.sax.saxutils import escape, quoteattr
+        yield '<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        yield f'  <title>{escape(FEED_TITLE)}</title>\n  <id>{FEED_ID}</id>\n  <updated>{generated.isoformat()}</updated>\n'
+        if self.link:
+            yield f'  <link href={quoteattr(self.link)}/>\n'
+        for entry_id, title, link, source, when in entries:
+            yield (f'  <entry>\n    <id>{escape(entry_id)}</id>\n    <title>{escape(title)}</title>\n'
+                   f'    <link href={quoteattr(link)}/>\n    <updated>{when.isoformat()}</updated>\n'
+                   f'    <author><name>{escape(source)}</name></author>\n    <category term={quoteattr(source)}/>\n  </entry>\n')
+        yield '</feed>\n'
+
+    def render_rss(self, entries, generated):
+        from email.utils import format_datetime
+        from xml.sax.saxutils import escape
+        yield '<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0">\n<channel>\n'
+        yield (f'  <title>{escape(FEED_TITLE)}</title>\n  <link>{escape(self.link)}</link>\n'
+               f'  <description>{escape(FEED_TITLE)}</description>\n  <lastBuildDate>{format_datetime(generated)}</lastBuildDate>\n')
+        for entry_id, title, link, source, when in entries:
+            yield (f'  <item>\n    <title>{escape(title)}</title>\n    <link>{escape(link)}</link>\n'
+                   f'    <guid isPermaLink="false">{escape(entry_id)}</guid>\n    <pubDate>{format_datetime(when)}</pubDate>\n'
+                   f'    <category>{escape(source)}</category>\n  </item>\n')
+        yield '</channel>\n</rss>\n'
+
+
+class StaticSiteSink(Sink):
+    """Directorio listo para servir tal cual: index.html, titulares.json y el feed Atom"""
+
+    def __init__(self, directory=SITE_DIR, fragments=None):
+        self.directory = directory
+        self.sinks = [HtmlSink(os.path.join(directory, 'index.html'), fragments),
+                      JsonSink(os.path.join(directory, JSON_FILE)),
+                      FeedSink(os.path.join(directory, 'feed.atom'), 'atom')]
+
+    def write(self, all_headlines, data_articles, stories=None, generated=None):
+        os.makedirs(self.directory, exist_ok=True)
+        generated = generated or datetime.now()
+        return [path for sink in self.sinks for path in sink.write(all_headlines, data_articles, stories, generated)]
+
+
+# Cada salida por su nombre, creada con sus archivos dentro de un directorio
+SINKS = {
+    'html': lambda directory: HtmlSink(directory=directory),
+    'json': lambda directory: JsonSink(os.path.join(directory, JSON_FILE)),
+    'rss': lambda directory: FeedSink(os.path.join(directory, RSS_FILE), 'rss'),
+    'atom': lambda directory: FeedSink(os.path.join(directory, ATOM_FILE), 'atom'),
+    'site': lambda directory: StaticSiteSink(os.path.join(directory, SITE_DIR)),
+}
+
+
+def sinks_from_env(html=None, directory='.'):
+    """Salidas pedidas en HEADLINES_SINKS, con sus archivos en directory;
+    html sustituye a la página HTML por defecto (p. ej. con otro nombre)"""
+    names = [name.strip() for name in os.environ.get(SINKS_ENV_VAR, DEFAULT_SINKS).split(',') if name.strip()]
+    unknown = [name for name in names if name not in SINKS]
+    if unknown:
+        raise ValueError(f"Salidas desconocidas en {SINKS_ENV_VAR}: {', '.join(unknown)} (disponibles: {', '.join(SINKS)})")
+    return [html if name == 'html' and html is not None else SINKS[name](directory) for name in names]
+
+
+def write_all(sinks, all_headlines, data_articles, stories=None, generated=None):
+    """Genera todas las salidas con la misma fecha y devuelve las rutas de todos los archivos"""
+    generated = generated or datetime.now()
+    return [path for sink in sinks for path in sink.write(all_headlines, data_articles, stories, generated)]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Registro de periódicos del extractor de titulares.
+Cada periódico se describe con datos (URL, selectores, reglas de exclusión y
+autores de datos) y un único motor genérico se encarga de extraerlos, así que
+añadir un periódico es añadir una entrada aquí o en un fichero JSON.
+"""
+
+import json
+from dataclasses import dataclass, field
+
+from html_parsing import SelectorSet
+from streaming import DEFAULT_MAX_BYTES
+
+
+@dataclass
+class ExclusionRules:
+    """Reglas para descartar enlaces que no son titulares ni artículos"""
+    min_title_length: int = 1  # Títulos más cortos se descartan (1 = basta con que no esté vacío)
+    exclude_uppercase: bool = False  # Títulos en mayúsculas suelen ser secciones, no noticias
+    exclude_title_prefixes: tuple = ()  # Títulos que empiezan así (nombres de autores, secciones...)
+    exclude_title_words: tuple = ()  # Palabras que no pueden aparecer en el título (en minúsculas)
+    exclude_titles: tuple = ()  # Títulos exactos a descartar (en minúsculas), p. ej. enlaces de navegación
+    require_link: bool = False  # El enlace no puede estar vacío
+    require_link_substring: str = ''  # Texto que tiene que contener el enlace
+    exclude_link_prefixes: tuple = ()  # Enlaces que empiezan así (anclas internas...)
+    exclude_link_suffixes: tuple = ()  # Enlaces que acaban así (anclas a comentarios...)
+
+    def accepts(self, title, link):
+        """Indica si un título y su enlace pasan todas las reglas"""
+        lowered = title.lower()
+        return (len(title) >= self.min_title_length and
+                not (self.exclude_uppercase and title.isupper()) and
+                not title.startswith(tuple(self.exclude_title_prefixes)) and
+                not any(word in lowered for word in self.exclude_title_words) and
+                lowered not in self.exclude_titles and
+                not (self.require_link and not link) and
+                self.require_link_substring in link and
+                not link.startswith(tuple(self.exclude_link_prefixes)) and
+                not link.endswith(tuple(self.exclude_link_suffixes)))
+
+
+@dataclass
+class AuthorPage:
+    """Página de un autor de la sección de datos"""
+    url: str
+    name: str
+
+
+@dataclass
+class Source:
+    """Periódico a extraer: portada, selectores de titulares, reglas y autores de datos"""
+    name: str
+    base_url: str  # Se antepone a los enlaces relativos
+    selectors: list  # Selectores de titulares, por orden de prioridad
+    rules: ExclusionRules = field(default_factory=ExclusionRules)
+    url: str = None  # Portada; por defecto base_url
+    feed_url: str = None  # Feed RSS/Atom o sitemap de noticias con los titulares de la portada, si lo hay
+    headline_count: int = 4
+    authors: list = field(default_factory=list)
+    author_selectors: list = field(default_factory=list)  # Selectores del último artículo en la página de autor
+    author_rules: ExclusionRules = field(default_factory=ExclusionRules)
+    author_container: str = None  # Si se indica, solo se busca dentro del primer elemento que case
+    author_first_only: bool = False  # Si se indica, solo cuenta el primer enlace encontrado
+    author_parse_class: str = None  # Clase de los bloques a construir al parsear (parseo restringido)
+    author_max_bytes: int = DEFAULT_MAX_BYTES  # Bytes como máximo que se leen de cada página de autor
+    author_list_selectors: list = None  # Selectores de todos los artículos de una página de autor; por defecto author_selectors
+    author_pagination: str = None  # Página n del archivo de un autor, p. ej. '{url}{page}/' (None si no pagina)
+
+    def __post_init__(self):
+        # Permitir construirlo desde JSON, donde todo llega como listas y diccionarios
+        if isinstance(self.rules, dict):
+            self.rules = ExclusionRules(**self.rules)
+        if isinstance(self.author_rules, dict):
+            self.author_rules = ExclusionRules(**self.author_rules)
+        self.authors = [author if isinstance(author, AuthorPage)
+                        else AuthorPage(**author) if isinstance(author, dict)
+                        else AuthorPage(*author) for author in self.authors]
+        self.url = self.url or self.base_url
+        self.selector_set = SelectorSet(self.selectors)
+        self.author_selector_set = SelectorSet(self.author_selectors)
+        self.author_list_selector_set = SelectorSet(self.author_list_selectors or self.author_selectors)
+
+    def absolute_url(self, link):
+        """Convierte un enlace relativo de la página en absoluto"""
+        return link if link.startswith('http') else self.base_url + link
+
+
+SOURCES = [
+    Source(
+        name='El Mundo',
+        base_url='https://www.elmundo.es',
+        feed_url='https://e00-elmundo.uecdn.es/elmundo/rss/portada.xml',
+        # Buscar titulares en selectores más específicos de El Mundo
+        selectors=[
+            '.ue-c-cover-content__headline a',  # Titulares principales
+            '.ue-c-cover-content__title a',     # Títulos principales
+            '.ue-c-cover-content__link',        # Enlaces principales
+            'h1 a', 'h2 a', 'h3 a',             # Encabezados
+            '.headline a', '.title a'           # Selectores genéricos
+        ],
+        # Filtrar elementos que no son titulares de noticias
+        rules=ExclusionRules(
+            min_title_length=11,  # Títulos muy cortos probablemente no son noticias
+            exclude_uppercase=True,  # Evitar títulos en mayúsculas (como "MUNDIAL DE CLUBES")
+            exclude_title_prefixes=('CARLOS', 'MUNDIAL'),  # Evitar nombres de autores y secciones deportivas
+            exclude_title_words=('comentarios',),  # Evitar contadores de comentarios
+            require_link=True,  # Debe tener enlace
+            exclude_link_suffixes=('.html#ancla_comentarios',)  # Evitar enlaces a comentarios
+        ),
+        authors=[
+            AuthorPage('https://www.elmundo.es/autor/maria-alcantara.html', 'María Alcántara'),
+            AuthorPage('https://www.elmundo.es/autor/emilio-amade.html', 'Emilio Amade'),
+            AuthorPage('https://www.elmundo.es/autor/javier-aguirre.html', 'Javier Aguirre'),
+            AuthorPage('https://www.elmundo.es/autor/alberto-hernandez.html', 'Alberto Hernández')
+        ],
+        # Buscar el primer bloque de artículo real
+        author_container='.ue-c-cover-content',
+        author_selectors=['a[href]'],
+        author_first_only=True,
+        author_parse_class='ue-c-cover-content',
+        # En la lista de artículos, el enlace principal de cada bloque
+        author_list_selectors=['.ue-c-cover-content__link', '.ue-c-cover-content__headline a']
+    ),
+    Source(
+        name='El Confidencial',
+        base_url='https://www.elconfidencial.com',
+        # Buscar titulares en selectores específicos de El Confidencial
+        selectors=[
+            '.gac-principal__titleLink',  # Primer titular principal
+            '.m-principal a',             # Segundo titular principal
+            '.m-fotoCentral__titleSide a', # Tercer titular principal
+            '.c-85__titleSide a',         # Cuarto titular principal (la 85)
+            '.article-title a', '.headline-title a',
+            'h2 a', 'h3 a', '.headline a', '.title a'
+        ],
+        authors=[
+            AuthorPage('https://www.elconfidencial.com/autores/miguel-angel-gavilanes-5390/', 'Miguel Ángel Gavilanes'),
+            AuthorPage('https://www.elconfidencial.com/autores/marta-ley-4163/', 'Marta Ley')
+        ],
+        # Buscar el primer artículo en la clase archive-article-top-tit
+        author_selectors=['.archive-article-top-tit a'],
+        author_rules=ExclusionRules(require_link=True),
+        author_first_only=True,
+        author_parse_class='archive-article-top-tit',
+        # El archivo completo del autor: el artículo destacado y el resto de la lista, página a página
+        author_list_selectors=['.archive-article-top-tit a', '.archive-article-tit a'],
+        author_pagination='{url}{page}/'
+    ),
+    Source(
+        name='El Diario',
+        base_url='https://www.eldiario.es',
+        feed_url='https://www.eldiario.es/rss/',
+        selectors=[
+            'h2 a', 'h3 a', '.headline a', '.title a',
+            '.article-title a', '.headline-title a'
+        ],
+        authors=[
+            AuthorPage('https://www.eldiario.es/autores/raul_sanchez/', 'Raúl Sánchez'),
+            AuthorPage('https://www.eldiario.es/autores/victoria_oliveres/', 'Victoria Oliveres')
+        ],
+        # Buscar el primer artículo real en la página del autor
+        # Intentar diferentes selectores para encontrar el artículo más reciente
+        author_selectors=[
+            '.article-author-cont h2 a',  # Títulos de artículos en contenedor de autor
+            '.article-author-cont h3 a',  # Subtítulos de artículos
+            '.article-author-cont .title a',  # Títulos con clase específica
+            '.article-author-cont a[href*="/"]',  # Enlaces que contienen "/" (artículos)
+            '.article-author-cont a'  # Cualquier enlace en el contenedor
+        ],
+        # Filtrar enlaces que parecen ser artículos reales
+        author_rules=ExclusionRules(
+            min_title_length=11,  # Títulos largos
+            require_link=True,
+            require_link_substring='/',  # Contiene "/" (indicador de artículo)
+            exclude_titles=('euskadi', 'economía', 'política', 'sociedad', 'internacional'),  # Evitar enlaces de navegación
+            exclude_link_prefixes=('#',)  # Evitar enlaces internos
+        ),
+        author_parse_class='article-author-cont',
+        # En la lista de artículos, solo los títulos: los enlaces sueltos del contenedor son de navegación
+        author_list_selectors=[
+            '.article-author-cont h2 a', '.article-author-cont h3 a', '.article-author-cont .title a'
+        ]
+    )
+]
+
+
+def load_sources(path):
+    """Carga la lista de periódicos de un fichero JSON con los mismos campos que Source"""
+    with open(path, encoding='utf-8') as f:
+        return [Source(**entry) for entry in json.load(f)]
+
+
+def get_source(name, sources=None):
+    """Busca un periódico del registro por su nombre"""
+    for source in sources or SOURCES:
+        if source.name == name:
+            return source
+    raise KeyError(name)
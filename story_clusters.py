@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Agrupación de titulares que cuentan la misma historia.
+Los enlaces se comparan canonicalizados (sin parámetros de seguimiento ni
+anclas), y los títulos de distintos periódicos se agrupan por similitud con
+MinHash y LSH: cada titular nuevo solo se compara con los pocos que comparten
+alguna banda de su firma dentro de una ventana móvil, no con todo el histórico.
+"""
+
+import hashlib
+import random
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+NUM_PERM = 64  # Funciones hash de la firma MinHash
+BANDS = 32  # Bandas de LSH (NUM_PERM / BANDS filas por banda): dos títulos son candidatos con ~18 % de parecido
+SIMILARITY = 0.3  # Parecido estimado (Jaccard) a partir del cual dos títulos son la misma historia
+STEM_LENGTH = 6  # Las palabras se recortan a este prefijo ('anuncia', 'anunció' -> 'anunci')
+WINDOW_SECONDS = 48 * 3600  # Se agrupa con lo visto en las últimas 48 horas...
+WINDOW_ITEMS = 50000  # ...y como mucho con estos titulares
+
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20250620)  # Semilla fija: las firmas son comparables entre ejecuciones
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+# Parámetros que solo sirven para medir de dónde llega la visita
+TRACKING_PARAMS = frozenset(('fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref', 'ref_src',
+                             'cmpid', 'intcmp', 'ncid', 'mkt_tok', 'smid', 'vgo_ee', 's_kw'))
+TRACKING_PREFIXES = ('utm_', 'ns_', 'at_')
+
+STOPWORDS = frozenset((
+    'a', 'al', 'ante', 'con', 'contra', 'de', 'del', 'desde', 'durante', 'e', 'el', 'en', 'entre', 'es', 'esta', 'este',
+    'hasta', 'la', 'las', 'le', 'les', 'lo', 'los', 'mas', 'muy', 'ni', 'no', 'o', 'para', 'pero', 'por', 'que', 'se',
+    'sin', 'sobre', 'su', 'sus', 'tras', 'un', 'una', 'unas', 'unos', 'y', 'ya',
+))
+WORD = re.compile(r'\w+')
+
+
+def canonical_url(link):
+    """Enlace canónico para comparar: sin ancla (#ancla_comentarios...), sin parámetros de seguimiento,
+    con esquema y dominio en minúsculas y sin barra final"""
+    parts = urlsplit(link.strip())
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+
+
+def headline_key(headline):
+    """Clave para quitar titulares repetidos en una misma portada"""
+    return canonical_url(headline['link'])
+
+
+def shingles(title):
+    """Conjunto de palabras significativas de un título, sin tildes y recortadas a su raíz aproximada"""
+    text = unicodedata.normalize('NFKD', title.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return {word[:STEM_LENGTH] for word in WORD.findall(text) if word not in STOPWORDS and len(word) > 1}
+
+
+def minhash(features):
+    """Firma MinHash de un conjunto: el mínimo de cada permutación sobre los hashes de sus elementos"""
+    hashes = [int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+              for feature in features]
+    if not hashes:
+        return None
+    return tuple(min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in PERMUTATIONS)
+
+
+def similarity(signature, other):
+    """Parecido de Jaccard estimado entre dos firmas"""
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+class StoryIndex:
+    """Índice LSH de titulares recientes: asigna a cada titular la historia del más parecido de la ventana"""
+
+    def __init__(self, window_seconds=WINDOW_SECONDS, max_items=WINDOW_ITEMS, bands=BANDS, threshold=SIMILARITY):
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self.threshold = threshold
+        self.items = OrderedDict()  # Enlace canónico -> (visto por última vez, firma, historia), del más antiguo al más reciente
+        self.buckets = {}  # (banda, valores de la banda) -> enlaces canónicos con esa banda
+        self.next_story = 0
+        self.comparisons = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, title, link, now=None):
+        """Añade un titular y devuelve el identificador de su historia"""
+        now = time.time() if now is None else now
+        self.expire(now)
+        key = canonical_url(link)
+        known = self.items.get(key)
+        if known is not None:
+            # El mismo enlace sigue en portada: misma historia, y se mantiene en la ventana
+            self.items[key] = (now, known[1], known[2])
+            self.items.move_to_end(key)
+            return known[2]
+
+        signature = minhash(shingles(title))
+        story = None
+        if signature is not None:
+            best = self.threshold
+            candidates = set()
+            for band_key in self.band_keys(signature):
+                candidates.update(self.buckets.get(band_key, ()))
+            for candidate in candidates:
+                _, other, candidate_story = self.items[candidate]
+                self.comparisons += 1
+                score = similarity(signature, other)
+                if score >= best:
+                    best, story = score, candidate_story
+            for band_key in self.band_keys(signature):
+                self.buckets.setdefault(band_key, set()).add(key)
+        if story is None:
+            story = self.next_story
+            self.next_story += 1
+        self.items[key] = (now, signature, story)
+        self.expire(now)
+        return story
+
+    def expire(self, now):
+        """Saca de la ventana los titulares demasiado antiguos o que exceden el máximo"""
+        while self.items:
+            key, (seen, signature, _) = next(iter(self.items.items()))
+            if len(self.items) <= self.max_items and now - seen <= self.window_seconds:
+                break
+            del self.items[key]
+            if signature is None:
+                continue
+            for band_key in self.band_keys(signature):
+                bucket = self.buckets.get(band_key)
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+
+def cluster_stories(all_headlines, index=None, now=None):
+    """Agrupa los titulares por historia y devuelve las que salen en más de un periódico,
+    de la más repetida a la menos (y, a igualdad, en el orden de las portadas)"""
+    index = index if index is not None else StoryIndex()
+    stories = OrderedDict()
+    for headline in all_headlines:
+        stories.setdefault(index.add(headline['title'], headline['link'], now), []).append(headline)
+    shared = []
+    for headlines in stories.values():
+        # Un titular por periódico: el primero que aparece en su portada
+        by_source = OrderedDict()
+        for headline in headlines:
+            by_source.setdefault(headline['source'], headline)
+        if len(by_source) > 1:
+            shared.append(list(by_source.values()))
+    shared.sort(key=len, reverse=True)
+    return shared
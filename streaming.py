@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Descarga parcial de páginas de autor.
+El último artículo de un autor está en el primer bloque de la página, así que no
+hace falta descargarla entera: el cuerpo se lee a trozos, un parser incremental
+sigue la apertura y el cierre de los bloques de artículo y la transferencia se
+corta en cuanto se ha visto el primero completo (o al llegar a un máximo de bytes).
+"""
+
+import codecs
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 16 * 1024
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024  # Nunca se leen más bytes de una página de autor
+
+# Etiquetas sin cierre, que no abren nivel
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                       'source', 'track', 'wbr'))
+
+
+class EarlyStop:
+    """Cuándo cortar una descarga: tras blocks bloques completos con la clase indicada (None = no cortar por bloques)
+    o al llegar a max_bytes"""
+
+    def __init__(self, class_name, blocks=1, max_bytes=DEFAULT_MAX_BYTES):
+        self.class_name = class_name
+        self.blocks = blocks
+        self.max_bytes = max_bytes
+
+
+class BlockWatcher(HTMLParser):
+    """Parser incremental que cuenta los bloques con una clase que ya se han cerrado"""
+
+    def __init__(self, class_name):
+        super().__init__(convert_charrefs=False)
+        self.class_name = class_name
+        self.stack = []  # Etiquetas abiertas desde el comienzo del bloque actual
+        self.completed = 0
+
+    def handle_starttag(self, tag, attrs):
+        void = tag in VOID_TAGS
+        if self.stack:
+            if not void:
+                self.stack.append(tag)
+            return
+        classes = next((value or '' for name, value in attrs if name == 'class'), '').split()
+        if self.class_name in classes:
+            if void:
+                self.completed += 1
+            else:
+                self.stack.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <div class="x"/> no abre nivel
+        if not self.stack:
+            classes = next((value or '' for name, value in attrs if name == 'class'), '').split()
+            if self.class_name in classes:
+                self.completed += 1
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # Como los navegadores: un cierre cierra también lo que quedara abierto dentro
+        while self.stack.pop() != tag:
+            pass
+        if not self.stack:
+            self.completed += 1
+
+
+def read_until(response, early_stop, chunk_size=CHUNK_SIZE):
+    """Lee el cuerpo de una respuesta con stream=True hasta que se cumple early_stop.
+    Devuelve (bytes leídos, motivo del corte: 'block', 'max_bytes' o None si se leyó entera)"""
+    watcher = BlockWatcher(early_stop.class_name)
+    # Para reconocer etiquetas basta con UTF-8: los nombres y las clases son ASCII en cualquier codificación habitual
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    chunks = []
+    size = 0
+    reason = None
+    try:
+        for chunk in response.iter_content(chunk_size):
+            chunks.append(chunk)
+            size += len(chunk)
+            watcher.feed(decoder.decode(chunk))
+            if early_stop.blocks is not None and watcher.completed >= early_stop.blocks:
+                reason = 'block'
+                break
+            if size >= early_stop.max_bytes:
+                reason = 'max_bytes'
+                break
+    finally:
+        # Cortar la transferencia: la conexión se cierra en lugar de volver al pool
+        response.close()
+    return b''.join(chunks), reason
@@ -0,0 +1,25 @@
+"""Fechas de publicación en las URL"""
+
+from datetime import date
+
+from article_dates import DateClassifier, extract_date_from_url
+
+
+def test_dates_by_outlet_scheme():
+    assert extract_date_from_url('https://www.elmundo.es/espana/2025/06/20/noticia.html') == date(2025, 6, 20)
+    assert extract_date_from_url('https://www.elconfidencial.com/espana/2025-06-19/titulo_4156789/') == date(2025, 6, 19)
+    assert extract_date_from_url('https://otro.es/noticia-20250618.html') == date(2025, 6, 18)
+    # Los identificadores de artículo no son fechas compactas
+    assert extract_date_from_url('https://www.elconfidencial.com/espana/titulo_20250620/') is None
+    assert extract_date_from_url('https://www.eldiario.es/politica/titulo_1_20250620.html') is None
+    assert extract_date_from_url('https://www.elmundo.es/espana/2025/13/45/noticia.html') is None
+
+
+def test_classify_keeps_order():
+    dates = DateClassifier(date(2025, 6, 20))
+    links = ['https://www.elmundo.es/espana/2025/06/20/a.html', 'https://www.eldiario.es/a_1_123.html',
+             'https://www.elconfidencial.com/espana/2025-06-18/b_1/']
+    published = dates.classify(links)
+    assert published == [date(2025, 6, 20), None, date(2025, 6, 18)]
+    assert [dates.age_days(day) for day in published] == [0, None, 2]
+    assert dates.is_new(None, 'Última hora: algo') and not dates.is_new(date(2025, 6, 19), 'Hoy')
@@ -0,0 +1,80 @@
+"""Recorrido del archivo de los autores"""
+
+import dataclasses
+
+import author_feeds
+import headlines_scraper
+from benchmarks import author_archive_pages
+from http_cache import HttpCache
+from replay import start_stub_server
+from sources import AuthorPage, get_source
+
+
+def archive_source(base_url):
+    return dataclasses.replace(get_source('El Confidencial'), base_url=base_url, url=base_url + '/',
+                               authors=[AuthorPage(f'{base_url}/autor/', 'Autora de datos')])
+
+
+def test_archive_mode_does_not_reuse_truncated_page(tmp_path):
+    # Páginas de más de un trozo de lectura, para que el modo de un artículo corte la descarga
+    article_ids = list(range(400, 0, -1))
+    server, base_url = start_stub_server(author_archive_pages(article_ids, 200))
+    source = archive_source(base_url)
+    author = source.authors[0]
+    cache = HttpCache(str(tmp_path / 'cache'))
+    session = headlines_scraper.create_session()
+    try:
+        latest = headlines_scraper.get_latest_article(source, author.url, author.name, session, cache)
+        assert latest['title'] == 'Artículo de datos 400'
+        assert cache.entries[author.url]['truncated'] == 'block'
+
+        fetch = lambda url: headlines_scraper.fetch_page(url, session, cache)
+        found = author_feeds.crawl_author(source, author, 50, set(), fetch)
+        assert [article['title'] for article in found] == [f'Artículo de datos {i}' for i in article_ids[:50]]
+        # La página entera sustituye a la cortada en la caché
+        assert cache.entries[author.url]['truncated'] is None
+    finally:
+        session.close()
+        server.shutdown()
+
+
+def test_articles_from_env(monkeypatch, capsys):
+    monkeypatch.delenv(author_feeds.AUTHOR_ARTICLES_ENV_VAR, raising=False)
+    assert author_feeds.articles_from_env() == 1
+    monkeypatch.setenv(author_feeds.AUTHOR_ARTICLES_ENV_VAR, '5')
+    assert author_feeds.articles_from_env() == 5
+    monkeypatch.setenv(author_feeds.AUTHOR_ARTICLES_ENV_VAR, '0')
+    assert author_feeds.articles_from_env() == 1
+    monkeypatch.setenv(author_feeds.AUTHOR_ARTICLES_ENV_VAR, 'cinco')
+    assert author_feeds.articles_from_env() == 1
+    assert 'cinco' in capsys.readouterr().out
+
+
+def interleaved_archive(base_url):
+    """Página de autor de El Diario con los artículos repartidos entre h2 y h3 y enlaces de navegación"""
+    items = ''.join(f'<{tag}><a href="{base_url}/politica/articulo-{number}.html">Artículo de prueba {number}</a></{tag}>'
+                    for number, tag in zip(range(6, 0, -1), ('h2', 'h3', 'h3', 'h2', 'h3', 'h2')))
+    nav = f'<a href="{base_url}/politica/">Sección de política y actualidad</a>'
+    return f'<html><body><div class="article-author-cont">{nav}{items}</div></body></html>'.encode()
+
+
+def test_article_list_keeps_document_order(tmp_path):
+    server, base_url = start_stub_server({'/autores/prueba/': interleaved_archive('http://example.com')})
+    source = dataclasses.replace(get_source('El Diario'), base_url=base_url, url=base_url + '/',
+                                 authors=[AuthorPage(f'{base_url}/autores/prueba/', 'Autora de prueba')])
+    author = source.authors[0]
+    session = headlines_scraper.create_session()
+    try:
+        fetch = lambda url: headlines_scraper.fetch_page(url, session, None)
+        articles = author_feeds.extract_article_list(source, fetch(author.url).content, author.name)
+        # Del más reciente al más antiguo, sin agrupar por selector y sin el enlace de navegación
+        assert [article['title'] for article in articles] == [f'Artículo de prueba {i}' for i in range(6, 0, -1)]
+
+        # Un artículo conocido corta el recorrido justo antes de él, no antes de los h3 más recientes
+        known = {author_feeds.article_fingerprint('http://example.com/politica/articulo-3.html')}
+        found = author_feeds.crawl_author(source, author, 10, known, fetch)
+        assert [article['title'] for article in found] == ['Artículo de prueba 6', 'Artículo de prueba 5',
+                                                          'Artículo de prueba 4']
+    finally:
+        session.close()
+        server.shutdown()
@@ -0,0 +1,16 @@
+"""Cambios entre ejecuciones"""
+
+from change_tracking import ChangeTracker
+
+
+def test_links_compared_by_canonical_url(tmp_path):
+    tracker = ChangeTracker(str(tmp_path / 'cambios.json'))
+    first = [{'title': 'Titular', 'link': 'https://a.es/noticia/', 'source': 'Diario A'}]
+    tracker.compare(first, {})
+    tracker.commit()
+    # El mismo artículo con parámetros de seguimiento y ancla sigue siendo el mismo
+    second = [{'title': 'Titular', 'link': 'https://A.es/noticia?utm_source=portada#comentarios', 'source': 'Diario A'},
+              {'title': 'Otro', 'link': 'https://a.es/otra', 'source': 'Diario A'}]
+    summary = tracker.compare(second, {})
+    assert [item['change'] for item in second] == ['unchanged', 'new']
+    assert summary['Diario A/titulares']['dropped'] == 0
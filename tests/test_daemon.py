@@ -0,0 +1,63 @@
+"""Modo residente"""
+
+import dataclasses
+import threading
+import time
+
+import cli
+import daemon
+from daemon import Daemon, HostRateLimiter
+from replay import start_stub_server
+from sources import AuthorPage, get_source
+
+FRONT_PAGE = (b'<html><body><h2><a href="/espana/2025-06-20/titular-de-prueba_1/">'
+              b'Titular de la portada con suficientes palabras</a></h2></body></html>')
+AUTHOR_PAGE = ('<html><body><div class="archive-article-top-tit"><a href="/espana/2025-06-20/datos_2/">'
+               'Artículo de datos de la autora</a></div></body></html>').encode()
+
+
+def test_daemon_cycle_publishes_and_keeps_metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(daemon, 'STARTUP_SPREAD', 0)
+    for name in ('HEADLINES_SINKS', 'HEADLINES_UPLOAD', 'HEADLINES_PROMETHEUS'):
+        monkeypatch.delenv(name, raising=False)
+    server, base_url = start_stub_server({'/': FRONT_PAGE, '/autora/': AUTHOR_PAGE})
+    source = dataclasses.replace(get_source('El Confidencial'), base_url=base_url, url=base_url + '/', feed_url=None,
+                                 authors=[AuthorPage(base_url + '/autora/', 'Autora de datos')])
+    runner = Daemon([source], output=str(tmp_path / 'titulares.html'), state_path=str(tmp_path / 'estado.json'), seed=1)
+    runner.limiter = HostRateLimiter(0)
+    metrics = runner.metrics
+    thread = threading.Thread(target=runner.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 20
+        while not (tmp_path / 'titulares.html').exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        runner.stop()
+        thread.join(30)
+        server.shutdown()
+
+    assert not thread.is_alive()
+    page = (tmp_path / 'titulares.html').read_text(encoding='utf-8')
+    assert 'Titular de la portada con suficientes palabras' in page
+    assert 'Artículo de datos de la autora' in page
+    assert all(task.polls == 1 for task in runner.tasks)
+    # Las consultas siguen anotando en el mismo objeto después de cada volcado de métricas
+    assert runner.metrics is metrics
+    assert (tmp_path / 'metricas_titulares.jsonl').read_text(encoding='utf-8').count('"stage": "fetch"') == 2
+    assert (tmp_path / 'estado.json').exists()
+
+
+def test_metrics_recorded_after_drain_are_kept():
+    runner_metrics = daemon.Metrics()
+    runner_metrics.count('polls')
+    drained = runner_metrics.drain()
+    runner_metrics.count('polls', 2)
+    assert [record['value'] for record in drained.records()] == [1]
+    assert [record['value'] for record in runner_metrics.records()] == [2]
+
+
+def test_cli_runs_the_daemon():
+    assert cli.COMMANDS['daemon'][0] == 'daemon'
+    assert cli.load('daemon').main is daemon.main
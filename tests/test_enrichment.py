@@ -0,0 +1,60 @@
+"""Enriquecimiento de los artículos de datos en segundo plano"""
+
+import time
+from datetime import datetime
+
+import headlines_scraper
+from benchmarks import synthetic_article
+from enrichment import Enricher
+from replay import start_stub_server
+from sinks import HtmlSink
+
+
+def test_batches_arrive_as_articles_complete(tmp_path):
+    latencies = [0.0, 0.3, 0.6, 0.9]
+    pages = {f'/articulo/{n}': synthetic_article(n, padding_kb=1) for n in range(len(latencies))}
+    server, base_url = start_stub_server(pages, {f'/articulo/{n}': latency for n, latency in enumerate(latencies)})
+    data_articles = {'Diario A': [{'title': f'Artículo {n}', 'link': f'{base_url}/articulo/{n}', 'author': 'Autora'}
+                                  for n in range(len(latencies))]}
+    session = headlines_scraper.create_session()
+    enricher = Enricher(session, str(tmp_path / 'articulos.sqlite3'), max_per_host=4)
+    try:
+        start = time.monotonic()
+        assert enricher.start(data_articles) == len(latencies)
+        batches = []
+        for batch in enricher.batches(interval=0.2):
+            # Cada lote llega ya completado, antes de que termine la descarga más lenta si no es el último
+            assert all(article.get('enrichment') for article in batch)
+            batches.append((time.monotonic() - start, len(batch)))
+        stats = enricher.close()
+    finally:
+        session.close()
+        server.shutdown()
+
+    assert sum(count for _, count in batches) == len(latencies)
+    assert len(batches) > 1
+    assert batches[0][0] < max(latencies)
+    assert stats['fetched'] == len(latencies)
+
+    # La siguiente vez todo sale del almacén, sin descargas ni lotes
+    session = headlines_scraper.create_session()
+    enricher = Enricher(session, str(tmp_path / 'articulos.sqlite3'))
+    fresh = {'Diario A': [dict(article, enrichment=None) for article in data_articles['Diario A']]}
+    assert enricher.start(fresh) == 0
+    assert list(enricher.batches(interval=0.2)) == []
+    assert all(article['enrichment'] for article in fresh['Diario A'])
+    enricher.close()
+    session.close()
+
+
+def test_rewrites_keep_the_page_timestamp(tmp_path):
+    generated = datetime(2025, 6, 20, 10, 30, 0)
+    sink = HtmlSink(directory=str(tmp_path))
+    headlines = [{'title': 'Titular', 'link': 'https://example.com/1', 'source': 'Diario A'}]
+    articles = {'Diario A': [{'title': 'Artículo', 'link': 'https://example.com/2', 'author': 'Autora'}]}
+    first, = sink.write(headlines, articles, generated=generated)
+    articles['Diario A'][0]['enrichment'] = {'lede': 'Entradilla', 'reading_minutes': 3}
+    second, = sink.write(headlines, articles, generated=generated)
+    assert first == second == str(tmp_path / 'titulares_20250620_103000.html')
+    page = open(second, encoding='utf-8').read()
+    assert 'Actualizado el 2025-06-20 10:30:00' in page and 'Entradilla' in page
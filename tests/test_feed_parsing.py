@@ -0,0 +1,114 @@
+"""Titulares desde los feeds RSS/Atom y los sitemaps de noticias"""
+
+import dataclasses
+from datetime import date
+
+import pytest
+
+import feed_parsing
+from feed_parsing import extract_feed_headlines, iter_feed_items, parse_feed_date
+from sources import get_source
+
+RSS = '''<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Portada</title><link>https://www.eldiario.es/</link>
+<item><title>Primer titular del feed con palabras</title>
+<link>https://www.eldiario.es/politica/primer-titular_1_100.html</link>
+<pubDate>Fri, 20 Jun 2025 23:30:00 -0300</pubDate></item>
+<item><title>Segundo titular del feed con palabras</title>
+<link>https://www.eldiario.es/politica/segundo-titular_1_101.html</link></item>
+<item><title>Primer titular repetido con otro enlace</title>
+<link>https://www.eldiario.es/politica/primer-titular_1_100.html?utm_source=rss</link></item>
+</channel></rss>'''.encode()
+
+ATOM = '''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Portada</title>
+<entry><title>Titular de Atom</title><link rel="self" href="https://example.com/self"/>
+<link href="https://example.com/2025/06/19/titular-atom.html"/><updated>2025-06-19T08:00:00Z</updated></entry>
+<entry><title>Titular sin fechas</title><link href="https://example.com/seccion/titular.html"/></entry>
+</feed>'''.encode()
+
+SITEMAP = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+<url><loc>https://example.com/noticia-1.html</loc><lastmod>2025-06-18</lastmod>
+<news:news><news:publication><news:name>Diario</news:name></news:publication>
+<news:publication_date>2025-06-17T10:00:00+02:00</news:publication_date><news:title>Noticia del sitemap</news:title></news:news></url>
+<url><loc>https://example.com/sin-titulo.html</loc></url>
+</urlset>'''.encode()
+
+
+def test_rss_items():
+    items = list(iter_feed_items(RSS))
+    assert [item['title'] for item in items] == ['Primer titular del feed con palabras', 'Segundo titular del feed con palabras',
+                                                 'Primer titular repetido con otro enlace']
+    # El día que pone el periódico, sin pasarlo a otra zona horaria
+    assert items[0]['published'] == date(2025, 6, 20)
+    assert items[1]['published'] is None
+
+
+def test_atom_entries_use_alternate_link_and_updated_date():
+    items = list(iter_feed_items(ATOM))
+    assert items[0] == {'title': 'Titular de Atom', 'link': 'https://example.com/2025/06/19/titular-atom.html',
+                        'published': date(2025, 6, 19)}
+    assert items[1]['published'] is None
+
+
+def test_news_sitemap_prefers_publication_date():
+    items = list(iter_feed_items(SITEMAP))
+    # Las URL sin título no son artículos
+    assert items == [{'title': 'Noticia del sitemap', 'link': 'https://example.com/noticia-1.html',
+                      'published': date(2025, 6, 17)}]
+
+
+def test_sitemap_index_is_rejected():
+    index = b'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"><sitemap><loc>x</loc></sitemap></sitemapindex>'
+    with pytest.raises(ValueError):
+        list(iter_feed_items(index))
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2025-06-20T10:00:00Z', date(2025, 6, 20)),
+    ('  2025-06-20', date(2025, 6, 20)),
+    ('Fri, 20 Jun 2025 10:00:00 +0200', date(2025, 6, 20)),
+    ('ayer por la tarde', None),
+    ('2025-13-40', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_feed_date(value, expected):
+    assert parse_feed_date(value) == expected
+
+
+def test_feed_headlines_apply_rules_dates_and_dedupe():
+    source = get_source('El Diario')
+    headlines = extract_feed_headlines(source, RSS)
+    assert [headline['link'] for headline in headlines] == ['https://www.eldiario.es/politica/primer-titular_1_100.html',
+                                                            'https://www.eldiario.es/politica/segundo-titular_1_101.html']
+    assert all(headline['source'] == 'El Diario' for headline in headlines)
+    assert headlines[0]['published'] == '2025-06-20'
+
+
+def test_feed_date_falls_back_to_url():
+    source = dataclasses.replace(get_source('El Diario'), base_url='https://example.com')
+    headlines = extract_feed_headlines(source, ATOM)
+    assert headlines[0]['published'] == '2025-06-19'
+
+
+def test_malformed_feed_raises_value_error():
+    source = get_source('El Diario')
+    with pytest.raises(ValueError, match='mal formado'):
+        extract_feed_headlines(source, RSS[:RSS.index(b'<item>', RSS.index(b'</item>'))] + b'<item><title>Corta')
+
+
+def test_parsing_stops_once_enough_headlines():
+    # Lo que venga detrás de los titulares pedidos ni se lee, aunque esté roto
+    source = dataclasses.replace(get_source('El Diario'), headline_count=1)
+    headlines = extract_feed_headlines(source, RSS[:RSS.index(b'</channel>')] + b'<item><title>Rot')
+    assert len(headlines) == 1
+
+
+def test_feeds_can_be_disabled(monkeypatch):
+    sources = [get_source('El Diario')]
+    monkeypatch.setenv(feed_parsing.FEEDS_ENV_VAR, '0')
+    assert feed_parsing.sources_from_env(sources)[0].feed_url is None
+    monkeypatch.delenv(feed_parsing.FEEDS_ENV_VAR)
+    assert feed_parsing.sources_from_env(sources) is sources
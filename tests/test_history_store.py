@@ -0,0 +1,51 @@
+"""Histórico: lo que se guarda de una ejecución se recupera tal cual"""
+
+import sqlite3
+from datetime import datetime
+
+from history_store import HistoryStore
+
+
+def test_save_and_load_round_trip(tmp_path):
+    all_headlines = [
+        {'title': 'Titular de hoy', 'link': 'https://abc.es/hoy.html', 'source': 'ABC', 'published': '2025-06-20'},
+        {'title': 'Sin fecha', 'link': 'https://abc.es/sin-fecha.html', 'source': 'ABC', 'published': None},
+        {'title': 'De ayer', 'link': 'https://elmundo.es/ayer.html', 'source': 'El Mundo', 'published': '2025-06-19',
+         'stale': '2025-06-19T08:30:00'},
+    ]
+    data_articles = {
+        'ABC': [{'title': 'Datos', 'link': 'https://abc.es/datos.html', 'author': 'Autora',
+                 'published': '2025-06-20', 'is_new': True}],
+        'El Mundo': [{'title': 'Datos viejos', 'link': 'https://elmundo.es/datos.html', 'author': 'Autor',
+                      'published': '2025-06-01', 'is_new': False, 'stale': '2025-06-19T08:30:00'}],
+    }
+    run_at = datetime(2025, 6, 20, 10, 0, 0)
+    with HistoryStore(str(tmp_path / 'historial.sqlite3')) as store:
+        run_id = store.record_run(all_headlines, data_articles, run_at)
+        assert store.load_run() == (run_at, all_headlines, data_articles)
+        assert store.load_run(run_id) == store.load_run()
+
+        # Lo servido sin actualizar no cuenta como visto en esta ejecución, sino cuando se extrajo
+        assert store.leads('El Mundo', datetime(2025, 6, 20), datetime(2025, 6, 21)) == []
+        assert store.first_seen('https://elmundo.es/ayer.html') == ('2025-06-19 08:30:00', 'De ayer', 'El Mundo')
+        assert store.appearances('https://elmundo.es/ayer.html') == []
+        assert store.leads('ABC', datetime(2025, 6, 20), datetime(2025, 6, 21)) == [
+            ('2025-06-20 10:00:00', 'Titular de hoy', 'https://abc.es/hoy.html')]
+
+
+def test_old_history_gains_the_new_columns(tmp_path):
+    path = str(tmp_path / 'historial.sqlite3')
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE runs (id INTEGER PRIMARY KEY, run_at TEXT NOT NULL);
+        CREATE TABLE links (link_hash INTEGER PRIMARY KEY, link TEXT NOT NULL, first_seen TEXT NOT NULL,
+                            first_title TEXT NOT NULL, first_source TEXT NOT NULL);
+        CREATE TABLE items (run_id INTEGER NOT NULL REFERENCES runs(id), seen_at TEXT NOT NULL, source TEXT NOT NULL,
+                            kind TEXT NOT NULL, position INTEGER NOT NULL, title TEXT NOT NULL,
+                            link_hash INTEGER NOT NULL, author TEXT);
+    """)
+    connection.close()
+    with HistoryStore(path) as store:
+        store.record_run([], {'ABC': [{'title': 'Datos', 'link': 'https://abc.es/datos.html', 'author': 'Autora',
+                                       'published': None, 'is_new': True}]}, datetime(2025, 6, 20, 10, 0, 0))
+        assert store.load_run()[2]['ABC'][0]['is_new'] is True
@@ -0,0 +1,95 @@
+"""Caché HTTP en disco con peticiones condicionales"""
+
+import os
+
+import headlines_scraper
+from http_cache import HttpCache
+from replay import StubHandler, start_stub_server
+
+LAST_MODIFIED = 'Fri, 20 Jun 2025 10:00:00 GMT'
+
+
+class ValidatingHandler(StubHandler):
+    """Como el del servidor de pruebas, con Last-Modified y anotando las cabeceras condicionales recibidas"""
+
+    def send_header(self, keyword, value):
+        super().send_header(keyword, value)
+        if keyword == 'ETag':
+            super().send_header('Last-Modified', LAST_MODIFIED)
+
+    def do_GET(self):
+        self.server.requests.append({name: self.headers.get(name) for name in ('If-None-Match', 'If-Modified-Since')})
+        super().do_GET()
+
+
+def start_server(pages):
+    server, base_url = start_stub_server(pages, handler=ValidatingHandler)
+    server.requests = []
+    return server, base_url
+
+
+def test_conditional_get_reuses_cached_body(tmp_path):
+    body = b'<html><body><h2><a href="/a">Titular</a></h2></body></html>'
+    server, base_url = start_server({'/': body})
+    cache = HttpCache(str(tmp_path), max_age=0)
+    session = headlines_scraper.create_session()
+    try:
+        first = cache.fetch(session, base_url + '/', 10)
+        assert first.status_code == 200 and not first.not_modified and first.content == body
+        assert server.requests[0] == {'If-None-Match': None, 'If-Modified-Since': None}
+
+        second = cache.fetch(session, base_url + '/', 10)
+        etag = cache.entries[base_url + '/']['etag']
+        assert server.requests[1] == {'If-None-Match': etag, 'If-Modified-Since': LAST_MODIFIED}
+        assert second.status_code == 304 and second.not_modified
+        assert second.content == body
+        assert server.statuses == {200: 1, 304: 1}
+        assert cache.stats['not_modified'] == 1 and cache.stats['bytes_saved'] == len(body)
+    finally:
+        session.close()
+        server.shutdown()
+
+
+def test_fresh_entry_skips_request(tmp_path):
+    server, base_url = start_server({'/': b'<html></html>'})
+    cache = HttpCache(str(tmp_path), max_age=300)
+    session = headlines_scraper.create_session()
+    try:
+        cache.fetch(session, base_url + '/', 10)
+        response = cache.fetch(session, base_url + '/', 10)
+        assert response.not_modified and response.content == b'<html></html>'
+        assert len(server.requests) == 1
+    finally:
+        session.close()
+        server.shutdown()
+
+
+def test_lru_eviction_stays_under_max_bytes(tmp_path):
+    size = 1000
+    pages = {f'/{name}': name.encode('ascii') * size for name in 'abc'}
+    server, base_url = start_server(pages)
+    cache = HttpCache(str(tmp_path), max_age=300, max_bytes=int(2.5 * size))
+    session = headlines_scraper.create_session()
+    try:
+        cache.fetch(session, base_url + '/a', 10)
+        cache.fetch(session, base_url + '/b', 10)
+        # Volver a usar a la deja como la más reciente: la que sobra al llegar c es b
+        cache.fetch(session, base_url + '/a', 10)
+        cache.fetch(session, base_url + '/c', 10)
+        assert sorted(cache.entries) == [base_url + '/a', base_url + '/c']
+        assert sum(entry['size'] for entry in cache.entries.values()) <= cache.max_bytes
+        assert not os.path.exists(cache._body_path(base_url + '/b'))
+
+        # Lo expulsado se vuelve a descargar, sin cabeceras condicionales
+        cache.fetch(session, base_url + '/b', 10)
+        assert server.requests[-1] == {'If-None-Match': None, 'If-Modified-Since': None}
+        assert sum(entry['size'] for entry in cache.entries.values()) <= cache.max_bytes
+        bodies = [name for name in os.listdir(tmp_path) if name.endswith('.body')]
+        assert len(bodies) == len(cache.entries)
+
+        # El índice guardado se vuelve a cargar igual
+        cache.save()
+        assert HttpCache(str(tmp_path)).entries.keys() == cache.entries.keys()
+    finally:
+        session.close()
+        server.shutdown()
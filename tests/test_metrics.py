@@ -0,0 +1,104 @@
+"""Tramos, contadores, su agregación para Prometheus y el tiempo de conexión de las descargas"""
+
+import socket
+
+import pytest
+
+import headlines_scraper
+from metrics import Metrics, escape_label, format_labels
+from replay import start_stub_server
+from resilience import Resilience
+
+
+def test_records_spans_and_counters():
+    metrics = Metrics()
+    metrics.add_span('parse', 12.3456, source='El País', page='portada', matches=5)
+    metrics.count('cache', result='fresh')
+    metrics.count('cache', result='fresh')
+    metrics.count('bytes_downloaded', 100, source='El País')
+    records = metrics.records()
+    assert records[0] == {'type': 'span', 'run_at': metrics.run_at, 'stage': 'parse', 'duration_ms': 12.346,
+                          'source': 'El País', 'page': 'portada', 'matches': 5}
+    counters = {(record['name'], record.get('result', record.get('source'))): record['value']
+                for record in records[1:]}
+    assert counters == {('bytes_downloaded', 'El País'): 100, ('cache', 'fresh'): 2}
+
+
+def test_failed_span_is_recorded_and_counted():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.span('select', source='ABC', page='portada'):
+            raise ValueError('sin coincidencias')
+    span, counter = metrics.records()
+    assert span['error'] == 'ValueError' and span['stage'] == 'select'
+    assert (counter['name'], counter['stage'], counter['source'], counter['value']) == ('errors', 'select', 'ABC', 1)
+
+
+def test_prometheus_sums_durations_by_stage_source_and_page():
+    metrics = Metrics()
+    for duration, connect in ((100, 20), (300, 0)):
+        metrics.add_span('fetch', duration, source='ABC', page='portada', url=f'https://abc.es/{duration}',
+                         connect_ms=connect, ttfb_ms=50, download_ms=duration - 50 - connect)
+    metrics.add_span('fetch', 40, source='ABC', page='Autora')
+    metrics.add_span('render', 5)
+    metrics.count('http_responses', host='abc.es', status='200')
+    metrics.count('http_responses', host='abc.es', status='200')
+    metrics.count('http_responses', host='abc.es', status='404')
+    lines = metrics.prometheus_lines()
+
+    values = {line.rsplit(' ', 1)[0]: line.rsplit(' ', 1)[1] for line in lines if not line.startswith('#')}
+    # La URL no es etiqueta: las dos descargas de la portada se suman en una sola serie
+    assert values['headlines_stage_duration_seconds{stage="fetch",source="ABC",page="portada"}'] == '0.400000'
+    assert values['headlines_stage_duration_seconds{stage="fetch_connect",source="ABC",page="portada"}'] == '0.020000'
+    assert values['headlines_stage_duration_seconds{stage="fetch_ttfb",source="ABC",page="portada"}'] == '0.100000'
+    assert values['headlines_stage_duration_seconds{stage="fetch_download",source="ABC",page="portada"}'] == '0.280000'
+    assert values['headlines_stage_duration_seconds{stage="fetch",source="ABC",page="Autora"}'] == '0.040000'
+    assert values['headlines_stage_duration_seconds{stage="render",source="",page=""}'] == '0.005000'
+    assert values['headlines_http_responses{host="abc.es",status="200"}'] == '2'
+    assert values['headlines_http_responses{host="abc.es",status="404"}'] == '1'
+    # Un solo TYPE por métrica, antes de sus muestras, y el final que pide OpenMetrics
+    assert lines.count('# TYPE headlines_http_responses gauge') == 1
+    assert lines.index('# TYPE headlines_http_responses gauge') < lines.index(
+        'headlines_http_responses{host="abc.es",status="200"} 2')
+    assert lines[-1] == '# EOF'
+
+
+def test_label_escaping():
+    assert escape_label('dice "hola"\\\nadiós') == 'dice \\"hola\\"\\\\\\nadiós'
+    assert format_labels((('page', 'a"b'), ('source', 'X'))) == '{page="a\\"b",source="X"}'
+    assert format_labels(()) == ''
+
+
+def test_drain_hands_over_and_keeps_counting():
+    metrics = Metrics()
+    metrics.add_span('fetch', 10)
+    metrics.count('cache', result='fresh')
+    drained = metrics.drain()
+    metrics.count('cache', result='fresh')
+    assert [record['type'] for record in drained.records()] == ['span', 'counter']
+    assert [record['value'] for record in drained.records()[1:]] == [1]
+    assert [(record['type'], record['value']) for record in metrics.records()] == [('counter', 1)]
+
+
+def test_connection_time_comes_from_the_real_connection(monkeypatch):
+    server, base_url = start_stub_server({'/': b'<html>titulares</html>'})
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda *args, **kwargs: lookups.append(args[0]) or getaddrinfo(*args, **kwargs))
+    session = headlines_scraper.create_session()
+    metrics = Metrics()
+    resilience = Resilience(state_path=None)
+    try:
+        for _ in range(2):
+            with metrics.span('fetch', source='ABC', page='portada') as span:
+                response = headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+                metrics.observe_response(span, response, source='ABC')
+    finally:
+        server.shutdown()
+        session.close()
+        resilience.close()
+    first, second = [record for record in metrics.records() if record['type'] == 'span']
+    # Solo la primera descarga abre conexión (la segunda la reutiliza) y no hay resoluciones de más
+    assert first['connect_ms'] > 0 and 'connect_ms' not in second
+    assert lookups == ['127.0.0.1']
+    assert server.connections == 1
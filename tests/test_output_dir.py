@@ -0,0 +1,57 @@
+"""Directorio de salida y su política de conservación"""
+
+import os
+import zipfile
+
+from output_dir import ARCHIVE_DIR, OutputDirectory, RetentionPolicy
+
+DAY = 86400
+
+
+def write_page(outputs, name, size=100):
+    path = os.path.join(outputs.directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('x' * size)
+    return path
+
+
+def test_failed_archive_keeps_page_tracked_until_retried(tmp_path, capsys):
+    with OutputDirectory(str(tmp_path), RetentionPolicy(max_files=1, archive=True)) as outputs:
+        # Un archivo donde debería ir el directorio del archivo: archivar falla
+        (tmp_path / ARCHIVE_DIR).write_text('estorbo')
+        old = write_page(outputs, 'titulares_20250619_100000.html')
+        assert outputs.register(old, now=DAY) == []
+        assert outputs.register(write_page(outputs, 'titulares_20250620_100000.html'), now=2 * DAY) == []
+        assert 'Error retirando titulares_20250619_100000.html' in capsys.readouterr().out
+        assert os.path.exists(old)
+        assert [file for file, _, _ in outputs.pages()] == ['titulares_20250619_100000.html', 'titulares_20250620_100000.html']
+        assert outputs.totals() == (2, 200)
+
+        (tmp_path / ARCHIVE_DIR).unlink()
+        assert outputs.apply_retention(now=2 * DAY) == ['titulares_20250619_100000.html']
+        assert not os.path.exists(old)
+        assert outputs.totals() == (1, 100)
+        assert len(outputs.archives()) == 1
+
+
+def test_archiving_twice_does_not_duplicate_members(tmp_path):
+    with OutputDirectory(str(tmp_path), RetentionPolicy(max_files=1, archive=True)) as outputs:
+        path = write_page(outputs, 'titulares_20250619_100000.html')
+        # Archivada en un intento anterior que no llegó a borrarla
+        outputs.archive('titulares_20250619_100000.html', path, DAY)
+        outputs.register(path, now=DAY)
+        outputs.register(write_page(outputs, 'titulares_20250620_100000.html'), now=2 * DAY)
+        archive, = outputs.archives()
+        with zipfile.ZipFile(os.path.join(outputs.directory, archive)) as zipped:
+            assert zipped.namelist() == ['titulares_20250619_100000.html']
+
+
+def test_retention_by_age_files_and_size(tmp_path):
+    with OutputDirectory(str(tmp_path), RetentionPolicy.parse('days=2,files=3,mb=0.0005')) as outputs:
+        removed = []
+        for day in range(1, 7):
+            removed += outputs.register(write_page(outputs, f'titulares_202506{day:02d}_100000.html', 200), now=day * DAY)
+        # mb=0.0005 son 524 bytes: caben dos páginas de 200
+        assert [file for file, _, _ in outputs.pages()] == ['titulares_20250605_100000.html', 'titulares_20250606_100000.html']
+        assert removed == [f'titulares_202506{day:02d}_100000.html' for day in range(1, 5)]
+        assert os.readlink(outputs.latest_path) == 'titulares_20250606_100000.html'
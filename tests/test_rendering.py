@@ -0,0 +1,43 @@
+"""Página HTML de titulares"""
+
+import rendering
+from story_clusters import cluster_stories
+
+
+def page(all_headlines, data_articles=None, stories=None, fragments=None):
+    return ''.join(rendering.render_html(all_headlines, data_articles or {}, '2025-06-20 12:00:00', fragments, stories))
+
+
+def test_clustered_headlines_are_not_repeated_in_sections():
+    all_headlines = [
+        {'title': 'El Gobierno aprueba los presupuestos generales de 2026', 'link': 'https://a.es/presupuestos',
+         'source': 'Diario A'},
+        {'title': 'Otra noticia que solo sale en A', 'link': 'https://a.es/otra', 'source': 'Diario A'},
+        {'title': 'El Gobierno aprueba los presupuestos generales para 2026', 'link': 'https://b.es/presupuestos?utm_source=x',
+         'source': 'Diario B'},
+    ]
+    stories = cluster_stories(all_headlines)
+    assert len(stories) == 1
+    for fragments in (None, {}):
+        html = page(all_headlines, stories=stories, fragments=fragments)
+        assert html.count('https://a.es/presupuestos') == 1
+        assert html.count('https://b.es/presupuestos') == 1
+        assert '1. Otra noticia que solo sale en A' in html
+        # Diario B no tiene más titulares, pero no es un error: están en la tarjeta de la historia
+        assert 'No se pudieron extraer titulares de Diario B' not in html
+        assert html.count('de esta portada en «En varias portadas»') == 2
+
+    html = page(all_headlines)
+    assert html.count('https://a.es/presupuestos') == 1 and 'varias portadas' not in html
+
+
+def test_names_are_escaped():
+    all_headlines = [{'title': 'A <b>', 'link': 'https://a.es/1?x=1&y=2', 'source': 'Diario <A&B>'},
+                     {'title': 'A <b>', 'link': 'https://c.es/1', 'source': 'Diario <C>'}]
+    data_articles = {'Diario <A&B>': [{'title': 'Gráfico', 'link': 'https://a.es/g', 'author': '<script>x</script>',
+                                       'is_new': True}]}
+    html = page(all_headlines, data_articles, stories=[all_headlines])
+    for raw in ('<A&B>', '<C>', '<script>', '<b>'):
+        assert raw not in html
+    assert 'Diario &lt;A&amp;B&gt;' in html and 'Por &lt;script&gt;x&lt;/script&gt;' in html
+    assert 'Diario &lt;C&gt;</span>' in html
@@ -0,0 +1,41 @@
+"""Grabación y reproducción de las páginas descargadas"""
+
+import headlines_scraper
+from replay import Recorder, replay_sources, start_replay_server
+from sources import get_source
+
+FEED = (b'<?xml version="1.0"?><rss version="2.0"><channel>'
+        b'<item><title>Titular del feed con suficientes palabras</title>'
+        b'<link>https://www.eldiario.es/politica/titular-del-feed_1_100.html</link>'
+        b'<pubDate>Fri, 20 Jun 2025 10:00:00 +0200</pubDate></item></channel></rss>')
+
+
+def test_replay_never_points_to_unrecorded_urls(tmp_path, capsys):
+    mundo, confidencial, diario = (get_source(name) for name in ('El Mundo', 'El Confidencial', 'El Diario'))
+    recorder = Recorder(str(tmp_path))
+    # De El Confidencial, la portada y un autor; de El Diario, solo el feed; de El Mundo, nada
+    recorder.record(confidencial.url, b'<html><body><h2><a href="/espana/2025-06-20/titular-de-prueba_1/">'
+                                      b'Titular de la portada con suficientes palabras</a></h2></body></html>', 'text/html')
+    recorder.record(confidencial.authors[0].url, b'<html><body></body></html>', 'text/html')
+    recorder.record(diario.feed_url, FEED, 'application/rss+xml')
+    recorder.save()
+
+    server, urls = start_replay_server(str(tmp_path))
+    try:
+        replayed = replay_sources([mundo, confidencial, diario], urls)
+        assert [source.name for source in replayed] == ['El Confidencial', 'El Diario']
+        local = f'http://127.0.0.1:{server.server_port}/'
+        for source in replayed:
+            pages = [source.url, source.feed_url] + [author.url for author in source.authors]
+            assert all(url.startswith(local) for url in pages if url)
+        assert [author.name for author in replayed[0].authors] == [confidencial.authors[0].name]
+        assert replayed[1].authors == [] and replayed[1].feed_url == urls[diario.feed_url]
+        warning = capsys.readouterr().out
+        assert mundo.url in warning and confidencial.authors[1].url in warning
+
+        all_headlines, _ = headlines_scraper.scrape_sources(replayed, headlines_scraper.create_session(retries=0))
+        assert {headline['source'] for headline in all_headlines} == {'El Confidencial', 'El Diario'}
+        # La portada de El Diario no hizo falta: bastó el feed grabado
+        assert server.statuses[404] == 0
+    finally:
+        server.shutdown()
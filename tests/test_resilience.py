@@ -0,0 +1,196 @@
+"""Cortacircuitos, peticiones duplicadas y últimos resultados buenos"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import headlines_scraper
+from http_cache import HttpCache
+from benchmarks import FlakyHandler, scrape_flaky, synthetic_recording, synthetic_sources
+from replay import load_recording, replay_sources, start_stub_server, stub_path
+from resilience import CircuitBreaker, CircuitOpen, Resilience
+
+
+def start_flaky_server(pages, latency=0.0, slow_latency=0.0, slow=()):
+    """Servidor poco fiable; slow dice, petición a petición, cuáles van lentas (las demás, rápidas)"""
+    server, base_url = start_stub_server(pages, handler=FlakyHandler)
+    server.down, server.hang = False, 0.0
+    server.latency, server.slow_latency, server.slow_fraction = latency, slow_latency, 0.5
+    draws = iter(slow)
+    server.rng = SimpleNamespace(random=lambda: 0.0 if next(draws, False) else 1.0)
+    return server, base_url
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    assert breaker.allow()
+    assert not breaker.failure()
+    assert breaker.failure()  # El segundo fallo seguido abre el circuito
+    assert not breaker.allow()
+    assert breaker.trip_signal() is None
+
+    time.sleep(0.06)
+    # Medio abierto: pasa una sola petición de prueba
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.failure()  # Si la prueba falla, vuelve a abrirse sin esperar a más fallos
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()  # Una prueba que no dice nada del dominio (un 404) deja salir otra
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.allow() and breaker.allow()
+    assert breaker.trip_signal() is not None and not breaker.trip_signal().done()
+
+
+def test_breaker_stops_requests_to_failing_host():
+    server, base_url = start_flaky_server({'/': b'<html></html>'})
+    server.down = True
+    resilience = Resilience(None, hedging=False, failures=2, cooldown=60)
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        for _ in range(2):
+            with pytest.raises(Exception) as error:
+                headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+            assert not isinstance(error.value, CircuitOpen)
+        with pytest.raises(CircuitOpen):
+            headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+        assert server.statuses[503] == 2
+        assert resilience.stats['opened'] == 1 and resilience.stats['short_circuited'] == 1
+    finally:
+        session.close()
+        server.shutdown()
+
+
+def test_half_open_probe_closes_breaker_when_host_recovers():
+    server, base_url = start_flaky_server({'/': b'<html></html>'})
+    server.down = True
+    resilience = Resilience(None, hedging=False, failures=1, cooldown=0.05)
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        with pytest.raises(Exception):
+            headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+        with pytest.raises(CircuitOpen):
+            headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+        server.down = False
+        time.sleep(0.06)
+        assert headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience).status_code == 200
+        assert headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience).status_code == 200
+        assert server.statuses[200] == 2
+    finally:
+        session.close()
+        server.shutdown()
+
+
+def test_slow_request_is_hedged():
+    # La primera petición se queda colgada; la duplicada responde enseguida
+    server, base_url = start_flaky_server({'/': b'<html>rapida</html>'}, latency=0.01, slow_latency=3.0, slow=[True])
+    resilience = Resilience(None, failures=3, cooldown=60)
+    host = base_url.split('//', 1)[1]
+    for _ in range(5):
+        resilience.latencies.record(host, 0.01)
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        start = time.monotonic()
+        response = headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+        elapsed = time.monotonic() - start
+        assert response.content == b'<html>rapida</html>'
+        assert elapsed < 2.0
+        assert resilience.stats['hedged'] == 1 and resilience.stats['hedge_wins'] == 1
+    finally:
+        resilience.close()
+        session.close()
+        server.shutdown()
+
+
+def test_fast_request_is_not_hedged():
+    server, base_url = start_flaky_server({'/': b'<html></html>'}, latency=0.01)
+    resilience = Resilience(None, failures=3, cooldown=60)
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        for _ in range(3):
+            headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience)
+        assert resilience.stats['hedged'] == 0
+        assert server.statuses[200] == 3
+    finally:
+        resilience.close()
+        session.close()
+        server.shutdown()
+
+
+def test_outage_serves_last_good_results(tmp_path):
+    sources = synthetic_sources(2, authors=2)
+    recording = load_recording(synthetic_recording(str(tmp_path / 'grabacion'), 10, 1, sources))
+    servers = []
+    urls = {}
+    try:
+        for source in sources:
+            own = [source.url] + [author.url for author in source.authors]
+            server, base_url = start_flaky_server({stub_path(url): recording[url][0] for url in own})
+            servers.append(server)
+            urls.update((url, base_url + stub_path(url)) for url in own)
+        flaky = replay_sources(sources, urls)
+        state_path = str(tmp_path / 'resiliencia.json')
+
+        warmup = Resilience(state_path)
+        _, expected_headlines, expected_articles = scrape_flaky(flaky, warmup)
+        warmup.close()
+        warmup.save()
+
+        servers[0].down = True
+        resilience = Resilience(state_path, cooldown=60)
+        _, all_headlines, data_articles = scrape_flaky(flaky, resilience)
+        resilience.close()
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    down = flaky[0].name
+    assert [headline['link'] for headline in all_headlines] == [headline['link'] for headline in expected_headlines]
+    assert {name: [a['link'] for a in items] for name, items in data_articles.items()} == \
+        {name: [a['link'] for a in items] for name, items in expected_articles.items()}
+    # Lo del periódico caído viene marcado como no actualizado; lo del otro, no
+    assert all(headline.get('stale') for headline in all_headlines if headline['source'] == down)
+    assert not any(headline.get('stale') for headline in all_headlines if headline['source'] != down)
+    assert all(article.get('stale') for article in data_articles[down])
+    assert resilience.stats['stale'] == 1 + len(flaky[0].authors)
+    assert resilience.stats['opened'] == 1
+
+
+def test_hedge_waits_for_a_free_host_slot():
+    # Con un solo hueco por dominio, la petición lenta no se duplica: ya ocupa todo lo que se le puede pedir
+    server, base_url = start_flaky_server({'/': b'<html></html>'}, latency=0.01, slow_latency=0.8, slow=[True])
+    resilience = Resilience(None, failures=3, cooldown=60, max_per_host=1)
+    host = base_url.split('//', 1)[1]
+    for _ in range(5):
+        resilience.latencies.record(host, 0.01)
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        assert headlines_scraper.fetch_page(base_url + '/', session, resilience=resilience).status_code == 200
+        assert resilience.stats['hedged'] == 0
+        assert server.statuses[200] == 1
+    finally:
+        resilience.close()
+        session.close()
+        server.shutdown()
+
+
+def test_fresh_cache_hits_are_not_latency_samples(tmp_path):
+    server, base_url = start_flaky_server({'/': b'<html></html>'}, latency=0.05)
+    resilience = Resilience(None, failures=3, cooldown=60)
+    cache = HttpCache(str(tmp_path / 'cache'), max_age=3600)
+    host = base_url.split('//', 1)[1]
+    session = headlines_scraper.create_session(retries=0)
+    try:
+        for _ in range(5):
+            headlines_scraper.fetch_page(base_url + '/', session, cache, resilience=resilience)
+        # Solo la primera ha ido a la red; las demás, frescas en la caché, no bajan el percentil del dominio
+        assert server.statuses[200] == 1
+        assert len(resilience.latencies.to_dict()[host]) == 1
+    finally:
+        resilience.close()
+        session.close()
+        server.shutdown()
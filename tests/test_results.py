@@ -0,0 +1,69 @@
+"""Modelo compacto de los resultados y su serialización"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import results
+from results import Article, Headline, ResultBatch
+
+HEADLINES = [
+    {'title': 'Titular de portada', 'link': 'https://www.elmundo.es/espana/2025/06/20/noticia.html',
+     'source': 'El Mundo', 'published': '2025-06-20', 'change': 'new'},
+    {'title': 'Titular sin actualizar', 'link': 'https://www.eldiario.es/politica/noticia_1_100.html',
+     'source': 'El Diario', 'stale': '2025-06-20T08:00:00'},
+]
+ARTICLES = {
+    'El Confidencial': [
+        {'title': 'Artículo de datos', 'link': 'https://www.elconfidencial.com/espana/2025-06-19/datos_1/',
+         'author': 'Marta Ley', 'source': 'El Confidencial', 'published': '2025-06-19', 'is_new': True,
+         'change': 'moved', 'enrichment': {'lede': 'Entradilla', 'charts': 2, 'embeds': 0, 'reading_minutes': 4}},
+        {'title': 'Artículo guardado', 'link': 'https://www.elconfidencial.com/espana/2025-06-18/datos_2/',
+         'author': 'Marta Ley', 'source': 'El Confidencial', 'published': '2025-06-18', 'is_new': False,
+         'stale': '2025-06-20T08:00:00'},
+    ]
+}
+
+
+def test_items_keep_every_field():
+    headlines, articles = results.to_items(HEADLINES, ARTICLES)
+    assert [headline.to_dict() for headline in headlines] == HEADLINES
+    assert {source: [article.to_dict() for article in items] for source, items in articles.items()} == ARTICLES
+    # Inmutables y utilizables como clave aunque lleven el enriquecimiento
+    assert len({*headlines, *articles['El Confidencial']}) == 4
+    with pytest.raises(AttributeError):
+        headlines[0].title = 'Otro'
+
+
+def test_batch_round_trip():
+    batch = ResultBatch.from_results(HEADLINES, ARTICLES)
+    assert [headline.to_dict() for headline in batch.headlines()] == HEADLINES
+    assert {source: [article.to_dict() for article in items]
+            for source, items in batch.data_articles().items()} == ARTICLES
+
+
+@pytest.mark.parametrize('format', results.FORMATS)
+def test_serialization_round_trip(format):
+    if format == 'msgpack':
+        pytest.importorskip('msgpack')
+    batch = ResultBatch.from_results(*results.to_items(HEADLINES, ARTICLES))
+    loaded = results.loads(results.dumps(batch, format), format)
+    assert list(loaded) == list(batch)
+
+
+def test_columns_without_stale_or_enrichment_still_load():
+    columns = ResultBatch.from_results(HEADLINES, ARTICLES).to_columns()
+    for name in ('stale', 'stale_offsets', 'enrichments', 'enrichment_offsets'):
+        del columns[name]
+    loaded = ResultBatch.from_columns(columns)
+    assert [item.stale for item in loaded] == [None] * 4
+    assert loaded[2].enrichment is None and loaded[2].is_new
+
+
+def test_msgpack_is_imported_only_to_serialize():
+    code = "import sys, rendering, results; print('msgpack' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
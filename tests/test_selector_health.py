@@ -0,0 +1,58 @@
+"""Salud de los selectores de cada periódico"""
+
+from html_parsing import SelectorReport, SelectorSet, make_soup
+from selector_health import DRIFT_MISSES, MIN_RUNS, PROBE_EVERY, SelectorHealth
+
+SELECTORS = SelectorSet(['.principal a', 'h2 a'])
+# El titular de h2 va antes en el documento: con uno basta y, si h2 va primero, .principal ni se evalúa
+ORIGINAL = '<h2><a href="/2">Segundo</a></h2><div class="principal"><a href="/1">Principal</a></div>'
+REDESIGN = '<h2><a href="/2">Segundo</a></h2><div class="portada"><a href="/1">Principal</a></div>'
+
+
+def scrape(health, html):
+    """Una extracción de un titular como la de get_headlines: (orden probado, si avisa de un cambio de maquetación)"""
+    ranked = health.ranked('Diario', 'portada', SELECTORS)
+    report = SelectorReport(ranked.selectors)
+    ranked.first(make_soup(html), 1, lambda element: element.get_text(), report=report)
+    return ranked.selectors, health.record('Diario', 'portada', SELECTORS, report, 1.0)
+
+
+def test_dead_selector_is_demoted_and_recovers_on_probe(tmp_path, capsys):
+    health = SelectorHealth(str(tmp_path / 'selectores.json'))
+    for _ in range(MIN_RUNS):
+        assert scrape(health, ORIGINAL) == (SELECTORS.selectors, False)
+
+    # Rediseño: el principal deja de acertar; se avisa una sola vez y, tras MIN_RUNS fallos, pasa al final
+    drifts = [scrape(health, REDESIGN)[1] for _ in range(MIN_RUNS)]
+    assert drifts == [index == DRIFT_MISSES - 1 for index in range(MIN_RUNS)]
+    assert health.drifted() == ['Diario|portada']
+    assert 'ha dejado de funcionar' in capsys.readouterr().out
+    assert scrape(health, REDESIGN)[0] == ['h2 a', '.principal a']
+
+    # Vuelve la maquetación de antes: al final de la cascada no llega a evaluarse, así que sigue al final
+    # hasta la siguiente prueba en el orden de siempre, que le devuelve su prioridad
+    runs = health.pages['Diario|portada']['runs']
+    while (runs + 1) % PROBE_EVERY:
+        assert scrape(health, ORIGINAL)[0] == ['h2 a', '.principal a']
+        runs += 1
+    assert scrape(health, ORIGINAL)[0] == SELECTORS.selectors
+    assert 'vuelve a funcionar' in capsys.readouterr().out
+    assert health.drifted() == []
+    assert scrape(health, ORIGINAL)[0] == SELECTORS.selectors
+
+
+def test_state_persists_between_runs(tmp_path):
+    path = str(tmp_path / 'selectores.json')
+    health = SelectorHealth(path)
+    for html in [ORIGINAL] * MIN_RUNS + [REDESIGN] * MIN_RUNS:
+        scrape(health, html)
+    health.save()
+
+    reloaded = SelectorHealth(path)
+    assert reloaded.pages == health.pages
+    assert reloaded.drifted() == ['Diario|portada']
+    assert reloaded.ranked('Diario', 'portada', SELECTORS).selectors == ['h2 a', '.principal a']
+    # Si cambian los selectores del registro, esa página empieza de cero
+    other = SelectorSet(['.nuevo a', 'h2 a'])
+    assert reloaded.ranked('Diario', 'portada', other).selectors == other.selectors
+    assert reloaded.pages['Diario|portada']['runs'] == 0
@@ -0,0 +1,55 @@
+"""Extracción repartida entre procesos"""
+
+import headlines_scraper
+from benchmarks import synthetic_recording, synthetic_sources
+from replay import replay_sources, start_replay_server
+from sharding import HashRing, WorkQueue, run_sharded
+
+
+def test_sharded_run_matches_single_process(tmp_path):
+    sources = synthetic_sources(8, authors=2)
+    recording = synthetic_recording(str(tmp_path / 'grabacion'), headline_count=10, padding_kb=1, sources=sources)
+    server, urls = start_replay_server(recording)
+    replayed = replay_sources(sources, urls)
+    queue_path = str(tmp_path / 'cola.sqlite3')
+    try:
+        expected = headlines_scraper.scrape_sources(replayed, headlines_scraper.create_session())
+        all_headlines, data_articles, run_id = run_sharded(replayed, 3, queue_path, use_cache=False)
+    finally:
+        server.shutdown()
+
+    assert (all_headlines, data_articles) == expected
+    assert len(all_headlines) == sum(min(10, source.headline_count) for source in sources)
+    with WorkQueue(queue_path) as queue:
+        assert queue.pending(run_id) == 0
+        statuses = queue.connection.execute('SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status',
+                                            (run_id,)).fetchall()
+        shards = queue.connection.execute('SELECT COUNT(DISTINCT shard) FROM jobs WHERE run_id = ?', (run_id,)).fetchone()[0]
+    assert statuses == [('done', 8 * 3)]
+    # Los periódicos, cada uno con su dominio, se reparten entre más de un proceso
+    assert shards > 1
+
+
+def test_workers_capped_at_host_count(tmp_path, capsys):
+    sources = synthetic_sources(2, authors=1)
+    recording = synthetic_recording(str(tmp_path / 'grabacion'), headline_count=5, padding_kb=1, sources=sources)
+    server, urls = start_replay_server(recording)
+    queue_path = str(tmp_path / 'cola.sqlite3')
+    try:
+        _, _, run_id = run_sharded(replay_sources(sources, urls), 4, queue_path, use_cache=False)
+    finally:
+        server.shutdown()
+    with WorkQueue(queue_path) as queue:
+        assert queue.run_info(run_id)[1] == 2
+        assert queue.pending(run_id) == 0
+    assert 'se usan 2 procesos en lugar de 4' in capsys.readouterr().out
+
+
+def test_hash_ring_keeps_hosts_together():
+    ring = HashRing(4)
+    assert len({ring.shard_for('periodico1.es') for _ in range(10)}) == 1
+    # Al pasar de 4 a 5 particiones solo cambia de partición una parte de los dominios
+    bigger = HashRing(5)
+    hosts = [f'periodico{n}.es' for n in range(200)]
+    moved = sum(ring.shard_for(host) != bigger.shard_for(host) for host in hosts)
+    assert moved < len(hosts) / 2
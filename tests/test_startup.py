@@ -0,0 +1,17 @@
+"""Arranque de cada orden de cli.py: qué se importa, no cuánto tarda (eso lo vigilan los benchmarks)"""
+
+import pytest
+
+import cli
+from benchmarks import LAZY_MODULES, STARTUP_BUDGET_MS, measure_startup
+
+
+def test_every_command_has_a_budget():
+    assert set(STARTUP_BUDGET_MS) == set(cli.COMMANDS) - {'bench'}
+
+
+@pytest.mark.parametrize('command', sorted(set(cli.COMMANDS) - {'bench'}))
+def test_startup_imports_no_heavy_modules(command):
+    # En un intérprete nuevo: import cli; cli.load(orden) y se mira sys.modules
+    _, loaded = measure_startup(command, runs=1)
+    assert not loaded, f"{command} importa {', '.join(loaded)} al arrancar (deberían cargarse al usarse: {LAZY_MODULES})"
@@ -0,0 +1,140 @@
+"""Destinos de subida y subidas de lo que ha cambiado"""
+
+from benchmarks import UploadHandler
+from replay import start_stub_server
+from uploads import FtpUploader, LocalUploader, UploadManager, WebDavUploader, uploader_from_url
+
+
+def test_paths_with_encoded_or_raw_spaces():
+    for url in ('ftp://ftp.ejemplo.com/pruebas%20cursor', 'ftp://ftp.ejemplo.com/pruebas cursor'):
+        uploader = uploader_from_url(url, 'usuario', 'clave')
+        assert isinstance(uploader, FtpUploader)
+        assert uploader.directory == 'pruebas cursor'
+    assert uploader_from_url('file:///tmp/pruebas%20cursor').directory == '/tmp/pruebas cursor'
+    webdav = uploader_from_url('https://webdav.ejemplo.com/pruebas cursor', '', '')
+    assert webdav.base_url == 'https://webdav.ejemplo.com/pruebas%20cursor'
+    webdav.close()
+
+
+def test_webdav_gzip_is_opt_in():
+    plain = uploader_from_url('https://webdav.ejemplo.com/titulares', '', '')
+    compressed = uploader_from_url('https://webdav.ejemplo.com/titulares?gzip=1', '', '')
+    assert not plain.accepts_gzip
+    assert compressed.accepts_gzip and compressed.base_url == 'https://webdav.ejemplo.com/titulares'
+    for uploader in (plain, compressed):
+        uploader.close()
+
+
+def test_upload_manager_sends_only_changes(tmp_path):
+    server, base_url = start_stub_server({}, handler=UploadHandler)
+    server.bandwidth = 1 << 30
+    page = tmp_path / 'sitio' / 'index.html'
+    page.parent.mkdir()
+    page.write_text('<html>' + 'titular ' * 500 + '</html>', encoding='utf-8')
+    state_path = str(tmp_path / 'subidas.json')
+    try:
+        for compress in (False, True):
+            manager = UploadManager(WebDavUploader(f'{base_url}/{compress}', compress=compress), state_path,
+                                    root=str(tmp_path))
+            manager.submit([str(page)])
+            stats = manager.close()
+            assert stats['uploaded'] == 1
+            assert server.pages[f'/{compress}/sitio/index.html'] == page.read_bytes()
+            # Sin pedirlo, el cuerpo va tal cual; con gzip, comprimido
+            assert (stats['bytes_sent'] < stats['bytes']) == compress
+
+        manager = UploadManager(WebDavUploader(f'{base_url}/False'), state_path, root=str(tmp_path))
+        manager.submit([str(page)])
+        assert manager.close()['unchanged'] == 1
+        assert server.statuses['PUT'] == 2
+    finally:
+        server.shutdown()
+
+
+def test_local_uploader(tmp_path):
+    uploader = LocalUploader(str(tmp_path / 'destino'))
+    uploader.put('sitio/index.html', b'<html></html>')
+    assert (tmp_path / 'destino' / 'sitio' / 'index.html').read_bytes() == b'<html></html>'
+
+
+class FakeFtp:
+    """Servidor FTP en memoria que, como algunos reales, no renombra sobre un archivo que ya existe"""
+
+    def __init__(self):
+        self.files = {}
+
+    def mkd(self, path):
+        pass
+
+    def storbinary(self, command, stream):
+        self.files[command.split(' ', 1)[1]] = stream.read()
+
+    def rename(self, source, target):
+        import ftplib
+        if target in self.files:
+            raise ftplib.error_perm('550 El archivo ya existe')
+        self.files[target] = self.files.pop(source)
+
+    def delete(self, path):
+        import ftplib
+        if path not in self.files:
+            raise ftplib.error_perm('550 No existe')
+        del self.files[path]
+
+
+def test_ftp_replaces_existing_files_and_deletes(monkeypatch):
+    server = FakeFtp()
+    uploader = FtpUploader('ftp.ejemplo.com', 'pruebas cursor')
+    monkeypatch.setattr(uploader, 'connection', lambda: server)
+    uploader.put('index.html', b'uno')
+    uploader.put('index.html', b'dos')
+    assert server.files == {'pruebas cursor/index.html': b'dos'}
+    uploader.delete('index.html')
+    uploader.delete('index.html')  # Lo que ya no está no es un error
+    assert server.files == {}
+
+
+def test_retired_pages_are_deleted_remotely(tmp_path):
+    destination = tmp_path / 'destino'
+    state_path = str(tmp_path / 'subidas.json')
+    pages = [tmp_path / f'titulares_2025062{day}_100000.html' for day in range(3)]
+    for page in pages:
+        page.write_text('<html></html>', encoding='utf-8')
+    manager = UploadManager(LocalUploader(str(destination)), state_path, root=str(tmp_path))
+    manager.submit([str(page) for page in pages])
+    manager.close()
+
+    # Las dos primeras se retiran; una que nunca se subió no se toca
+    pages[0].unlink()
+    pages[1].unlink()
+    manager = UploadManager(LocalUploader(str(destination)), state_path, root=str(tmp_path))
+    manager.remove([str(pages[0]), str(pages[1]), str(tmp_path / 'titulares_20250601_100000.html')])
+    stats = manager.close()
+    assert stats['deleted'] == 2 and stats['failed'] == 0
+    assert sorted(path.name for path in destination.iterdir()) == [pages[2].name]
+    assert list(UploadManager(LocalUploader(str(destination)), state_path).uploaded) == [pages[2].name]
+
+
+def test_failed_remote_delete_is_retried(tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'subidas.json')
+    page = tmp_path / 'titulares_20250620_100000.html'
+    page.write_text('<html></html>', encoding='utf-8')
+    uploader = LocalUploader(str(tmp_path / 'destino'))
+    manager = UploadManager(uploader, state_path, root=str(tmp_path))
+    manager.submit([str(page)])
+    manager.close()
+    page.unlink()
+
+    def unavailable(name):
+        raise OSError('destino no disponible')
+    monkeypatch.setattr(uploader, 'delete', unavailable)
+    manager = UploadManager(uploader, state_path, root=str(tmp_path))
+    manager.remove([str(page)])
+    assert manager.close()['failed'] == 1
+    monkeypatch.undo()
+
+    # En la siguiente ejecución, aunque no se retire nada, se vuelve a intentar
+    manager = UploadManager(LocalUploader(str(tmp_path / 'destino')), state_path, root=str(tmp_path))
+    manager.remove([])
+    assert manager.close()['deleted'] == 1
+    assert not (tmp_path / 'destino' / page.name).exists()
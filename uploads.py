@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Publicación de los archivos generados.
+Un Uploader sabe dejar un archivo en un destino (un directorio local, un
+servidor FTP, un servidor WebDAV o Dropbox); UploadManager decide qué subir:
+solo los archivos cuyo contenido ha cambiado desde la última subida, varios a
+la vez, comprimidos si se ha pedido y el destino lo admite, y en segundo plano,
+sin parar el resto de la ejecución. Las páginas que se retiran del directorio de
+salida también se borran del destino, como hacía la sincronización por FTP de
+los workflows. HEADLINES_UPLOAD indica el destino como una URL.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import posixpath
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+UPLOAD_ENV_VAR = 'HEADLINES_UPLOAD'  # file:///ruta, ftp(s)://servidor/dir, http(s)://servidor/dir[?gzip=1] (WebDAV), dropbox:///dir
+USER_ENV_VAR = 'HEADLINES_UPLOAD_USER'
+PASSWORD_ENV_VAR = 'HEADLINES_UPLOAD_PASSWORD'  # También el token de acceso de Dropbox
+STATE_FILE = '.subidas_titulares.json'
+MAX_UPLOADS = 4  # Subidas simultáneas
+COMPRESSIBLE = ('.html', '.json', '.xml', '.rss', '.atom', '.txt', '.css', '.js')
+TIMEOUT = 30
+
+
+def digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Uploader:
+    """Destino de las subidas. put() y delete() pueden llamarse desde varios hilos a la vez."""
+    accepts_gzip = False  # Si el destino descomprime cuerpos con Content-Encoding: gzip
+
+    def __init__(self, destination):
+        self.destination = destination  # Identifica el destino en el estado de subidas
+
+    def put(self, name, data, encoding=None):
+        raise NotImplementedError
+
+    def delete(self, name):
+        """Borra un archivo del destino; que ya no esté no es un error"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalUploader(Uploader):
+    """Copia los archivos a un directorio local (o montado por red)"""
+
+    def __init__(self, directory):
+        super().__init__(f'file://{os.path.abspath(directory)}')
+        self.directory = directory
+
+    def put(self, name, data, encoding=None):
+        path = os.path.join(self.directory, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.directory, *name.split('/')))
+        except FileNotFoundError:
+            pass
+
+
+class FtpUploader(Uploader):
+    """Sube por FTP (o FTPS) con una conexión por hilo que se reutiliza entre archivos"""
+
+    def __init__(self, host, directory='', user='', password='', port=21, tls=False):
+        super().__init__(f"{'ftps' if tls else 'ftp'}://{host}:{port}/{directory.strip('/')}")
+        self.host = host
+        self.port = port
+        self.directory = directory.strip('/')
+        self.user = user
+        self.password = password
+        self.tls = tls
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+        self.created = set()
+
+    def connection(self):
+        ftp = getattr(self.local, 'ftp', None)
+        if ftp is None:
+            # ftplib (y socket con él) solo se carga si de verdad se sube por FTP
+            import ftplib
+            ftp = ftplib.FTP_TLS(timeout=TIMEOUT) if self.tls else ftplib.FTP(timeout=TIMEOUT)
+            ftp.connect(self.host, self.port)
+            ftp.login(self.user, self.password)
+            if self.tls:
+                ftp.prot_p()
+            self.local.ftp = ftp
+            with self.lock:
+                self.connections.append(ftp)
+        return ftp
+
+    def makedirs(self, ftp, directory):
+        import ftplib
+        path = ''
+        for part in directory.split('/'):
+            if not part:
+                continue
+            path = f'{path}/{part}' if path else part
+            if path in self.created:
+                continue
+            try:
+                ftp.mkd(path)
+            except ftplib.error_perm:
+                pass  # Ya existe
+            with self.lock:
+                self.created.add(path)
+
+    def put(self, name, data, encoding=None):
+        ftp = self.connection()
+        remote = posixpath.join(self.directory, name) if self.directory else name
+        self.makedirs(ftp, posixpath.dirname(remote))
+        import ftplib
+        # Subir con otro nombre y renombrar: quien descargue a la vez nunca ve un archivo a medias
+        tmp_remote = f'{remote}.tmp'
+        ftp.storbinary(f'STOR {tmp_remote}', io.BytesIO(data))
+        try:
+            ftp.rename(tmp_remote, remote)
+        except ftplib.error_perm:
+            # Hay servidores que no renombran sobre un archivo que ya existe: se borra antes
+            self.delete(name)
+            ftp.rename(tmp_remote, remote)
+
+    def delete(self, name):
+        import ftplib
+        remote = posixpath.join(self.directory, name) if self.directory else name
+        try:
+            self.connection().delete(remote)
+        except ftplib.error_perm as e:
+            if not str(e).startswith('550'):  # 550: no existe
+                raise
+
+    def close(self):
+        import ftplib
+        for ftp in self.connections:
+            try:
+                ftp.quit()
+            except (OSError, ftplib.Error):
+                ftp.close()
+        self.connections = []
+
+
+class WebDavUploader(Uploader):
+    """Sube con PUT de HTTP (WebDAV) por una sesión con keep-alive.
+    Con compress, los textos viajan comprimidos con gzip: solo para servidores que descomprimen los PUT con
+    Content-Encoding: gzip (muchos guardan el cuerpo tal cual y dejarían los archivos comprimidos)."""
+
+    def __init__(self, base_url, user='', password='', session=None, compress=False):
+        super().__init__(base_url.rstrip('/'))
+        self.base_url = base_url.rstrip('/')
+        self.accepts_gzip = compress
+        if session is None:
+            import requests  # Solo quien sube por WebDAV paga su importación
+            session = requests.Session()
+        self.session = session
+        if user:
+            self.session.auth = (user, password)
+
+    def put(self, name, data, encoding=None):
+        headers = {'Content-Type': 'application/octet-stream'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        response = self.session.put(f'{self.base_url}/{quote(name)}', data=data, headers=headers, timeout=TIMEOUT)
+        response.raise_for_status()
+
+    def delete(self, name):
+        response = self.session.delete(f'{self.base_url}/{quote(name)}', timeout=TIMEOUT)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class DropboxUploader(Uploader):
+    """Sube a una carpeta de Dropbox con su API (necesita el paquete dropbox)"""
+
+    def __init__(self, token, directory=''):
+        try:
+            import dropbox
+        except ImportError:
+            raise RuntimeError("Las subidas a Dropbox necesitan el paquete dropbox (pip install dropbox)") from None
+        super().__init__(f"dropbox:///{directory.strip('/')}")
+        self.client = dropbox.Dropbox(token)
+        self.write_mode = dropbox.files.WriteMode.overwrite
+        self.api_error = dropbox.exceptions.ApiError
+        self.directory = '/' + directory.strip('/') if directory.strip('/') else ''
+
+    def put(self, name, data, encoding=None):
+        self.client.files_upload(data, f'{self.directory}/{name}', mode=self.write_mode)
+
+    def delete(self, name):
+        try:
+            self.client.files_delete_v2(f'{self.directory}/{name}')
+        except self.api_error as e:
+            if not (e.error.is_path_lookup() and e.error.get_path_lookup().is_not_found()):
+                raise
+
+
+def uploader_from_url(url, user=None, password=None):
+    """Crea el Uploader de una URL de destino; usuario y contraseña pueden ir en la URL o aparte.
+    Las rutas pueden ir con los espacios codificados ('pruebas%20cursor') o sin codificar."""
+    parts = urlsplit(url)
+    options = parse_qs(parts.query)
+    user = user if user is not None else unquote(parts.username or '')
+    password = password if password is not None else unquote(parts.password or '')
+    if parts.scheme == 'file':
+        return LocalUploader(unquote(parts.path))
+    if parts.scheme in ('ftp', 'ftps'):
+        return FtpUploader(parts.hostname, unquote(parts.path), user, password,
+                           parts.port or 21, tls=parts.scheme == 'ftps')
+    if parts.scheme in ('http', 'https'):
+        netloc = parts.hostname + (f':{parts.port}' if parts.port else '')
+        # ?gzip=1 comprime los textos, si el servidor los descomprime al recibirlos
+        compress = options.get('gzip', ['0'])[-1].lower() in ('1', 'true', 'yes')
+        return WebDavUploader(f'{parts.scheme}://{netloc}{quote(unquote(parts.path))}', user, password, compress=compress)
+    if parts.scheme == 'dropbox':
+        return DropboxUploader(password, unquote(parts.path))
+    raise ValueError(f"Destino de subida desconocido: {url}")
+
+
+class UploadManager:
+    """Sube en segundo plano los archivos que han cambiado desde la última subida a ese destino"""
+
+    def __init__(self, uploader, state_path=STATE_FILE, max_workers=MAX_UPLOADS, compress=True, root='.'):
+        self.uploader = uploader
+        self.state_path = state_path
+        self.compress = compress and uploader.accepts_gzip
+        self.root = root  # Los nombres remotos son las rutas relativas a este directorio
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='subida')
+        self.futures = []
+        self.lock = threading.Lock()
+        self.name_locks = defaultdict(threading.Lock)  # Dos subidas del mismo archivo nunca se cruzan
+        self.stats = {'uploaded': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0, 'bytes': 0, 'bytes_sent': 0}
+        try:
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.uploaded = state.get(uploader.destination, {})  # Nombre remoto -> huella de lo último subido
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Gestor para el destino de HEADLINES_UPLOAD, o None si no se ha configurado ninguno"""
+        url = os.environ.get(UPLOAD_ENV_VAR)
+        if not url:
+            return None
+        return cls(uploader_from_url(url, os.environ.get(USER_ENV_VAR), os.environ.get(PASSWORD_ENV_VAR)), **kwargs)
+
+    def remote_name(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def submit(self, paths):
+        """Encola la subida de unos archivos y vuelve enseguida; wait() espera a que terminen"""
+        for path in paths:
+            self.futures.append(self.executor.submit(self.upload, path))
+
+    def remove(self, paths):
+        """Encola el borrado en el destino de unos archivos retirados en local (solo los que se habían subido),
+        junto con los que no se pudieron borrar en ejecuciones anteriores"""
+        names = [self.remote_name(path) for path in paths]
+        with self.lock:
+            names.extend(name for name, fingerprint in self.uploaded.items() if fingerprint is None and name not in names)
+        for name in names:
+            self.futures.append(self.executor.submit(self.delete, name))
+
+    def delete(self, name):
+        with self.lock:
+            name_lock = self.name_locks[name]
+            if name not in self.uploaded:
+                return False
+        with name_lock:
+            try:
+                self.uploader.delete(name)
+            except Exception as e:
+                with self.lock:
+                    self.stats['failed'] += 1
+                    # Sin huella: queda pendiente de borrar y se reintenta en la próxima llamada a remove()
+                    self.uploaded[name] = None
+                print(f"Error borrando {name} del destino: {e}")
+                return False
+            with self.lock:
+                self.uploaded.pop(name, None)
+                self.stats['deleted'] += 1
+            return True
+
+    def upload(self, path):
+        name = self.remote_name(path)
+        with self.lock:
+            name_lock = self.name_locks[name]
+        with name_lock:
+            return self.upload_locked(path, name)
+
+    def upload_locked(self, path, name):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            fingerprint = digest(data)
+            with self.lock:
+                self.stats['bytes'] += len(data)
+                if self.uploaded.get(name) == fingerprint:
+                    self.stats['unchanged'] += 1
+                    return False
+            encoding = None
+            if self.compress and name.endswith(COMPRESSIBLE):
+                data, encoding = gzip.compress(data, compresslevel=6, mtime=0), 'gzip'
+            self.uploader.put(name, data, encoding)
+            with self.lock:
+                self.uploaded[name] = fingerprint
+                self.stats['uploaded'] += 1
+                self.stats['bytes_sent'] += len(data)
+            return True
+        except Exception as e:
+            with self.lock:
+                self.stats['failed'] += 1
+            print(f"Error subiendo {name}: {e}")
+            return False
+
+    def wait(self):
+        """Espera a las subidas pendientes, guarda el estado y devuelve las estadísticas acumuladas"""
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+        self.save()
+        return dict(self.stats)
+
+    def save(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        with self.lock:
+            state[self.uploader.destination] = dict(self.uploaded)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def close(self):
+        """Termina las subidas pendientes y cierra las conexiones"""
+        stats = self.wait()
+        self.executor.shutdown()
+        self.uploader.close()
+        return stats